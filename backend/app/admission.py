@@ -0,0 +1,193 @@
+"""
+Admission control for the chat pipeline.
+
+A Gate lets `limit` holders in at once and parks up to `queue_size` more in
+FIFO order. A full queue is rejected at once with 429, and a waiter that gets
+no slot within `timeout` seconds is rejected with 503. Both carry a
+Retry-After estimate: the recent mean hold time multiplied by the number of
+waiters each slot would still have to serve. Short, fast failures keep tail
+latency bounded under bursts, where an unbounded queue would only make every
+request slower.
+
+Three gates exist per process:
+
+  chat       whole /api/chat streams, checked in the handler before the
+             response starts, so rejections are real HTTP status codes
+  llm        Claude streaming rounds inside an admitted chat
+  embedding  retrieval (query embedding + search) inside an admitted chat
+
+The stage gates do not reject on queue length: the chat gate already bounds
+how many requests can be waiting on them. They only time out after
+STAGE_QUEUE_TIMEOUT seconds, and app.rag turns that into a "busy" message on
+the already-open stream.
+
+Gates are plain asyncio code without locks, because they are only used from
+the event loop. Queue depth, active holders, rejections and wait times are
+exposed via app.metrics.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from app import metrics
+from app.config import (
+    CHAT_MAX_CONCURRENCY,
+    CHAT_QUEUE_SIZE,
+    CHAT_QUEUE_TIMEOUT,
+    EMBED_MAX_CONCURRENCY,
+    LLM_MAX_CONCURRENCY,
+    STAGE_QUEUE_TIMEOUT,
+)
+
+wait_seconds = metrics.register_histogram(
+    metrics.Histogram("rag_gate_wait_seconds", "Time spent queued for an admission gate.", "gate")
+)
+
+# Weight of the newest hold time in the moving average used for Retry-After
+_HOLD_SMOOTHING = 0.2
+_MAX_RETRY_AFTER = 60
+
+
+class Rejected(Exception):
+    """A gate refused a request. status_code is 429 (queue full) or 503 (timed out)."""
+
+    def __init__(self, gate: str, status_code: int, retry_after: int, reason: str):
+        super().__init__(f"{gate} is saturated ({reason}); retry in {retry_after}s")
+        self.gate = gate
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class Slot:
+    """One admitted holder. release() is idempotent."""
+
+    def __init__(self, gate: "Gate"):
+        self._gate = gate
+        self._start = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self._gate._release(time.perf_counter() - self._start)
+
+
+class Gate:
+    def __init__(self, name: str, limit: int, queue_size: int | None, timeout: float):
+        """limit <= 0 disables the gate; queue_size None means the queue is never full."""
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._mean_hold = 1.0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for w in self._waiters if not w.done())
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would plausibly get a slot."""
+        rounds = (self.queued + 1) / max(self.limit, 1)
+        return max(1, min(_MAX_RETRY_AFTER, math.ceil(self._mean_hold * rounds)))
+
+    async def acquire(self) -> Slot:
+        if self.limit <= 0 or (self.active < self.limit and not self.queued):
+            return self._admit(0.0)
+        if self.queue_size is not None and self.queued >= self.queue_size:
+            self.rejected["queue_full"] += 1
+            raise Rejected(self.name, 429, self.retry_after(), "queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                waiter.cancel()
+                self.rejected["timeout"] += 1
+                wait_seconds.observe(self.name, time.perf_counter() - start)
+                raise Rejected(self.name, 503, self.retry_after(), "timed out waiting") from None
+        except asyncio.CancelledError:
+            # The caller went away; pass a slot we were just handed on
+            if waiter.done() and not waiter.cancelled():
+                self._release(None)
+            else:
+                waiter.cancel()
+            raise
+        return self._admit(time.perf_counter() - start, handed_over=True)
+
+    @asynccontextmanager
+    async def hold(self, trace: metrics.Trace | None = None):
+        """Hold a slot for the block; the wait is recorded on the trace as wait_<gate>."""
+        start = time.perf_counter()
+        slot = await self.acquire()
+        if trace is not None:
+            trace.add(f"wait_{self.name}", time.perf_counter() - start)
+        try:
+            yield slot
+        finally:
+            slot.release()
+
+    def _admit(self, waited: float, handed_over: bool = False) -> Slot:
+        # A handed-over slot was never given back, so active is already counted
+        if not handed_over:
+            self.active += 1
+        self.admitted += 1
+        wait_seconds.observe(self.name, waited)
+        return Slot(self)
+
+    def _release(self, held: float | None) -> None:
+        if held is not None:
+            self._mean_hold += _HOLD_SMOOTHING * (held - self._mean_hold)
+        if self.limit <= 0:
+            self.active -= 1
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+        }
+
+
+chat = Gate("chat", CHAT_MAX_CONCURRENCY, CHAT_QUEUE_SIZE, CHAT_QUEUE_TIMEOUT)
+llm = Gate("llm", LLM_MAX_CONCURRENCY, None, STAGE_QUEUE_TIMEOUT)
+embedding = Gate("embedding", EMBED_MAX_CONCURRENCY, None, STAGE_QUEUE_TIMEOUT)
+GATES = (chat, llm, embedding)
+
+
+def stats() -> dict:
+    return {gate.name: gate.stats() for gate in GATES}
+
+
+def _collect_metrics():
+    yield ("rag_gate_active", "gauge", "Requests holding an admission gate slot.",
+           [({"gate": g.name}, g.active) for g in GATES])
+    yield ("rag_gate_queue_depth", "gauge", "Requests waiting for an admission gate slot.",
+           [({"gate": g.name}, g.queued) for g in GATES])
+    yield ("rag_gate_limit", "gauge", "Concurrent slots per admission gate (0 = unlimited).",
+           [({"gate": g.name}, g.limit) for g in GATES])
+    yield ("rag_gate_rejected_total", "counter", "Requests refused by an admission gate.",
+           [({"gate": g.name, "reason": reason}, n) for g in GATES for reason, n in g.rejected.items()])
+
+
+metrics.register_collector("admission", _collect_metrics)
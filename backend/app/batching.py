@@ -0,0 +1,167 @@
+"""
+Cross-request micro-batching of query embeddings.
+
+Every chat embeds its query on its own, which runs the ONNX session with a
+batch of one. EmbeddingBatcher sits in front of the shared embeddings: a
+query is queued with a Future, and one worker thread takes the first waiting
+query, gathers whatever else arrives within QUERY_BATCH_WINDOW_MS (up to
+QUERY_BATCH_MAX), runs a single batched inference and resolves each Future
+with its row. Sync callers block on the Future for at most
+QUERY_EMBED_TIMEOUT seconds; async callers await it via aembed_query()
+without tying up a thread. A query whose Future was cancelled while queued
+is dropped from its batch, and a failing batch never stops the worker.
+
+Document embedding (ingest) is already batched and bypasses the queue; any
+other attribute is forwarded to the wrapped embeddings.
+"""
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app import metrics
+from app.config import QUERY_BATCH_MAX, QUERY_BATCH_WINDOW_MS, QUERY_EMBED_TIMEOUT
+
+_STOP = object()
+
+
+def query_vector(embeddings, text: str) -> np.ndarray:
+    """Embed one query as a float32 vector, batched when embeddings supports it."""
+    if hasattr(embeddings, "embed_query_array"):
+        return embeddings.embed_query_array(text)
+    if hasattr(embeddings, "embed_documents_array"):
+        return embeddings.embed_documents_array([text])[0]
+    return np.asarray(embeddings.embed_query(text), dtype=np.float32)
+
+
+class EmbeddingBatcher(Embeddings):
+    def __init__(
+        self,
+        embeddings,
+        max_batch: int = QUERY_BATCH_MAX,
+        window_ms: float = QUERY_BATCH_WINDOW_MS,
+        timeout: float = QUERY_EMBED_TIMEOUT,
+    ):
+        self.embeddings = embeddings
+        self.timeout = timeout
+        self.max_batch = max(1, max_batch)
+        self.window = max(0.0, window_ms) / 1000
+        self.batches = 0
+        self.queries = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+        self._closed = False
+
+    def __getattr__(self, name):
+        # Only reached for attributes not defined here (dim, cache, ...)
+        return getattr(self.__dict__["embeddings"], name)
+
+    # ── Batched query path ────────────────────────────────────────────────────
+
+    def submit(self, text: str) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("EmbeddingBatcher is closed")
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._worker.start()
+            self._queue.put((text, future))
+        return future
+
+    def embed_query_array(self, text: str) -> np.ndarray:
+        future = self.submit(text)
+        with metrics.stage("embed_query"):
+            try:
+                return future.result(timeout=self.timeout)
+            except FuturesTimeout:
+                # Still queued: the worker skips it. Already running: discarded.
+                future.cancel()
+                raise
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_query_array(text).tolist()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        with metrics.stage("embed_query"):
+            return (await asyncio.wrap_future(self.submit(text))).tolist()
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                # Whatever queued up during the previous inference is taken at once
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            # Drop queries cancelled while queued; the rest can no longer be cancelled
+            batch = [item for item in self._collect(first) if item[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                self._answer(batch)
+            except Exception as exc:
+                print(f"[batching] embedding batch of {len(batch)} failed: {exc!r}", flush=True)
+
+    def _answer(self, batch: list) -> None:
+        try:
+            vectors = self._embed_batch([text for text, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        with self._lock:
+            self.batches += 1
+            self.queries += len(batch)
+        for row, (_, future) in enumerate(batch):
+            future.set_result(vectors[row])
+
+    def _embed_batch(self, texts: list[str]) -> np.ndarray:
+        if hasattr(self.embeddings, "embed_documents_array"):
+            return self.embeddings.embed_documents_array(texts)
+        return np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "queries": self.queries,
+                "mean_batch_size": round(self.queries / self.batches, 2) if self.batches else 0.0,
+            }
+
+    def close(self) -> None:
+        """Stop the worker once queued queries are answered."""
+        with self._lock:
+            self._closed = True
+            if self._worker is not None:
+                self._queue.put(_STOP)
+
+    # ── Pass-through document path ────────────────────────────────────────────
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
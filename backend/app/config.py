@@ -13,3 +13,85 @@ CLAUDE_MODEL: str = "claude-sonnet-4-6"
 CHUNK_SIZE: int = 400
 CHUNK_OVERLAP: int = 50
 RETRIEVAL_K: int = 6
+# Chat context: retrieved chunks are merged and deduplicated, then packed into
+# CONTEXT_TOKEN_BUDGET estimated tokens (0 = no limit). A passage whose
+# embedding cosine similarity to one already included reaches
+# CONTEXT_DEDUP_SIMILARITY is dropped (0 disables).
+CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_DEDUP_SIMILARITY: float = float(os.getenv("CONTEXT_DEDUP_SIMILARITY", "0.95"))
+# "hybrid" (BM25 + vectors fused with RRF), "dense" or "lexical"
+RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Dense search backend: "chroma", or "numpy" for exact search over an in-memory
+# float32 matrix (memory-mapped from disk when VECTOR_MMAP is set)
+VECTOR_BACKEND: str = os.getenv("VECTOR_BACKEND", "chroma")
+VECTOR_MMAP: bool = os.getenv("VECTOR_MMAP", "").lower() in ("1", "true", "yes")
+# NumPy backend only: "none", "int8" or "binary" codes in RAM, with the top
+# k * QUANT_RESCORE_FACTOR candidates rescored against the float32 vectors
+VECTOR_QUANTIZATION: str = os.getenv("VECTOR_QUANTIZATION", "none")
+QUANT_RESCORE_FACTOR: int = int(os.getenv("QUANT_RESCORE_FACTOR", "8"))
+# Candidates taken from each retriever before fusion, and the RRF rank constant
+HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K: int = int(os.getenv("RRF_K", "60"))
+# Minimum trigram similarity for a fuzzy project-title match in get_project_details
+TITLE_MATCH_THRESHOLD: float = float(os.getenv("TITLE_MATCH_THRESHOLD", "0.6"))
+EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+# Empty string disables the persistent embedding cache
+EMBED_CACHE_PATH: str = os.getenv(
+    "EMBED_CACHE_PATH", os.path.join(_BACKEND_DIR, "embedding_cache.sqlite3")
+)
+EMBED_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "50000"))
+# ONNX Runtime session for the embedding model: threads within one operator and
+# across independent operators (0 = onnxruntime default), and graph
+# optimization level ("disable", "basic", "extended" or "all")
+ONNX_INTRA_OP_THREADS: int = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+ONNX_INTER_OP_THREADS: int = int(os.getenv("ONNX_INTER_OP_THREADS", "0"))
+ONNX_GRAPH_OPTIMIZATION: str = os.getenv("ONNX_GRAPH_OPTIMIZATION", "all")
+# Concurrent chat queries are embedded together: up to QUERY_BATCH_MAX per
+# inference, waiting at most QUERY_BATCH_WINDOW_MS for more. 1 disables it.
+QUERY_BATCH_MAX: int = int(os.getenv("QUERY_BATCH_MAX", "32"))
+QUERY_BATCH_WINDOW_MS: float = float(os.getenv("QUERY_BATCH_WINDOW_MS", "5"))
+# Seconds a sync caller waits for its batched query embedding before giving up
+QUERY_EMBED_TIMEOUT: float = float(os.getenv("QUERY_EMBED_TIMEOUT", "30"))
+# Chat answer cache; size 0 disables it, similarity 0 disables near-duplicate matching
+RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIMILARITY: float = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0"))
+# Admission control for /api/chat (per process): CHAT_MAX_CONCURRENCY streams run
+# at once and up to CHAT_QUEUE_SIZE more wait CHAT_QUEUE_TIMEOUT seconds for a
+# slot; beyond that the request gets 429 (queue full) or 503 (timed out) with
+# Retry-After. Inside admitted chats, LLM_MAX_CONCURRENCY Claude streams and
+# EMBED_MAX_CONCURRENCY retrievals (query embedding + search) run at once,
+# waiting up to STAGE_QUEUE_TIMEOUT seconds. 0 disables a limit.
+CHAT_MAX_CONCURRENCY: int = int(os.getenv("CHAT_MAX_CONCURRENCY", "16"))
+CHAT_QUEUE_SIZE: int = int(os.getenv("CHAT_QUEUE_SIZE", "32"))
+CHAT_QUEUE_TIMEOUT: float = float(os.getenv("CHAT_QUEUE_TIMEOUT", "10"))
+LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+EMBED_MAX_CONCURRENCY: int = int(os.getenv("EMBED_MAX_CONCURRENCY", "8"))
+STAGE_QUEUE_TIMEOUT: float = float(os.getenv("STAGE_QUEUE_TIMEOUT", "30"))
+# Threads for blocking work (Chroma search, embeddings, tools) in the async chat path
+RAG_EXECUTOR_WORKERS: int = int(os.getenv("RAG_EXECUTOR_WORKERS", "8"))
+# Shared Anthropic client: HTTP pool limits, timeouts (seconds) and SDK retries
+ANTHROPIC_MAX_CONNECTIONS: int = int(os.getenv("ANTHROPIC_MAX_CONNECTIONS", "100"))
+ANTHROPIC_MAX_KEEPALIVE: int = int(os.getenv("ANTHROPIC_MAX_KEEPALIVE", "20"))
+ANTHROPIC_KEEPALIVE_EXPIRY: float = float(os.getenv("ANTHROPIC_KEEPALIVE_EXPIRY", "60"))
+ANTHROPIC_TIMEOUT: float = float(os.getenv("ANTHROPIC_TIMEOUT", "120"))
+ANTHROPIC_CONNECT_TIMEOUT: float = float(os.getenv("ANTHROPIC_CONNECT_TIMEOUT", "5"))
+ANTHROPIC_MAX_RETRIES: int = int(os.getenv("ANTHROPIC_MAX_RETRIES", "2"))
+# Concurrent tool calls within one agentic round, and the per-call timeout (seconds)
+TOOL_MAX_WORKERS: int = int(os.getenv("TOOL_MAX_WORKERS", "8"))
+TOOL_TIMEOUT: float = float(os.getenv("TOOL_TIMEOUT", "15"))
+# A timed-out tool call is abandoned, not stopped: its thread keeps running.
+# Once this many are still running, new tool calls fail fast instead of queueing
+TOOL_MAX_ABANDONED: int = int(os.getenv("TOOL_MAX_ABANDONED", str(max(1, TOOL_MAX_WORKERS // 2))))
+# Projects named in the retrieved chunks whose get_project_details results are
+# prepared while round 1 streams (0 disables the prefetch), and the threads
+# doing it, kept apart from the tool pool so real tool calls never queue behind it
+TOOL_PREFETCH_PROJECTS: int = int(os.getenv("TOOL_PREFETCH_PROJECTS", "3"))
+TOOL_PREFETCH_WORKERS: int = int(os.getenv("TOOL_PREFETCH_WORKERS", "2"))
+# Ingest: processes that load/split files in parallel, chunks per embed+write batch
+INGEST_WORKERS: int = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+# Soft RSS ceiling (MB) for ingest; 0 disables adaptive batch shrinking
+INGEST_MEMORY_LIMIT_MB: int = int(os.getenv("INGEST_MEMORY_LIMIT_MB", "0"))
+# Index versions kept on disk (active + previous) for rollback
+INDEX_KEEP_VERSIONS: int = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))
@@ -0,0 +1,186 @@
+"""
+Assembles retrieved chunks into the context block of the chat prompt.
+
+Retrieved chunks are not independent: the splitter repeats CHUNK_OVERLAP
+characters between neighbours, and the same blurb can appear on several
+pages. The context is resent on every agentic round, so each repeated token
+is paid for more than once. build_context() therefore:
+
+  1. merges chunks of the same source (and PDF page) that overlap or touch
+     into one passage, using the "start_index" recorded at ingest or, for
+     chunks indexed before that, the text shared across the boundary;
+  2. walks the passages in retrieval order, MMR-style, and drops any whose
+     embedding cosine similarity to a passage already kept reaches
+     CONTEXT_DEDUP_SIMILARITY. A passage's vector is the mean of its chunks'
+     embeddings, which ingest already put in the embedding cache, so this
+     normally costs cache lookups rather than a model run;
+  3. packs what is left, still in retrieval order, into CONTEXT_TOKEN_BUDGET
+     estimated tokens, cutting the last passage at a line or sentence break.
+"""
+
+import math
+import re
+
+import numpy as np
+
+from app import store
+from app.config import CONTEXT_DEDUP_SIMILARITY, CONTEXT_TOKEN_BUDGET
+
+# Rough Claude tokenizer ratio for English prose; no exact local tokenizer
+CHARS_PER_TOKEN = 4
+# Shortest boundary overlap taken as "same text", not a coincidence
+_MIN_OVERLAP = 20
+# Whitespace the splitter may drop between two touching chunks
+_MAX_GAP = 2
+# Don't bother appending a cut passage shorter than this (tokens)
+_MIN_TAIL_TOKENS = 40
+_BREAK = re.compile(r"\n|(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class _Passage:
+    def __init__(self, doc):
+        self.source = doc.metadata.get("source", "unknown")
+        self.page = doc.metadata.get("page")
+        self.start = doc.metadata.get("start_index")
+        self.text = doc.page_content
+        # Chunk texts merged into this passage, embedded for deduplication
+        self.chunks = [doc.page_content]
+
+    @property
+    def end(self):
+        return None if self.start is None else self.start + len(self.text)
+
+    def absorb(self, other: "_Passage") -> bool:
+        """Merge other into self if they overlap or touch; False if disjoint."""
+        if (other.source, other.page) != (self.source, self.page):
+            return False
+        if self.start is not None and other.start is not None:
+            first, second = (self, other) if self.start <= other.start else (other, self)
+            gap = second.start - first.end
+            if gap > _MAX_GAP:
+                return False
+            if gap > 0:
+                text = first.text + "\n" + second.text
+            else:
+                text = first.text + second.text[first.end - second.start:]
+            self.start, self.text = first.start, text
+            self.chunks += other.chunks
+            return True
+        merged = _merge_text(self.text, other.text)
+        if merged is None:
+            return False
+        self.start, self.text = None, merged
+        self.chunks += other.chunks
+        return True
+
+
+def _merge_text(a: str, b: str) -> str | None:
+    if b in a:
+        return a
+    if a in b:
+        return b
+    for first, second in ((a, b), (b, a)):
+        for size in range(min(len(first), len(second)) - 1, _MIN_OVERLAP - 1, -1):
+            if first.endswith(second[:size]):
+                return first + second[size:]
+    return None
+
+
+def merge_chunks(docs: list) -> list[_Passage]:
+    """Collapse overlapping / adjacent chunks; passages keep their best rank."""
+    passages: list[_Passage] = []
+    for doc in docs:
+        passage = _Passage(doc)
+        # A new chunk can bridge two passages, so keep merging until stable
+        while True:
+            host = next((p for p in passages if p.absorb(passage)), None)
+            if host is None:
+                passages.append(passage)
+                break
+            passages.remove(host)
+            passage = host
+    return sorted(passages, key=lambda p: _first_rank(p, docs))
+
+
+def _first_rank(passage: _Passage, docs: list) -> int:
+    return next(
+        (i for i, doc in enumerate(docs)
+         if doc.metadata.get("source", "unknown") == passage.source and doc.page_content in passage.text),
+        len(docs),
+    )
+
+
+def _embedder():
+    """embed(texts) over the shared model, or None while it is not loaded yet."""
+    embeddings = store.loaded_embeddings()
+    if embeddings is None:
+        return None
+    if hasattr(embeddings, "embed_documents_array"):
+        return embeddings.embed_documents_array
+    return embeddings.embed_documents
+
+
+def _unit(rows: np.ndarray) -> np.ndarray:
+    return rows / np.maximum(np.linalg.norm(rows, axis=-1, keepdims=True), 1e-12)
+
+
+def drop_near_duplicates(passages: list, threshold: float = CONTEXT_DEDUP_SIMILARITY, embed=None) -> list:
+    """
+    Drop passages too similar to a better-ranked one. embed(texts) defaults
+    to the shared model; nothing is dropped while that is not loaded (a
+    lexical-only deployment never loads it just for this).
+    """
+    embed = embed or _embedder()
+    if threshold <= 0 or len(passages) < 2 or embed is None:
+        return passages
+    texts = [text for passage in passages for text in passage.chunks]
+    try:
+        rows = _unit(np.asarray(embed(texts), dtype=np.float32))
+    except Exception as exc:
+        print(f"Context dedup skipped, embedding failed: {exc}", flush=True)
+        return passages
+    kept, vectors, offset = [], [], 0
+    for passage in passages:
+        vector = _unit(rows[offset:offset + len(passage.chunks)].mean(axis=0))
+        offset += len(passage.chunks)
+        if vectors and float(np.max(np.stack(vectors) @ vector)) >= threshold:
+            continue
+        kept.append(passage)
+        vectors.append(vector)
+    return kept
+
+
+def _cut(text: str, max_chars: int) -> str:
+    head = text[:max_chars]
+    breaks = [m.start() for m in _BREAK.finditer(head)]
+    return head[:breaks[-1]].rstrip() if breaks else head.rstrip()
+
+
+def pack(passages: list, budget: int = CONTEXT_TOKEN_BUDGET) -> list[tuple[str, str]]:
+    """[(source, text)] in order until the token budget is spent (0 = no limit)."""
+    packed, used = [], 0
+    for passage in passages:
+        cost = estimate_tokens(passage.text)
+        if budget <= 0 or used + cost <= budget:
+            packed.append((passage.source, passage.text))
+            used += cost
+            continue
+        remaining = budget - used
+        # The best-ranked passage always goes in, cut down if need be
+        if remaining >= _MIN_TAIL_TOKENS or not packed:
+            packed.append((passage.source, _cut(passage.text, remaining * CHARS_PER_TOKEN)))
+        break
+    return packed
+
+
+def build_context(docs: list) -> str:
+    passages = drop_near_duplicates(merge_chunks(docs))
+    parts = [
+        f"[{i}] (source: {source})\n{text}"
+        for i, (source, text) in enumerate(pack(passages), 1)
+    ]
+    return "\n\n---\n\n".join(parts)
@@ -0,0 +1,128 @@
+"""
+Persistent embedding cache backed by SQLite.
+
+Rows are keyed by sha256(model id + text) and hold the raw float32 vector.
+Every hit bumps a logical clock on the row; once the table grows past
+max_entries the least recently used rows are evicted. Hit/miss counters are
+kept per process and exposed through stats().
+
+Lookups sit on the chat hot path, so a hit never writes to SQLite itself:
+its clock bump is kept in memory and written with the next put_many (before
+any eviction), or once _TOUCH_FLUSH bumps are pending. The database runs in
+WAL mode with synchronous=NORMAL, so commits do not fsync; a crash can only
+lose the most recent inserts or LRU bumps, never corrupt the cache.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+
+import numpy as np
+
+# SQLite's default limit on host parameters per statement is 999
+_SQL_BATCH = 500
+# Pending LRU clock bumps written by a lookup before it returns
+_TOUCH_FLUSH = 1000
+
+
+class EmbeddingCache:
+    def __init__(self, path: str, model_id: str, dim: int, max_entries: int = 50_000):
+        self.path = path
+        self.model_id = model_id
+        self.dim = dim
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> clock of its latest hit, not yet written to the table
+        self._touched: dict[str, int] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+        row = self._conn.execute("SELECT COUNT(*), COALESCE(MAX(last_used), 0) FROM embeddings").fetchone()
+        self._entries, self._clock = row
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: list[str]) -> dict[int, np.ndarray]:
+        """Return {index: vector} for every text already in the cache."""
+        keys = [self._key(t) for t in texts]
+        found: dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                self._clock += 1
+                self._touched.update(dict.fromkeys(found, self._clock))
+                if len(self._touched) >= _TOUCH_FLUSH:
+                    self._write_touches()
+                    self._conn.commit()
+            hits = {i: found[k] for i, k in enumerate(keys) if k in found}
+            self.hits += len(hits)
+            self.misses += len(keys) - len(hits)
+        return hits
+
+    def put_many(self, texts: list[str], vectors: np.ndarray) -> None:
+        rows = [
+            (self._key(t), np.asarray(v, dtype=np.float32).tobytes())
+            for t, v in zip(texts, vectors)
+        ]
+        with self._lock:
+            # Recent hits must be on disk before eviction picks the LRU rows
+            self._write_touches()
+            self._clock += 1
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(k, blob, self._clock) for k, blob in rows],
+            )
+            self._entries += self._conn.total_changes - before
+            if self._entries > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (self._entries - self.max_entries,),
+                )
+                self._entries = self.max_entries
+            self._conn.commit()
+
+    def _write_touches(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(clock, k) for k, clock in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": self._entries,
+                "max_entries": self.max_entries,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_touches()
+            self._conn.commit()
+            self._conn.close()
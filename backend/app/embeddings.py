@@ -3,19 +3,143 @@ Lightweight embedding function using chromadb's built-in ONNX runtime.
 
 Downloads a ~23MB ONNX model on first use (no PyTorch, no API key).
 Memory footprint: ~120MB vs ~400MB for sentence-transformers.
+
+Texts are embedded in fixed-size batches so peak activation memory is bounded
+by EMBED_BATCH_SIZE rather than by the number of texts. embed_documents_array
+returns a single float32 matrix and is the preferred path for callers that can
+work with NumPy; the list-of-floats methods exist for the LangChain interface.
+
+When EMBED_CACHE_PATH is set, vectors are looked up in a persistent
+EmbeddingCache first and only cache misses reach the ONNX session.
+
+The ONNX session is opened by load() with our own SessionOptions (thread
+pools and graph optimization level from ONNX_* config) instead of chromadb's
+defaults. warm_up() loads it and runs one throwaway inference, so the first
+real query does not pay for the model download, session creation or
+first-run allocations.
 """
 
+import os
+import threading
+import time
 from typing import List
+
+import numpy as np
 from langchain_core.embeddings import Embeddings
 
+from app import metrics
+from app.config import (
+    EMBED_BATCH_SIZE,
+    EMBED_CACHE_MAX_ENTRIES,
+    EMBED_CACHE_PATH,
+    ONNX_GRAPH_OPTIMIZATION,
+    ONNX_INTER_OP_THREADS,
+    ONNX_INTRA_OP_THREADS,
+)
+
+_OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+
+def session_options(
+    ort,
+    intra_op_threads: int = ONNX_INTRA_OP_THREADS,
+    inter_op_threads: int = ONNX_INTER_OP_THREADS,
+    optimization: str = ONNX_GRAPH_OPTIMIZATION,
+):
+    """Build onnxruntime SessionOptions; 0 threads leaves onnxruntime's default."""
+    if optimization not in _OPTIMIZATION_LEVELS:
+        raise ValueError(
+            f"ONNX_GRAPH_OPTIMIZATION must be one of {sorted(_OPTIMIZATION_LEVELS)}, got {optimization!r}"
+        )
+    so = ort.SessionOptions()
+    so.log_severity_level = 3
+    so.graph_optimization_level = getattr(ort.GraphOptimizationLevel, _OPTIMIZATION_LEVELS[optimization])
+    if intra_op_threads > 0:
+        so.intra_op_num_threads = intra_op_threads
+    if inter_op_threads > 0:
+        so.inter_op_num_threads = inter_op_threads
+    # Independent operators only run concurrently in parallel mode
+    so.execution_mode = ort.ExecutionMode.ORT_PARALLEL if inter_op_threads > 1 else ort.ExecutionMode.ORT_SEQUENTIAL
+    return so
+
 
 class OnnxEmbeddings(Embeddings):
-    def __init__(self):
+    dim = 384
+
+    def __init__(self, batch_size: int = EMBED_BATCH_SIZE, cache_path: str = EMBED_CACHE_PATH):
         from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
         self._fn = ONNXMiniLM_L6_V2()
+        self.batch_size = max(1, batch_size)
+        self.model_id = f"onnx/{ONNXMiniLM_L6_V2.MODEL_NAME}"
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self.cache = None
+        if cache_path:
+            from app.embedding_cache import EmbeddingCache
+            self.cache = EmbeddingCache(
+                cache_path, self.model_id, self.dim, max_entries=EMBED_CACHE_MAX_ENTRIES
+            )
+
+    def load(self) -> None:
+        """Download the model if needed and open its session with our options."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            fn = self._fn
+            if hasattr(fn, "_download_model_if_not_exists"):
+                fn._download_model_if_not_exists()
+                providers = [p for p in fn.ort.get_available_providers() if p != "CoreMLExecutionProvider"]
+                # An instance attribute shadows chromadb's lazily built `model`
+                fn.model = fn.ort.InferenceSession(
+                    os.path.join(fn.DOWNLOAD_PATH, fn.EXTRACTED_FOLDER_NAME, "model.onnx"),
+                    providers=providers,
+                    sess_options=session_options(fn.ort),
+                )
+            self._loaded = True
+
+    def warm_up(self) -> float:
+        """Load the session and run one inference; returns the inference time in ms."""
+        self.load()
+        start = time.perf_counter()
+        self._compute(["warm-up"])
+        return (time.perf_counter() - start) * 1000
+
+    def _compute(self, texts: List[str]) -> np.ndarray:
+        self.load()
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            out[start:start + len(batch)] = np.asarray(self._fn(batch), dtype=np.float32)
+        return out
+
+    def embed_documents_array(self, texts: List[str]) -> np.ndarray:
+        """Embed texts into an (n, dim) float32 array, one batch at a time."""
+        if self.cache is None or not texts:
+            return self._compute(texts)
+
+        hits = self.cache.get_many(texts)
+        if len(hits) == len(texts):
+            return np.stack([hits[i] for i in range(len(texts))])
+
+        out = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, vector in hits.items():
+            out[i] = vector
+        missing = [i for i in range(len(texts)) if i not in hits]
+        computed = self._compute([texts[i] for i in missing])
+        out[missing] = computed
+        self.cache.put_many([texts[i] for i in missing], computed)
+        return out
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return [[float(x) for x in v] for v in self._fn(texts)]
+        return self.embed_documents_array(texts).tolist()
 
     def embed_query(self, text: str) -> List[float]:
-        return [float(x) for x in self._fn([text])[0]]
+        with metrics.stage("embed_query"):
+            return self.embed_documents_array([text])[0].tolist()
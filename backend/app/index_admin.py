@@ -0,0 +1,34 @@
+"""
+Command-line admin for versioned indexes.
+
+    python -m app.index_admin list       # active version and rollback history
+    python -m app.index_admin rollback   # re-activate the previous version
+
+Running servers pick up a rollback on their next retrieval, because
+store.get_db() re-opens the handle whenever the version pointer changes.
+"""
+
+import argparse
+import json
+import sys
+
+from app import store
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.index_admin")
+    parser.add_argument("command", choices=["list", "rollback"])
+    args = parser.parse_args(argv)
+
+    if args.command == "rollback":
+        try:
+            store.rollback()
+        except ValueError as exc:
+            print(exc, file=sys.stderr)
+            return 1
+    print(json.dumps(store.versions(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
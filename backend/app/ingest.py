@@ -2,66 +2,504 @@
 Ingest documents from DATA_PATH into the Chroma vector store.
 
 Supported file types: .pdf, .txt, .md
+
+Ingest is incremental by default. A manifest stored next to the collection
+records each file's mtime, size and sha256 plus the content-hashed ids of
+its chunks, so a re-ingest only embeds chunks that are new and deletes the
+ones that disappeared. Chunks that kept their text but moved (start_index)
+or changed section get their stored metadata updated in place. A full
+rebuild happens when no manifest exists or when full=True is passed; it
+builds into a new versioned collection and activates it only once complete
+(see app.store), so chat never queries a half-built index.
+
+The pipeline is a chain of generators — load → split → embed → upsert —
+so memory stays bounded by the batch size rather than the corpus size.
+Files are loaded and split on a process pool (INGEST_WORKERS) with a bounded
+number in flight, chunks are embedded and upserted in batches as each file
+finishes, and INGEST_MEMORY_LIMIT_MB shrinks batches when RSS runs high.
+The response carries per-stage wall-clock timings and peak RSS.
 """
 
+import gc
+import hashlib
+import json
+import multiprocessing
 import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
+from typing import Callable, Iterator
 
-from app.config import CHROMA_PATH, DATA_PATH, CHUNK_SIZE, CHUNK_OVERLAP
+import numpy as np
 
+from app import lexical, store, titles, vector_index
+from app.config import (
+    DATA_PATH,
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    INGEST_BATCH_SIZE,
+    INGEST_MEMORY_LIMIT_MB,
+    INGEST_WORKERS,
+    VECTOR_BACKEND,
+)
 
-def _load_documents(data_path: str) -> list:
+_SUFFIXES = {".pdf", ".txt", ".md"}
+_MANIFEST_NAME = "manifest.json"
+_MANIFEST_VERSION = 1
+_HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*#*\s*$", re.MULTILINE)
+
+
+def _source_files(data_path: str) -> list[Path]:
+    return sorted(p for p in Path(data_path).rglob("*") if p.suffix in _SUFFIXES)
+
+
+def _load_file(fpath: Path) -> Iterator:
+    """Yield the file's documents lazily (one per page for PDFs)."""
     from langchain_community.document_loaders import PyPDFLoader, TextLoader
+    if fpath.suffix == ".pdf":
+        loader = PyPDFLoader(str(fpath))
+    else:
+        loader = TextLoader(str(fpath), encoding="utf-8")
+    return loader.lazy_load()
+
+
+def _load_documents(data_path: str) -> list:
     docs = []
-    for fpath in Path(data_path).rglob("*"):
-        if fpath.suffix == ".pdf":
-            loader = PyPDFLoader(str(fpath))
-        elif fpath.suffix in {".txt", ".md"}:
-            loader = TextLoader(str(fpath), encoding="utf-8")
-        else:
-            continue
-        docs.extend(loader.load())
+    for fpath in _source_files(data_path):
+        docs.extend(_load_file(fpath))
     return docs
 
 
-def ingest_documents() -> dict:
-    from langchain_community.vectorstores import Chroma
+def _split(docs: list, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> list:
     from langchain.text_splitter import RecursiveCharacterTextSplitter
-    from app.embeddings import OnnxEmbeddings
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        # Character offsets let app.context merge neighbouring chunks exactly
+        add_start_index=True,
+    )
+    return splitter.split_documents(docs)
+
+
+def _tag_sections(chunks: list) -> None:
+    """
+    Record the Markdown headings each chunk falls under as "sections"
+    metadata (newline-separated): the heading in effect where the chunk
+    starts plus any headings inside it. Feeds the project-title index.
+    """
+    current = None
+    for chunk in chunks:
+        headings = _HEADING.findall(chunk.page_content)
+        first_line = chunk.page_content.lstrip().split("\n", 1)[0]
+        sections = [] if current is None or _HEADING.match(first_line) else [current]
+        sections.extend(h for h in headings if h not in sections)
+        if sections:
+            chunk.metadata["sections"] = "\n".join(sections)
+        if headings:
+            current = headings[-1]
+
+
+def _parse_file(path: str, chunk_size: int, chunk_overlap: int) -> list:
+    """Load and split one file. Runs in a worker process when INGEST_WORKERS > 1."""
+    chunks = []
+    # Split page by page so a large PDF's full text is never held at once
+    for doc in _load_file(Path(path)):
+        chunks.extend(_split([doc], chunk_size, chunk_overlap))
+    _tag_sections(chunks)
+    return chunks
+
+
+def _parse_files(files: list[Path]) -> Iterator[tuple[Path, list]]:
+    """
+    Yield (file, chunks) in file order, parsing on a process pool if configured.
+
+    At most 2 * workers files are in flight, so a slow embed/upsert stage
+    stalls parsing instead of letting parsed chunks pile up in memory.
+    """
+    workers = min(INGEST_WORKERS, len(files))
+    if workers <= 1:
+        for fpath in files:
+            yield fpath, _parse_file(str(fpath), CHUNK_SIZE, CHUNK_OVERLAP)
+        return
+    # spawn, not fork: the server process holds ONNX and executor threads
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        remaining = iter(files)
+
+        def submit(fpath):
+            return fpath, pool.submit(_parse_file, str(fpath), CHUNK_SIZE, CHUNK_OVERLAP)
+
+        in_flight = deque(submit(f) for f in islice(remaining, 2 * workers))
+        while in_flight:
+            fpath, future = in_flight.popleft()
+            chunks = future.result()
+            nxt = next(remaining, None)
+            if nxt is not None:
+                in_flight.append(submit(nxt))
+            yield fpath, chunks
+
+
+def _rss_mb() -> float | None:
+    """Current resident set size in MB (Linux only; None elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class _StageTimer:
+    def __init__(self):
+        self.totals: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+
+    def timed(self, iterable, name: str):
+        """Re-yield iterable, charging the time spent producing each item to name."""
+        it = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def report(self) -> dict[str, float]:
+        return {name: round(seconds, 3) for name, seconds in self.totals.items()}
+
+
+class _Indexer:
+    """
+    Embed-and-upsert stage: buffers chunks and writes them in batches.
+
+    Batches start at INGEST_BATCH_SIZE. When INGEST_MEMORY_LIMIT_MB is set and
+    RSS goes over it, the buffer is flushed early and the batch size halved,
+    trading throughput for a flat memory profile.
+    """
+
+    def __init__(self, db, timer: _StageTimer, progress: Callable[..., None]):
+        self.db = db
+        self.timer = timer
+        self.progress = progress
+        self.count = 0
+        self.batch_size = INGEST_BATCH_SIZE
+        self.peak_rss_mb = _rss_mb()
+        self._embeddings = store.get_embeddings()
+        self._chunks: list = []
+        self._ids: list[str] = []
+
+    def add(self, chunks: list, ids: list[str]) -> None:
+        self._chunks.extend(chunks)
+        self._ids.extend(ids)
+        while len(self._chunks) >= self.batch_size or (self._chunks and self._over_limit()):
+            self._write(min(self.batch_size, len(self._chunks)))
+
+    def flush(self) -> None:
+        while self._chunks:
+            self._write(min(self.batch_size, len(self._chunks)))
+
+    def _over_limit(self) -> bool:
+        rss = _rss_mb()
+        if rss is not None:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, rss)
+        return bool(INGEST_MEMORY_LIMIT_MB) and rss is not None and rss > INGEST_MEMORY_LIMIT_MB
+
+    def memory_report(self) -> dict:
+        self._over_limit()
+        report = {"final_batch_size": self.batch_size}
+        if self.peak_rss_mb is not None:
+            report["peak_rss_mb"] = round(self.peak_rss_mb, 1)
+        return report
 
-    docs = _load_documents(DATA_PATH)
-    if not docs:
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        if hasattr(self._embeddings, "embed_documents_array"):
+            return self._embeddings.embed_documents_array(texts)
+        return np.asarray(self._embeddings.embed_documents(texts), dtype=np.float32)
+
+    def _write(self, n: int) -> None:
+        chunks, self._chunks = self._chunks[:n], self._chunks[n:]
+        ids, self._ids = self._ids[:n], self._ids[n:]
+        with self.timer.stage("embed"):
+            vectors = self._embed([c.page_content for c in chunks])
+        with self.timer.stage("upsert"):
+            # Write the float32 matrix straight to the collection instead of
+            # going through add_documents, which would re-embed the texts.
+            self.db._collection.upsert(
+                ids=ids,
+                embeddings=vectors,
+                documents=[c.page_content for c in chunks],
+                metadatas=[c.metadata or None for c in chunks],
+            )
+        self.count += n
+        self.progress(chunks_embedded=self.count)
+        del chunks, vectors
+        if self._over_limit():
+            gc.collect()
+            self.batch_size = max(1, self.batch_size // 2)
+
+
+def _file_sha256(fpath: Path) -> str:
+    h = hashlib.sha256()
+    with open(fpath, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _chunk_ids(chunks: list) -> list[str]:
+    """Content-addressed chunk ids: identical text in the same file keeps its id."""
+    seen: dict[tuple[str, str], int] = {}
+    ids = []
+    for chunk in chunks:
+        source = chunk.metadata.get("source", "unknown")
+        content_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+        n = seen.get((source, content_hash), 0)
+        seen[(source, content_hash)] = n + 1
+        key = f"{source}\0{content_hash}\0{n}".encode("utf-8")
+        ids.append(hashlib.sha256(key).hexdigest())
+    return ids
+
+
+def _refresh_metadata(db, chunks: list, ids: list[str]) -> int:
+    """
+    Rewrite the stored metadata of unchanged chunks whose position did change.
+
+    Chunk ids only cover the text, so an edit elsewhere in the file keeps the
+    id but shifts start_index (and, after a heading edit, "sections"). Keys a
+    chunk no longer has are cleared with None, since update() merges metadata.
+    Returns the number of chunks updated.
+    """
+    if not ids:
+        return 0
+    stored = db._collection.get(ids=ids, include=["metadatas"])
+    current = dict(zip(stored["ids"], stored["metadatas"] or []))
+    new = dict(zip(ids, (c.metadata or {} for c in chunks)))
+    stale_ids, metadatas = [], []
+    for chunk_id, meta in new.items():
+        old = current.get(chunk_id) or {}
+        if old == meta:
+            continue
+        stale_ids.append(chunk_id)
+        metadatas.append({**{k: None for k in old if k not in meta}, **meta})
+    if stale_ids:
+        db._collection.update(ids=stale_ids, metadatas=metadatas)
+    return len(stale_ids)
+
+
+def _manifest_path(collection: str) -> str:
+    return os.path.join(store.sidecar_dir(collection), _MANIFEST_NAME)
+
+
+def _read_manifest(collection: str) -> dict | None:
+    try:
+        with open(_manifest_path(collection), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != _MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def _write_manifest(collection: str, files: dict) -> None:
+    path = _manifest_path(collection)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": _MANIFEST_VERSION, "files": files}, f)
+    os.replace(tmp, path)
+
+
+def _file_entry(fpath: Path, chunk_ids: list[str]) -> dict:
+    st = fpath.stat()
+    return {
+        "mtime": st.st_mtime,
+        "size": st.st_size,
+        "sha256": _file_sha256(fpath),
+        "chunks": chunk_ids,
+    }
+
+
+def _build_sidecars(db, collection: str, timer: _StageTimer, progress: Callable[..., None]) -> None:
+    """Rebuild the in-memory indexes derived from a collection (see app.store.sidecar_dir)."""
+    progress(stage="sidecars")
+    with timer.stage("lexical"):
+        lexical.build_for(db, collection)
+    with timer.stage("titles"):
+        titles.build_for(db, collection)
+    if VECTOR_BACKEND == "numpy":
+        with timer.stage("vectors"):
+            vector_index.build_for(db, collection)
+    else:
+        # Not served from here; drop any stale copy instead of refreshing it
+        vector_index.remove_for(collection)
+
+
+def _full_rebuild(files: list[Path], timer: _StageTimer, progress: Callable[..., None]) -> dict:
+    # Build into a fresh collection while chat keeps reading the active one
+    collection = store.new_collection_name()
+    indexer = _Indexer(store.open_db(collection=collection), timer, progress)
+    by_source: dict[str, list[str]] = {}
+    progress(stage="indexing", files_total=len(files))
+    try:
+        for fpath, chunks in timer.timed(_parse_files(files), "parse"):
+            ids = _chunk_ids(chunks)
+            by_source[str(fpath)] = ids
+            if chunks:
+                indexer.add(chunks, ids)
+            progress(files_processed=len(by_source))
+        indexer.flush()
+        if indexer.count:
+            _build_sidecars(indexer.db, collection, timer, progress)
+    except BaseException:
+        store.drop_collection(collection)
+        raise
+
+    if indexer.count == 0:
+        store.drop_collection(collection)
         return {"status": "no_documents", "chunks": 0}
+    _write_manifest(collection, {str(f): _file_entry(f, by_source[str(f)]) for f in files})
+    progress(stage="swap")
+    removed = store.activate(indexer.db, collection)
 
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-    )
-    chunks = splitter.split_documents(docs)
+    return {
+        "status": "ok",
+        "mode": "full",
+        "chunks": indexer.count,
+        "sources": sorted(by_source),
+        "added": len(files),
+        "updated": 0,
+        "removed": 0,
+        "unchanged": 0,
+        "chunks_embedded": indexer.count,
+        "chunks_deleted": 0,
+        "collection": collection,
+        "collections_removed": removed,
+        **indexer.memory_report(),
+    }
 
-    embeddings = OnnxEmbeddings()
 
-    # Clear existing collection before re-ingesting to avoid duplicates
-    existing = Chroma(persist_directory=CHROMA_PATH, embedding_function=embeddings)
-    existing.delete_collection()
+def _incremental(files: list[Path], manifest: dict, timer: _StageTimer, progress: Callable[..., None]) -> dict:
+    old_files: dict = manifest["files"]
+    new_files: dict = {}
+    counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    refreshed = 0
+    changed: dict[str, tuple] = {}
+    to_delete: list[str] = []
 
-    Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=CHROMA_PATH,
-    )
+    progress(stage="scan", files_total=len(files))
+    with timer.stage("scan"):
+        for fpath in files:
+            source = str(fpath)
+            old = old_files.get(source)
+            st = fpath.stat()
+            if old and old["mtime"] == st.st_mtime and old["size"] == st.st_size:
+                new_files[source] = old
+                counts["unchanged"] += 1
+                continue
+
+            sha = _file_sha256(fpath)
+            if old and old["sha256"] == sha:
+                # Touched but not modified — refresh stat fields, keep chunks
+                new_files[source] = {**old, "mtime": st.st_mtime, "size": st.st_size}
+                counts["unchanged"] += 1
+                continue
+            changed[source] = (old, sha, st)
+
+    collection = store.active_collection()
+    indexer = _Indexer(store.get_db(), timer, progress)
+    changed_files = [f for f in files if str(f) in changed]
+    progress(stage="indexing", files_processed=len(files) - len(changed_files))
+    for fpath, chunks in timer.timed(_parse_files(changed_files), "parse"):
+        source = str(fpath)
+        old, sha, st = changed[source]
+        ids = _chunk_ids(chunks)
+        old_ids = set(old["chunks"]) if old else set()
+        fresh = [(c, i) for c, i in zip(chunks, ids) if i not in old_ids]
+        if fresh:
+            indexer.add([c for c, _ in fresh], [i for _, i in fresh])
+        kept = [(c, i) for c, i in zip(chunks, ids) if i in old_ids]
+        with timer.stage("metadata"):
+            refreshed += _refresh_metadata(indexer.db, [c for c, _ in kept], [i for _, i in kept])
+        to_delete.extend(old_ids - set(ids))
+        new_files[source] = {"mtime": st.st_mtime, "size": st.st_size, "sha256": sha, "chunks": ids}
+        counts["updated" if old else "added"] += 1
+        progress(files_processed=counts["unchanged"] + counts["added"] + counts["updated"])
+    indexer.flush()
+
+    for source, old in old_files.items():
+        if source not in new_files:
+            to_delete.extend(old["chunks"])
+            counts["removed"] += 1
 
-    sources = list({doc.metadata.get("source", "unknown") for doc in docs})
-    return {"status": "ok", "chunks": len(chunks), "sources": sources}
+    if to_delete:
+        progress(stage="delete")
+        with timer.stage("delete"):
+            indexer.db.delete(ids=to_delete)
+    # In place on the active collection: new chunks land before stale ones
+    # are deleted, so readers never see a file with no chunks at all.
+    if to_delete or indexer.count or refreshed:
+        _build_sidecars(indexer.db, collection, timer, progress)
+        store.mark_changed()
+    _write_manifest(collection, new_files)
+
+    return {
+        "status": "ok",
+        "mode": "incremental",
+        "chunks": sum(len(entry["chunks"]) for entry in new_files.values()),
+        "sources": sorted(new_files),
+        **counts,
+        "chunks_embedded": indexer.count,
+        "chunks_deleted": len(to_delete),
+        "chunks_refreshed": refreshed,
+        "collection": collection,
+        **indexer.memory_report(),
+    }
+
+
+def _no_progress(**fields) -> None:
+    pass
+
+
+def ingest_documents(full: bool = False, progress: Callable[..., None] | None = None) -> dict:
+    """
+    Ingest DATA_PATH into the vector store and return a summary.
+
+    progress, if given, is called with keyword updates (stage, files_total,
+    files_processed, chunks_embedded) as the pipeline advances.
+    """
+    progress = progress or _no_progress
+    timer = _StageTimer()
+    with timer.stage("scan"):
+        files = _source_files(DATA_PATH)
+    if not files:
+        return {"status": "no_documents", "chunks": 0}
+
+    manifest = None if full else _read_manifest(store.active_collection())
+    with timer.stage("total"):
+        if manifest is None:
+            result = _full_rebuild(files, timer, progress)
+        else:
+            result = _incremental(files, manifest, timer, progress)
+    result["workers"] = max(1, min(INGEST_WORKERS, len(files)))
+    result["timings"] = timer.report()
+    return result
 
 
 def list_sources() -> list[str]:
-    from langchain_community.vectorstores import Chroma
-    from app.embeddings import OnnxEmbeddings
-    embeddings = OnnxEmbeddings()
     try:
-        db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embeddings)
-        items = db.get(include=["metadatas"])
+        items = store.get_db().get(include=["metadatas"])
         sources = list({m.get("source", "unknown") for m in items["metadatas"]})
         return sorted(sources)
     except Exception:
@@ -0,0 +1,110 @@
+"""
+Background ingest jobs.
+
+POST /api/ingest starts ingest_documents() on a worker thread and returns a
+job id straight away; GET /api/ingest/{id} reports the job's stage, files
+processed, chunks embedded and throughput. Only one ingest runs at a time —
+starting another while one is queued or running raises IngestInProgress.
+Chat keeps reading from the shared store throughout; the new index only
+becomes visible when ingest swaps or updates it.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from app.ingest import ingest_documents
+
+# Finished jobs kept for status lookups
+_MAX_HISTORY = 20
+
+
+class IngestInProgress(Exception):
+    def __init__(self, job: "IngestJob"):
+        super().__init__(f"Ingest job {job.id} is already {job.status}")
+        self.job = job
+
+
+class IngestJob:
+    def __init__(self, full: bool):
+        self.id = uuid.uuid4().hex[:12]
+        self.full = full
+        self.status = "queued"
+        self.stage = "queued"
+        self.files_total = 0
+        self.files_processed = 0
+        self.chunks_embedded = 0
+        self.created_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.result: dict | None = None
+        self.error: str | None = None
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def update(self, **fields) -> None:
+        """Progress callback handed to ingest_documents()."""
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            return {
+                "job_id": self.id,
+                "status": self.status,
+                "stage": self.stage,
+                "full": self.full,
+                "files_total": self.files_total,
+                "files_processed": self.files_processed,
+                "chunks_embedded": self.chunks_embedded,
+                "elapsed_seconds": round(elapsed, 3),
+                "chunks_per_second": round(self.chunks_embedded / elapsed, 1) if elapsed else 0.0,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+_lock = threading.Lock()
+_jobs: OrderedDict[str, IngestJob] = OrderedDict()
+_current: IngestJob | None = None
+
+
+def start_ingest(full: bool = False) -> IngestJob:
+    """Queue an ingest on a background thread, or raise IngestInProgress."""
+    global _current
+    with _lock:
+        if _current is not None and _current.active:
+            raise IngestInProgress(_current)
+        job = IngestJob(full)
+        _current = job
+        _jobs[job.id] = job
+        while len(_jobs) > _MAX_HISTORY:
+            _jobs.popitem(last=False)
+    threading.Thread(target=_run, args=(job,), name=f"ingest-{job.id}", daemon=True).start()
+    return job
+
+
+def _run(job: IngestJob) -> None:
+    job.update(status="running", stage="starting", started_at=time.time())
+    try:
+        result = ingest_documents(full=job.full, progress=job.update)
+    except Exception as exc:
+        print(f"Ingest job {job.id} failed: {exc}", flush=True)
+        job.update(status="failed", stage="failed", error=str(exc), finished_at=time.time())
+    else:
+        job.update(status="done", stage="done", result=result, finished_at=time.time())
+    finally:
+        job.done.set()
+
+
+def get_job(job_id: str) -> IngestJob | None:
+    with _lock:
+        return _jobs.get(job_id)
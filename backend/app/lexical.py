@@ -0,0 +1,185 @@
+"""
+In-process BM25 index over the chunks of one index version.
+
+Postings are stored CSR-style in flat NumPy arrays: the postings of term t
+are postings[offsets[t]:offsets[t + 1]] (chunk numbers) with matching
+term_freqs, so a query touches only the postings of its own terms and scores
+every matching chunk with a few vectorized operations.
+
+The index is rebuilt from the collection at the end of every ingest and
+saved as a single .npz file in the version's sidecar directory (see
+app.store), so it is swapped, rolled back and garbage-collected together
+with the vectors. get_index() loads it once per store generation.
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app import store
+
+_FILE_NAME = "bm25.npz"
+_FORMAT_VERSION = 1
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(
+        self,
+        terms: list[str],
+        offsets: np.ndarray,
+        postings: np.ndarray,
+        term_freqs: np.ndarray,
+        doc_lengths: np.ndarray,
+        documents: list[str],
+        metadatas: list[dict],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ):
+        self.terms = terms
+        self.vocab = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.documents = documents
+        self.metadatas = metadatas
+        self.k1 = k1
+        self.b = b
+        avg = float(doc_lengths.mean()) if len(doc_lengths) else 1.0
+        # Per-chunk length normalization, precomputed once
+        self._norm = (k1 * (1 - b + b * doc_lengths / max(avg, 1e-9))).astype(np.float32)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @classmethod
+    def build(cls, documents: list[str], metadatas: list[dict]) -> "BM25Index":
+        vocab: dict[str, int] = {}
+        term_ids: list[int] = []
+        doc_ids: list[int] = []
+        freqs: list[int] = []
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for doc, text in enumerate(documents):
+            tokens = tokenize(text)
+            lengths[doc] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                term_ids.append(vocab.setdefault(term, len(vocab)))
+                doc_ids.append(doc)
+                freqs.append(tf)
+
+        term_arr = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_arr, kind="stable")
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_arr, minlength=len(vocab)), out=offsets[1:])
+        return cls(
+            terms=list(vocab),
+            offsets=offsets,
+            postings=np.asarray(doc_ids, dtype=np.int32)[order],
+            term_freqs=np.asarray(freqs, dtype=np.float32)[order],
+            doc_lengths=lengths,
+            documents=list(documents),
+            metadatas=[m or {} for m in metadatas],
+        )
+
+    @classmethod
+    def from_collection(cls, db) -> "BM25Index":
+        data = db._collection.get(include=["documents", "metadatas"])
+        return cls.build(data["documents"] or [], data["metadatas"] or [])
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Return up to k (chunk number, score) pairs, best first."""
+        n = len(self.documents)
+        scores = np.zeros(n, dtype=np.float32)
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            docs = self.postings[start:end]
+            tf = self.term_freqs[start:end]
+            idf = math.log(1 + (n - (end - start) + 0.5) / (end - start + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + self._norm[docs])
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(int(i), float(scores[i])) for i in hits]
+
+    def search_documents(self, query: str, k: int) -> list[Document]:
+        return [
+            Document(page_content=self.documents[i], metadata=self.metadatas[i])
+            for i, _ in self.search(query, k)
+        ]
+
+    def save(self, directory: str) -> None:
+        header = {
+            "version": _FORMAT_VERSION,
+            "terms": self.terms,
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+        }
+        path = os.path.join(directory, _FILE_NAME)
+        tmp = path + ".tmp"
+        # One file replaced atomically, so readers never pair arrays and
+        # texts from different builds.
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                header=np.frombuffer(json.dumps(header).encode("utf-8"), dtype=np.uint8),
+                offsets=self.offsets,
+                postings=self.postings,
+                term_freqs=self.term_freqs,
+                doc_lengths=self.doc_lengths,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, directory: str) -> "BM25Index | None":
+        try:
+            with np.load(os.path.join(directory, _FILE_NAME)) as data:
+                header = json.loads(data["header"].tobytes().decode("utf-8"))
+                if header.get("version") != _FORMAT_VERSION:
+                    return None
+                return cls(
+                    terms=header["terms"],
+                    offsets=data["offsets"],
+                    postings=data["postings"],
+                    term_freqs=data["term_freqs"],
+                    doc_lengths=data["doc_lengths"],
+                    documents=header["documents"],
+                    metadatas=header["metadatas"],
+                )
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def build_for(db, collection: str) -> BM25Index:
+    """Rebuild the lexical index of a collection and persist it in its sidecar dir."""
+    index = BM25Index.from_collection(db)
+    index.save(store.sidecar_dir(collection))
+    return index
+
+
+def _load(db) -> BM25Index:
+    collection = db._collection.name
+    index = BM25Index.load(store.sidecar_dir(collection, create=False))
+    if index is None:
+        print(f"Building lexical index for {collection}...", flush=True)
+        index = build_for(db, collection)
+    return index
+
+
+def get_index(db) -> BM25Index:
+    """Return the lexical index for the collection behind db (loaded once per generation)."""
+    return store.derived("lexical", db, _load)
@@ -0,0 +1,181 @@
+"""
+Process-wide Anthropic clients with pooled, keep-alive HTTP connections.
+
+One sync and one async client are built on first use and reused for every
+request, so the connection pool and TLS sessions survive across chats. Pool
+limits, timeouts and the SDK's retry count come from config. The FastAPI
+lifespan hook closes both clients on shutdown.
+
+Connection reuse is tracked with an httpx response hook: every response
+carries the network stream it was read from, and a stream seen before means
+the request rode an existing keep-alive connection. record_usage() keeps
+running token totals, including prompt-cache reads and writes.
+"""
+
+import threading
+import weakref
+
+import anthropic
+import httpx
+
+from app import metrics
+from app.config import (
+    ANTHROPIC_API_KEY,
+    ANTHROPIC_CONNECT_TIMEOUT,
+    ANTHROPIC_KEEPALIVE_EXPIRY,
+    ANTHROPIC_MAX_CONNECTIONS,
+    ANTHROPIC_MAX_KEEPALIVE,
+    ANTHROPIC_MAX_RETRIES,
+    ANTHROPIC_TIMEOUT,
+)
+
+_lock = threading.Lock()
+_client = None
+_async_client = None
+
+
+class _ConnectionStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._streams = weakref.WeakSet()
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+
+    def record(self, response: httpx.Response) -> None:
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self.requests += 1
+            if stream is None:
+                return
+            if stream in self._streams:
+                self.reused_connections += 1
+            else:
+                self._streams.add(stream)
+                self.new_connections += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": self.reused_connections,
+            }
+
+
+_stats = _ConnectionStats()
+
+_USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+_usage_lock = threading.Lock()
+_usage_totals = {"calls": 0, **{f: 0 for f in _USAGE_FIELDS}}
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=ANTHROPIC_MAX_CONNECTIONS,
+        max_keepalive_connections=ANTHROPIC_MAX_KEEPALIVE,
+        keepalive_expiry=ANTHROPIC_KEEPALIVE_EXPIRY,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(ANTHROPIC_TIMEOUT, connect=ANTHROPIC_CONNECT_TIMEOUT)
+
+
+async def _arecord(response: httpx.Response) -> None:
+    _stats.record(response)
+
+
+def get_client() -> anthropic.Anthropic:
+    """Return the shared sync Anthropic client."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = anthropic.Anthropic(
+                    api_key=ANTHROPIC_API_KEY,
+                    timeout=_timeout(),
+                    max_retries=ANTHROPIC_MAX_RETRIES,
+                    http_client=anthropic.DefaultHttpxClient(
+                        limits=_limits(),
+                        event_hooks={"response": [_stats.record]},
+                    ),
+                )
+    return _client
+
+
+def get_async_client() -> anthropic.AsyncAnthropic:
+    """Return the shared AsyncAnthropic client (bound to the serving event loop)."""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = anthropic.AsyncAnthropic(
+                    api_key=ANTHROPIC_API_KEY,
+                    timeout=_timeout(),
+                    max_retries=ANTHROPIC_MAX_RETRIES,
+                    http_client=anthropic.DefaultAsyncHttpxClient(
+                        limits=_limits(),
+                        event_hooks={"response": [_arecord]},
+                    ),
+                )
+    return _async_client
+
+
+def connection_stats() -> dict:
+    return _stats.snapshot()
+
+
+def record_usage(usage, round_index: int) -> dict:
+    """Log one Messages API call's token usage, add it to the running totals and return it."""
+    counts = {f: int(getattr(usage, f, 0) or 0) for f in _USAGE_FIELDS}
+    with _usage_lock:
+        _usage_totals["calls"] += 1
+        for field, value in counts.items():
+            _usage_totals[field] += value
+    print(
+        f"Claude usage round={round_index} input={counts['input_tokens']} "
+        f"output={counts['output_tokens']} "
+        f"cache_write={counts['cache_creation_input_tokens']} "
+        f"cache_read={counts['cache_read_input_tokens']}",
+        flush=True,
+    )
+    return counts
+
+
+def usage_stats() -> dict:
+    with _usage_lock:
+        return dict(_usage_totals)
+
+
+def _collect_metrics():
+    usage = usage_stats()
+    connections = connection_stats()
+    yield ("anthropic_calls_total", "counter", "Messages API calls with recorded usage.", [({}, usage["calls"])])
+    yield ("anthropic_tokens_total", "counter", "Tokens reported by the Messages API.",
+           [({"type": field}, usage[field]) for field in _USAGE_FIELDS])
+    yield ("anthropic_http_requests_total", "counter", "HTTP responses from the Anthropic API.",
+           [({}, connections["requests"])])
+    yield ("anthropic_connections_total", "counter", "Requests by new vs. reused keep-alive connection.",
+           [({"reused": "false"}, connections["new_connections"]),
+            ({"reused": "true"}, connections["reused_connections"])])
+
+
+metrics.register_collector("anthropic", _collect_metrics)
+
+
+async def aclose() -> None:
+    """Close both clients and their connection pools."""
+    global _client, _async_client
+    with _lock:
+        client, async_client = _client, _async_client
+        _client = _async_client = None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.close()
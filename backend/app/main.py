@@ -1,19 +1,53 @@
+"""
+FastAPI application.
+
+Importing this module stays cheap: anthropic, LangChain, Chroma and the ONNX
+model (app.rag, app.llm, app.ingest, app.jobs) are only imported inside the
+handlers that use them, and the lifespan hook loads the RAG stack on a
+background thread. /api/health therefore answers as soon as the server is up;
+/api/ready turns 200 once the model is warm. `python -m app.startup_profile`
+checks that no heavy module creeps back into the import path.
+"""
+
 import os
 import sys
+import threading
+from contextlib import asynccontextmanager
 
 print("=== main.py starting ===", flush=True)
 
 from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 
-from app.ingest import ingest_documents, list_sources
-from app.rag import retrieve_and_stream
+from app import admission, metrics, store
 
 print("=== imports done, creating FastAPI app ===", flush=True)
 
-app = FastAPI(title="jalin-rag-lab")
+
+def _warm_up() -> None:
+    # Import the RAG stack and warm the shared embeddings + Chroma handle. If
+    # it fails (e.g. model download blocked) the store retries lazily on first use.
+    try:
+        from app.rag import initialize_rag
+        initialize_rag()
+    except Exception as exc:
+        print(f"RAG warm-up failed: {exc}", flush=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    threading.Thread(target=_warm_up, name="rag-warm-up", daemon=True).start()
+    yield
+    # Only close the Anthropic client if something actually loaded it
+    llm = sys.modules.get("app.llm")
+    if llm is not None:
+        await llm.aclose()
+
+
+app = FastAPI(title="jalin-rag-lab", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,34 +70,129 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/api/ready")
+def ready():
+    """200 once the embedding model is loaded and warmed up, 503 until then."""
+    status = store.readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 _INGEST_SECRET = os.getenv("INGEST_SECRET", "")
 
 
-@app.post("/api/ingest")
-def ingest(authorization: str = Header(default="")):
+def _require_ingest_auth(authorization: str) -> None:
     if not _INGEST_SECRET or authorization != f"Bearer {_INGEST_SECRET}":
         raise HTTPException(status_code=401, detail="Unauthorized")
-    result = ingest_documents()
-    return result
+
+
+@app.post("/api/ingest", status_code=202)
+def ingest(full: bool = False, wait: bool = False, authorization: str = Header(default="")):
+    _require_ingest_auth(authorization)
+    from app import jobs
+    try:
+        job = jobs.start_ingest(full=full)
+    except jobs.IngestInProgress as exc:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(exc), "job_id": exc.job.id},
+        )
+    if wait:
+        # Opt-in synchronous mode for scripts that want the summary inline
+        job.done.wait()
+        if job.error:
+            raise HTTPException(status_code=500, detail=job.error)
+        return JSONResponse(job.result)
+    return job.to_dict()
+
+
+@app.get("/api/ingest/{job_id}")
+def ingest_status(job_id: str, authorization: str = Header(default="")):
+    _require_ingest_auth(authorization)
+    from app import jobs
+    job = jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown ingest job")
+    return job.to_dict()
+
+
+@app.get("/api/index")
+def index_versions(authorization: str = Header(default="")):
+    _require_ingest_auth(authorization)
+    return store.versions()
+
+
+@app.post("/api/index/rollback")
+def index_rollback(authorization: str = Header(default="")):
+    _require_ingest_auth(authorization)
+    try:
+        store.rollback()
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return store.versions()
+
+
+@app.get("/api/llm/connections")
+def llm_connections(authorization: str = Header(default="")):
+    _require_ingest_auth(authorization)
+    from app import llm
+    return llm.connection_stats()
+
+
+@app.get("/api/llm/usage")
+def llm_usage(authorization: str = Header(default="")):
+    _require_ingest_auth(authorization)
+    from app import llm
+    return llm.usage_stats()
+
+
+@app.get("/api/metrics")
+def prometheus_metrics():
+    """Stage latency histograms plus LLM, cache and batcher counters (Prometheus text format)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/api/documents")
 def documents():
+    from app.ingest import list_sources
     return {"sources": list_sources()}
 
 
 @app.post("/api/chat")
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     if not req.query.strip():
         raise HTTPException(status_code=400, detail="query must not be empty")
-
-    def event_stream():
-        for chunk in retrieve_and_stream(req.query):
-            safe = chunk.replace("\n", "\\n")
-            yield f"data: {safe}\n\n"
-        yield "data: [DONE]\n\n"
-
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    from app.rag import aretrieve_and_stream
+
+    # Admit (or refuse) before the stream starts, so saturation is a real status code
+    try:
+        slot = await admission.chat.acquire()
+    except admission.Rejected as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc),
+                            headers={"Retry-After": str(exc.retry_after)})
+
+    async def event_stream():
+        try:
+            async for chunk in aretrieve_and_stream(req.query):
+                safe = chunk.replace("\n", "\\n")
+                yield f"data: {safe}\n\n"
+            yield "data: [DONE]\n\n"
+        finally:
+            slot.release()
+
+    # Frees the slot if the client left before streaming began. Async so that
+    # Starlette runs it on the event loop, not the threadpool: gates are loop-only.
+    async def free_slot():
+        slot.release()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             background=BackgroundTask(free_slot))
+
+
+@app.get("/api/admission")
+def admission_stats(authorization: str = Header(default="")):
+    """Active holders, queue depth and rejections per admission gate."""
+    _require_ingest_auth(authorization)
+    return admission.stats()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,219 @@
+"""
+Request-level latency metrics, exposed in Prometheus text format.
+
+Every timed stage of a chat (query embedding, dense / lexical search, context
+build, time to first token, each LLM round, each tool round and tool call,
+total stream time) is observed into the rag_stage_seconds histogram. Stages
+timed while a Trace is active are also summed per request, and the trace is
+logged as one JSON line when the chat finishes, with its token usage.
+
+A Trace is attached to a thread with Trace.run(fn, ...), which is how the
+chat pipeline hands it to executor threads; stage() anywhere below that call
+(app.retrieval, the embedding batcher, tool execution) picks it up from a
+ContextVar. Outside a trace, stage() only feeds the histogram.
+
+Other modules contribute their counters (Anthropic tokens and connections,
+response cache, embedding batcher) by registering a collector; render() asks
+each one at scrape time, so nothing is computed on the hot path. An
+observation costs a perf_counter() pair, a bisect and a lock.
+"""
+
+import bisect
+import contextvars
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+# Seconds: sub-ms embedding lookups up to multi-second LLM rounds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("rag_trace", default=None)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, label: str, buckets: tuple = BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # label value -> [bucket counts..., +Inf count], sum
+        self._counts: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+
+    def observe(self, label_value: str, seconds: float) -> None:
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts = self._counts.get(label_value)
+            if counts is None:
+                counts = self._counts[label_value] = [0] * (len(self.buckets) + 1)
+                self._sums[label_value] = 0.0
+            counts[i] += 1
+            self._sums[label_value] += seconds
+
+    def snapshot(self) -> dict:
+        """{label value: {"count", "sum", "buckets": cumulative counts}}."""
+        with self._lock:
+            counts = {k: list(v) for k, v in self._counts.items()}
+            sums = dict(self._sums)
+        out = {}
+        for value, per_bucket in counts.items():
+            cumulative, total = [], 0
+            for c in per_bucket:
+                total += c
+                cumulative.append(total)
+            out[value] = {"count": total, "sum": sums[value], "buckets": cumulative}
+        return out
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for value, data in sorted(self.snapshot().items()):
+            label = f'{self.label}="{_escape(value)}"'
+            for bound, count in zip(self.buckets + (float("inf"),), data["buckets"]):
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{label},le="{le}"}} {count}')
+            lines.append(f"{self.name}_sum{{{label}}} {data['sum']:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {data['count']}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._sums.clear()
+
+
+stage_seconds = Histogram("rag_stage_seconds", "Time spent per chat pipeline stage.", "stage")
+_histograms: list[Histogram] = [stage_seconds]
+
+_outcome_lock = threading.Lock()
+_outcomes: dict[str, int] = {}
+
+# name -> callable returning [(metric, type, help, [(labels, value), ...]), ...]
+_collectors: dict[str, Callable[[], Iterable[tuple]]] = {}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Trace:
+    """Per-request stage totals, token usage and outcome."""
+
+    def __init__(self, kind: str = "chat"):
+        self.kind = kind
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+        self.tokens: dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.stages[name] = self.stages.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def record(self, name: str, seconds: float) -> None:
+        """Observe an externally measured duration (e.g. time to first token)."""
+        stage_seconds.observe(name, seconds)
+        self.add(name, seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def first_token(self) -> None:
+        """Record time to first token, once per request."""
+        if "ttft" not in self.stages:
+            self.record("ttft", self.elapsed())
+
+    def add_tokens(self, usage: dict) -> None:
+        with self._lock:
+            for field, value in usage.items():
+                self.tokens[field] = self.tokens.get(field, 0) + value
+
+    def run(self, fn, *args, **kwargs):
+        """Call fn with this trace active in the current thread."""
+        token = _current.set(self)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def finish(self, outcome: str) -> dict:
+        """Observe the total, count the outcome and log the trace as one line."""
+        total = self.elapsed()
+        stage_seconds.observe("total", total)
+        with _outcome_lock:
+            _outcomes[outcome] = _outcomes.get(outcome, 0) + 1
+        with self._lock:
+            summary = {
+                "kind": self.kind,
+                "outcome": outcome,
+                "total_ms": round(total * 1000, 1),
+                "stages_ms": {k: round(v * 1000, 1) for k, v in self.stages.items()},
+                "tokens": dict(self.tokens),
+            }
+        print(f"{self.kind} timing {json.dumps(summary)}", flush=True)
+        return summary
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block into the histogram and, if one is active, the current trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(name, elapsed)
+        trace = _current.get()
+        if trace is not None:
+            trace.add(name, elapsed)
+
+
+def register_histogram(histogram: Histogram) -> Histogram:
+    """Include another histogram in render() and reset()."""
+    _histograms.append(histogram)
+    return histogram
+
+
+def register_collector(name: str, collect: Callable[[], Iterable[tuple]]) -> None:
+    """Add (or replace) a source of extra metrics for render()."""
+    _collectors[name] = collect
+
+
+def render() -> str:
+    lines = [line for histogram in _histograms for line in histogram.render()]
+    with _outcome_lock:
+        outcomes = dict(_outcomes)
+    lines += ["# HELP rag_requests_total Chat requests by outcome.", "# TYPE rag_requests_total counter"]
+    lines += [f'rag_requests_total{{outcome="{_escape(k)}"}} {v}' for k, v in sorted(outcomes.items())]
+    for name, collect in list(_collectors.items()):
+        try:
+            families = list(collect())
+        except Exception as exc:
+            lines.append(f"# collector {name} failed: {_escape(exc)}")
+            continue
+        for metric, kind, help, samples in families:
+            lines += [f"# HELP {metric} {help}", f"# TYPE {metric} {kind}"]
+            for labels, value in samples:
+                label = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                lines.append(f"{metric}{{{label}}} {value}" if label else f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Clear all observations (tests)."""
+    for histogram in _histograms:
+        histogram.reset()
+    with _outcome_lock:
+        _outcomes.clear()
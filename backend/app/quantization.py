@@ -0,0 +1,78 @@
+"""
+Compact codes for chunk embeddings, used to shortlist rescoring candidates.
+
+Int8Codes stores each dimension as a signed byte with a per-dimension scale
+(4x smaller than float32) and approximates q·x from the codes. BinaryCodes
+keeps only the sign bit of each dimension, packed 8 per byte (32x smaller),
+and ranks by Hamming distance between sign patterns, which tracks the angle
+between vectors. Both score the corpus block by block so no float32 copy of
+the whole matrix is ever made.
+
+approx_scores() returns "lower is closer" values on an arbitrary scale; the
+caller takes the best few candidates and rescores them exactly against the
+full-precision vectors (see app.vector_index).
+"""
+
+import numpy as np
+
+# Rows scored per step: bounds the temporary float32 / uint8 buffers
+_BLOCK = 8192
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:  # NumPy < 2.0
+    _POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+    def _popcount(a):
+        return _POPCOUNT[a]
+
+
+class Int8Codes:
+    def __init__(self, vectors: np.ndarray, sq_norms: np.ndarray):
+        n, dim = vectors.shape
+        peak = np.zeros(dim, dtype=np.float32)
+        for start in range(0, n, _BLOCK):
+            np.maximum(peak, np.abs(vectors[start:start + _BLOCK]).max(axis=0), out=peak)
+        self.scale = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        self.codes = np.empty((n, dim), dtype=np.int8)
+        for start in range(0, n, _BLOCK):
+            block = np.asarray(vectors[start:start + _BLOCK], dtype=np.float32) / self.scale
+            self.codes[start:start + _BLOCK] = np.clip(np.rint(block), -127, 127)
+        self.sq_norms = sq_norms
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes + self.scale.nbytes)
+
+    def approx_scores(self, q: np.ndarray) -> np.ndarray:
+        """Approximate squared L2 distance (up to the constant ||q||²)."""
+        weighted = q * self.scale
+        dots = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), _BLOCK):
+            dots[start:start + _BLOCK] = self.codes[start:start + _BLOCK].astype(np.float32) @ weighted
+        return self.sq_norms - 2.0 * dots
+
+
+class BinaryCodes:
+    def __init__(self, vectors: np.ndarray, sq_norms: np.ndarray):
+        # sq_norms is unused: sign patterns only carry direction
+        n, dim = vectors.shape
+        self.codes = np.empty((n, (dim + 7) // 8), dtype=np.uint8)
+        for start in range(0, n, _BLOCK):
+            self.codes[start:start + _BLOCK] = np.packbits(vectors[start:start + _BLOCK] > 0, axis=1)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.codes.nbytes)
+
+    def approx_scores(self, q: np.ndarray) -> np.ndarray:
+        """Hamming distance between the sign bits of q and each row."""
+        bits = np.packbits(q > 0)
+        out = np.empty(len(self.codes), dtype=np.int32)
+        for start in range(0, len(self.codes), _BLOCK):
+            diff = np.bitwise_xor(self.codes[start:start + _BLOCK], bits)
+            out[start:start + _BLOCK] = _popcount(diff).sum(axis=1, dtype=np.int32)
+        return out
+
+
+QUANTIZERS = {"int8": Int8Codes, "binary": BinaryCodes}
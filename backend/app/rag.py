@@ -1,31 +1,49 @@
 """
-RAG chain: retrieve relevant chunks from Chroma, then stream a Claude response.
+RAG chain: retrieve relevant chunks (app.retrieval), assemble them into a
+deduplicated, token-budgeted context (app.context), then stream a Claude response.
+
+While round 1 streams, the get_project_details results for the projects named
+in the retrieved chunks are prepared on the tool pool; a tool call that
+resolves to one of them is answered from that prefetch in place. The prefetch
+is only used if it has already finished — the tool round never waits for it.
+
+Complete answers are kept in a ResponseCache keyed on the normalized query and
+replayed chunk-for-chunk on a hit. The cache is tied to the vector store
+generation, so any ingest that changes the index invalidates it.
+
+retrieve_and_stream is the synchronous generator; aretrieve_and_stream is the
+async variant used by /api/chat.
 """
 
-import anthropic
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from functools import partial
 
+from app import admission, llm, metrics, retrieval, store
+from app.batching import query_vector
+from app.context import build_context
 from app.config import (
-    ANTHROPIC_API_KEY,
-    CHROMA_PATH,
     CLAUDE_MODEL,
-    RETRIEVAL_K,
+    RAG_EXECUTOR_WORKERS,
+    RESPONSE_CACHE_SIMILARITY,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL,
+    TOOL_MAX_ABANDONED,
+    TOOL_MAX_WORKERS,
+    TOOL_PREFETCH_PROJECTS,
+    TOOL_PREFETCH_WORKERS,
+    TOOL_TIMEOUT,
 )
-from app.search_tools import TOOLS, execute_tool
-
-# Module-level cache — populated by initialize_rag() in the lifespan hook
-_embeddings = None
-_db = None
+from app.response_cache import ResponseCache
+from app.search_tools import TOOLS, Prefetch, execute_tool, prefetch_project_details
 
 
 def initialize_rag():
-    """Connect to ChromaDB with ONNX embeddings. Called lazily on first request."""
-    global _embeddings, _db
-    from langchain_community.vectorstores import Chroma
-    from app.embeddings import OnnxEmbeddings
-    print("Initializing ONNX embeddings...", flush=True)
-    _embeddings = OnnxEmbeddings()
-    print("Connecting to ChromaDB...", flush=True)
-    _db = Chroma(persist_directory=CHROMA_PATH, embedding_function=_embeddings)
+    """Warm the shared embeddings and Chroma handle. Called from the lifespan hook."""
+    store.initialize()
     print("RAG initialized.", flush=True)
 
 _SYSTEM_PROMPT = """\
@@ -109,87 +127,462 @@ Extract only what's in the tool result. Do not invent features.
 """
 
 
-def _build_context(docs: list) -> str:
-    parts = []
-    for i, doc in enumerate(docs, 1):
-        source = doc.metadata.get("source", "unknown")
-        parts.append(f"[{i}] (source: {source})\n{doc.page_content}")
-    return "\n\n---\n\n".join(parts)
+# ── Prompt caching ─────────────────────────────────────────────────────────────
+#
+# Every round of the agentic loop resends tools, system prompt and the
+# retrieved context. Marking each with an ephemeral cache_control breakpoint
+# lets rounds 2+ (and repeat visitors, for the static prefix) read them from
+# Anthropic's prompt cache instead of reprocessing them. The forced synthesis
+# call keeps the same tools (with tool_choice "none") so its prefix still
+# matches the cache.
+
+_CACHE_CONTROL = {"type": "ephemeral"}
+_SYSTEM = [{"type": "text", "text": _SYSTEM_PROMPT, "cache_control": _CACHE_CONTROL}]
+_CACHED_TOOLS = TOOLS[:-1] + [{**TOOLS[-1], "cache_control": _CACHE_CONTROL}]
+_SYNTHESIS_TOOLS = {"tools": _CACHED_TOOLS, "tool_choice": {"type": "none"}}
+
+
+def _user_message(context: str, query: str) -> dict:
+    return {
+        "role": "user",
+        "content": [
+            {"type": "text", "text": f"Context:\n{context}", "cache_control": _CACHE_CONTROL},
+            {"type": "text", "text": f"Question: {query}"},
+        ],
+    }
 
 
 MAX_ROUNDS = 2
 
+response_cache = ResponseCache(
+    max_size=RESPONSE_CACHE_SIZE,
+    ttl=RESPONSE_CACHE_TTL,
+    similarity=RESPONSE_CACHE_SIMILARITY,
+    embed=lambda q: query_vector(store.get_embeddings(), q),
+    version=store.current_generation,
+)
+
+
+def _collect_cache_metrics():
+    yield ("rag_response_cache_lookups_total", "counter", "Response cache lookups by result.",
+           [({"result": "hit"}, response_cache.hits), ({"result": "miss"}, response_cache.misses)])
+    yield ("rag_response_cache_entries", "gauge", "Answers held in the response cache.",
+           [({}, len(response_cache))])
+
+
+metrics.register_collector("response_cache", _collect_cache_metrics)
+
+_prefetch_lock = threading.Lock()
+_prefetch_stats = {"hit": 0, "miss": 0, "not_ready": 0}
+
+
+def _collect_prefetch_metrics():
+    with _prefetch_lock:
+        stats = dict(_prefetch_stats)
+    yield ("rag_tool_prefetch_total", "counter", "Tool calls answered from the round-1 prefetch, by result.",
+           [({"result": result}, n) for result, n in stats.items()])
+
+
+metrics.register_collector("tool_prefetch", _collect_prefetch_metrics)
+
 
 def retrieve_and_stream(query: str):
     """Yield text chunks from Claude as a generator (for SSE)."""
+    trace = metrics.Trace()
+    # Anything that stops the generator early (client gone) counts as aborted
+    outcome = "aborted"
     try:
-        if _db is None:
-            initialize_rag()
-        docs = _db.similarity_search(query, k=RETRIEVAL_K)
+        with trace.stage("cache_lookup"):
+            cached = trace.run(response_cache.get, query)
+        if cached is not None:
+            yield from cached
+            outcome = "cache_hit"
+            return
+
+        chunks = []
+        answer = _answer(query, trace)
+        try:
+            while True:
+                chunk = next(answer)
+                chunks.append(chunk)
+                yield chunk
+        except StopIteration as stop:
+            outcome = "ok" if stop.value else "error"
+            # Only complete, error-free answers are cached
+            if stop.value:
+                response_cache.put(query, chunks)
+    finally:
+        trace.finish(outcome)
+
+
+# Tool calls from one round run concurrently on this pool (shared by both pipelines)
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="tool")
+# Round-1 prefetches get their own small pool so they never delay a real tool call
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=max(1, TOOL_PREFETCH_WORKERS), thread_name_prefix="tool-prefetch"
+)
+
+
+def _tool_result(block) -> dict:
+    try:
+        with metrics.stage("execute_tool"):
+            content = execute_tool(block.name, block.input)
+        return {
+            "type": "tool_result",
+            "tool_use_id": block.id,
+            "content": content,
+        }
+    except Exception as exc:
+        return {
+            "type": "tool_result",
+            "tool_use_id": block.id,
+            "content": f"Tool execution failed: {exc}",
+            "is_error": True,
+        }
+
+
+def _assistant_turn(final) -> dict:
+    # Resend response blocks as plain dicts: the SDK serializes its own
+    # response models with model_dump(by_alias=None), which pydantic 2.10 rejects
+    content = [b.to_dict() if hasattr(b, "to_dict") else b for b in final.content]
+    return {"role": "assistant", "content": content}
+
+
+def _prefetch(docs, trace: metrics.Trace) -> Prefetch | None:
+    if TOOL_PREFETCH_PROJECTS <= 0:
+        return None
+    try:
+        with trace.stage("tool_prefetch"):
+            return prefetch_project_details(docs, TOOL_PREFETCH_PROJECTS)
+    except Exception as exc:
+        print(f"Tool prefetch failed: {exc}", flush=True)
+        return None
+
+
+def _finished_prefetch(future) -> Prefetch | None:
+    """The prefetch if it has already finished; a tool round never waits for it."""
+    if future.done() and not future.cancelled():
+        return future.result()
+    # Still queued behind other requests' prefetches: drop it, run the tools now
+    future.cancel()
+    with _prefetch_lock:
+        _prefetch_stats["not_ready"] += 1
+    return None
+
+
+def _prefetched_result(block, prefetch: Prefetch | None) -> dict | None:
+    """The tool_result for block from the prefetch, or None if it has to run."""
+    if prefetch is None:
+        return None
+    content = prefetch.get(block.name, block.input)
+    with _prefetch_lock:
+        _prefetch_stats["miss" if content is None else "hit"] += 1
+    if content is None:
+        return None
+    return {"type": "tool_result", "tool_use_id": block.id, "content": content}
+
+
+def _busy_message(exc: "admission.Rejected") -> str:
+    return f"The assistant is busy right now. Please try again in {exc.retry_after} seconds."
+
+
+def _call(fn, *args):
+    return fn(*args)
+
+
+def _error_result(block, message: str) -> dict:
+    return {"type": "tool_result", "tool_use_id": block.id, "content": message, "is_error": True}
+
+
+def _timeout_result(block) -> dict:
+    return _error_result(block, f"Tool execution timed out after {TOOL_TIMEOUT:g}s")
+
+
+# Timed-out tool calls whose threads are still running. Python threads cannot
+# be stopped, so a hung call keeps its pool thread until it returns by itself.
+_abandoned_lock = threading.Lock()
+_abandoned = 0
+
+
+def _abandon(future) -> None:
+    """Give up on a timed-out call; it stays counted until its thread is free."""
+    global _abandoned
+    if future.cancel():
+        return  # never started, so it holds no thread
+    with _abandoned_lock:
+        _abandoned += 1
+    future.add_done_callback(_reclaim)
+
+
+def _reclaim(_future) -> None:
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned -= 1
+
+
+def _pool_exhausted() -> bool:
+    return _abandoned >= TOOL_MAX_ABANDONED > 0
+
+
+def _collect_tool_metrics():
+    yield ("rag_tool_abandoned", "gauge", "Timed-out tool calls still holding a pool thread.",
+           [({}, _abandoned)])
+
+
+metrics.register_collector("tools", _collect_tool_metrics)
+
+
+def _submit_tool(run, block):
+    """Start a tool call on the pool, or None when hung calls already fill it."""
+    if _pool_exhausted():
+        return None
+    return _tool_executor.submit(run, _tool_result, block)
+
+
+def _unavailable_result(block) -> dict:
+    return _error_result(block, "Tool unavailable: earlier calls are still running, try again shortly")
+
+
+def _run_tools(blocks: list, trace: metrics.Trace | None = None,
+               prefetch: Prefetch | None = None) -> list[dict]:
+    """
+    Run a round's tool calls concurrently; results keep the order of blocks.
+
+    TOOL_TIMEOUT bounds how long the round waits, not the work: a timed-out
+    call is answered with an error and abandoned, and its thread runs on
+    until the tool returns. While TOOL_MAX_ABANDONED such calls are still
+    running, new calls get an error result instead of a pool thread.
+    """
+    run = trace.run if trace is not None else _call
+    results = [_prefetched_result(b, prefetch) for b in blocks]
+    futures = [_submit_tool(run, b) if result is None else None for b, result in zip(blocks, results)]
+    for i, (b, future) in enumerate(zip(blocks, futures)):
+        if results[i] is None and future is None:
+            results[i] = _unavailable_result(b)
+    # One deadline for the round: every call gets TOOL_TIMEOUT from submission
+    deadline = time.monotonic() + TOOL_TIMEOUT
+    for i, (b, future) in enumerate(zip(blocks, futures)):
+        if future is None:
+            continue
+        try:
+            results[i] = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FuturesTimeout:
+            _abandon(future)
+            results[i] = _timeout_result(b)
+    return results
+
+
+async def _arun_tools(blocks: list, trace: metrics.Trace | None = None,
+                      prefetch: Prefetch | None = None) -> list[dict]:
+    """Async counterpart of _run_tools (same timeout semantics); gather() keeps the order of blocks."""
+    run = trace.run if trace is not None else _call
+
+    async def run_one(block):
+        hit = _prefetched_result(block, prefetch)
+        if hit is not None:
+            return hit
+        future = _submit_tool(run, block)
+        if future is None:
+            return _unavailable_result(block)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), TOOL_TIMEOUT)
+        except asyncio.TimeoutError:
+            _abandon(future)
+            return _timeout_result(block)
+
+    return list(await asyncio.gather(*(run_one(b) for b in blocks)))
+
+
+def _answer(query: str, trace: metrics.Trace):
+    """Stream the answer for query; returns True if it completed without error."""
+    try:
+        with trace.stage("retrieve"):
+            docs = trace.run(retrieval.retrieve, query)
     except Exception as exc:
         print(f"RAG init/retrieval error: {exc}", flush=True)
         yield f"Error initializing knowledge base: {exc}"
-        return
+        return False
 
     if not docs:
         yield "No relevant documents found in the knowledge base."
-        return
+        return False
 
-    context = _build_context(docs)
-    user_message = f"Context:\n{context}\n\nQuestion: {query}"
-    messages = [{"role": "user", "content": user_message}]
+    with trace.stage("context_build"):
+        messages = [_user_message(build_context(docs), query)]
+    # Usually done long before round 1 ends; the tool round never waits for it
+    prefetch = _prefetch_executor.submit(_prefetch, docs, trace)
 
     try:
-        client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+        client = llm.get_client()
 
-        for _ in range(MAX_ROUNDS):
-            with client.messages.stream(
+        for round_index in range(MAX_ROUNDS):
+            with trace.stage("llm_round"), client.messages.stream(
                 model=CLAUDE_MODEL,
                 max_tokens=4096,
-                system=_SYSTEM_PROMPT,
-                tools=TOOLS,
+                system=_SYSTEM,
+                tools=_CACHED_TOOLS,
                 messages=messages,
             ) as stream:
                 for text in stream.text_stream:
+                    trace.first_token()
                     yield text
                 final = stream.get_final_message()
+            trace.add_tokens(llm.record_usage(final.usage, round_index))
 
             if final.stop_reason != "tool_use":
-                return
+                return True
 
             tool_use_blocks = [b for b in final.content if b.type == "tool_use"]
-            tool_result_blocks = []
-            for b in tool_use_blocks:
-                try:
-                    result_content = execute_tool(b.name, b.input)
-                    tool_result_blocks.append({
-                        "type": "tool_result",
-                        "tool_use_id": b.id,
-                        "content": result_content,
-                    })
-                except Exception as exc:
-                    tool_result_blocks.append({
-                        "type": "tool_result",
-                        "tool_use_id": b.id,
-                        "content": f"Tool execution failed: {exc}",
-                        "is_error": True,
-                    })
+            with trace.stage("tool_round"):
+                tool_result_blocks = _run_tools(tool_use_blocks, trace, _finished_prefetch(prefetch))
 
             messages = messages + [
-                {"role": "assistant", "content": final.content},
+                _assistant_turn(final),
                 {"role": "user", "content": tool_result_blocks},
             ]
 
         # Round cap hit — force a final streaming synthesis
-        with client.messages.stream(
+        with trace.stage("llm_round"), client.messages.stream(
             model=CLAUDE_MODEL,
             max_tokens=4096,
-            system=_SYSTEM_PROMPT,
+            system=_SYSTEM,
+            **_SYNTHESIS_TOOLS,
             messages=messages,
         ) as stream:
             for text in stream.text_stream:
+                trace.first_token()
                 yield text
+            final = stream.get_final_message()
+        trace.add_tokens(llm.record_usage(final.usage, MAX_ROUNDS))
+        return True
+
+    except Exception as exc:
+        print(f"Claude streaming error: {exc}", flush=True)
+        yield f"Error generating response: {exc}"
+        return False
+
+
+# ── Async pipeline ─────────────────────────────────────────────────────────────
+#
+# Same flow as retrieve_and_stream, but the Claude stream runs on
+# AsyncAnthropic and the blocking pieces (Chroma search, embeddings, tool
+# execution) are offloaded to a bounded thread pool, so one event loop can
+# hold many concurrent SSE streams without pinning a worker thread each.
+
+_executor = ThreadPoolExecutor(max_workers=RAG_EXECUTOR_WORKERS, thread_name_prefix="rag")
+
+
+async def _run_blocking(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(fn, *args, **kwargs))
 
+
+async def aretrieve_and_stream(query: str):
+    """Async counterpart of retrieve_and_stream (for SSE under an event loop)."""
+    trace = metrics.Trace()
+    result = "aborted"
+    try:
+        with trace.stage("cache_lookup"):
+            cached = await _run_blocking(trace.run, response_cache.get, query)
+        if cached is not None:
+            for chunk in cached:
+                yield chunk
+            result = "cache_hit"
+            return
+
+        chunks = []
+        outcome = {"ok": False}
+        async for chunk in _aanswer(query, outcome, trace):
+            chunks.append(chunk)
+            yield chunk
+        result = "ok" if outcome["ok"] else outcome.get("result", "error")
+        # Only complete, error-free answers are cached
+        if outcome["ok"]:
+            await _run_blocking(response_cache.put, query, chunks)
+    finally:
+        trace.finish(result)
+
+
+async def _aanswer(query: str, outcome: dict, trace: metrics.Trace):
+    """Async generators cannot return a value — success is reported via outcome["ok"]."""
+    try:
+        async with admission.embedding.hold(trace):
+            with trace.stage("retrieve"):
+                docs = await _run_blocking(trace.run, retrieval.retrieve, query)
+    except admission.Rejected as exc:
+        print(f"RAG retrieval rejected: {exc}", flush=True)
+        outcome["result"] = "rejected"
+        yield _busy_message(exc)
+        return
+    except Exception as exc:
+        print(f"RAG init/retrieval error: {exc}", flush=True)
+        yield f"Error initializing knowledge base: {exc}"
+        return
+
+    if not docs:
+        yield "No relevant documents found in the knowledge base."
+        return
+
+    with trace.stage("context_build"):
+        # Deduplication looks up chunk embeddings, so keep it off the loop
+        context = await _run_blocking(build_context, docs)
+        messages = [_user_message(context, query)]
+    loop = asyncio.get_running_loop()
+    prefetch = loop.run_in_executor(_prefetch_executor, _prefetch, docs, trace)
+
+    try:
+        client = llm.get_async_client()
+
+        for round_index in range(MAX_ROUNDS):
+            async with admission.llm.hold(trace):
+                with trace.stage("llm_round"):
+                    async with client.messages.stream(
+                        model=CLAUDE_MODEL,
+                        max_tokens=4096,
+                        system=_SYSTEM,
+                        tools=_CACHED_TOOLS,
+                        messages=messages,
+                    ) as stream:
+                        async for text in stream.text_stream:
+                            trace.first_token()
+                            yield text
+                        final = await stream.get_final_message()
+            trace.add_tokens(llm.record_usage(final.usage, round_index))
+
+            if final.stop_reason != "tool_use":
+                outcome["ok"] = True
+                return
+
+            tool_use_blocks = [b for b in final.content if b.type == "tool_use"]
+            with trace.stage("tool_round"):
+                tool_result_blocks = await _arun_tools(tool_use_blocks, trace, _finished_prefetch(prefetch))
+
+            messages = messages + [
+                _assistant_turn(final),
+                {"role": "user", "content": tool_result_blocks},
+            ]
+
+        # Round cap hit — force a final streaming synthesis
+        async with admission.llm.hold(trace):
+            with trace.stage("llm_round"):
+                async with client.messages.stream(
+                    model=CLAUDE_MODEL,
+                    max_tokens=4096,
+                    system=_SYSTEM,
+                    **_SYNTHESIS_TOOLS,
+                    messages=messages,
+                ) as stream:
+                    async for text in stream.text_stream:
+                        trace.first_token()
+                        yield text
+                    final = await stream.get_final_message()
+        trace.add_tokens(llm.record_usage(final.usage, MAX_ROUNDS))
+        outcome["ok"] = True
+
+    except admission.Rejected as exc:
+        print(f"Claude round rejected: {exc}", flush=True)
+        outcome["result"] = "rejected"
+        yield _busy_message(exc)
     except Exception as exc:
         print(f"Claude streaming error: {exc}", flush=True)
         yield f"Error generating response: {exc}"
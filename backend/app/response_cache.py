@@ -0,0 +1,118 @@
+"""
+In-process cache of complete chat answers, keyed on the normalized query.
+
+Entries expire after a TTL and the least recently used entry is evicted once
+max_size is reached. When a similarity threshold and an embed function are
+given, a query that misses on its exact key is matched against the cached
+query embeddings (cosine similarity on unit vectors) to catch near-duplicate
+phrasings. The cache clears itself whenever version() changes, which ties it
+to the vector store generation so a re-ingest never serves stale answers.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+_PUNCT = re.compile(r"[^\w\s]")
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(_PUNCT.sub(" ", query.lower()).split())
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        similarity: float = 0.0,
+        embed: Optional[Callable[[str], np.ndarray]] = None,
+        version: Callable[[], int] = lambda: 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.similarity = similarity
+        self._embed = embed if similarity > 0 else None
+        self._version_fn = version
+        self._version = version()
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expires_at, chunks, query vector or None)
+        self._entries: OrderedDict[str, tuple] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _check_version(self) -> None:
+        version = self._version_fn()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def _purge_expired(self, now: float) -> None:
+        for key in [k for k, (exp, _, _) in self._entries.items() if exp <= now]:
+            del self._entries[key]
+
+    def _vector(self, key: str) -> Optional[np.ndarray]:
+        if self._embed is None:
+            return None
+        try:
+            return self._embed(key)
+        except Exception as exc:
+            # Similarity matching is best-effort; fall back to exact keys
+            print(f"Response cache embedding failed: {exc}", flush=True)
+            return None
+
+    def get(self, query: str) -> Optional[list[str]]:
+        if not self.enabled:
+            return None
+        key = normalize_query(query)
+        vector = self._vector(key)
+        with self._lock:
+            self._check_version()
+            now = self._clock()
+            self._purge_expired(now)
+            if key not in self._entries and vector is not None:
+                key = self._nearest(vector) or key
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[1])
+
+    def _nearest(self, vector: np.ndarray) -> Optional[str]:
+        candidates = [(k, e[2]) for k, e in self._entries.items() if e[2] is not None]
+        if not candidates:
+            return None
+        scores = np.stack([v for _, v in candidates]) @ vector
+        best = int(np.argmax(scores))
+        return candidates[best][0] if scores[best] >= self.similarity else None
+
+    def put(self, query: str, chunks: list[str]) -> None:
+        if not self.enabled:
+            return
+        key = normalize_query(query)
+        vector = self._vector(key)
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (self._clock() + self.ttl, list(chunks), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,83 @@
+"""
+Chunk retrieval for chat: dense (Chroma), lexical (BM25) or hybrid.
+
+Hybrid mode pulls HYBRID_CANDIDATES chunks from each retriever and merges
+the two rankings with reciprocal-rank fusion, so exact names such as
+"Pawfect Pet Grooming" surface through BM25 even when the embedding ranks
+them low. If the lexical index cannot be loaded, retrieval falls back to
+dense search rather than failing the chat.
+
+Dense search runs on Chroma or on the exact NumPy matrix in
+app.vector_index, selected by VECTOR_BACKEND.
+"""
+
+from app import lexical, metrics, store, vector_index
+from app.config import HYBRID_CANDIDATES, RETRIEVAL_K, RETRIEVAL_MODE, RRF_K, VECTOR_BACKEND
+
+MODES = ("dense", "lexical", "hybrid")
+BACKENDS = ("chroma", "numpy")
+
+
+def dense_backend(db, backend: str | None = None):
+    """Return the object whose similarity_search() serves dense retrieval."""
+    backend = backend or VECTOR_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vector backend {backend!r}; expected one of {BACKENDS}")
+    if backend == "chroma":
+        return db
+    try:
+        return vector_index.get_store(db)
+    except Exception as exc:
+        print(f"NumPy vector store unavailable, using Chroma: {exc}", flush=True)
+        return db
+
+
+def _key(doc) -> tuple:
+    return doc.metadata.get("source"), doc.page_content
+
+
+def reciprocal_rank_fusion(rankings: list[list], k: int, rrf_k: int = RRF_K) -> list:
+    """Merge ranked Document lists; each list contributes 1 / (rrf_k + rank)."""
+    scores: dict[tuple, float] = {}
+    docs: dict[tuple, object] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = _key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    best = sorted(scores, key=scores.__getitem__, reverse=True)[:k]
+    return [docs[key] for key in best]
+
+
+def retrieve(query: str, k: int = RETRIEVAL_K, mode: str | None = None, backend: str | None = None) -> list:
+    """Return the top k chunks for query as LangChain Documents."""
+    mode = mode or RETRIEVAL_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown retrieval mode {mode!r}; expected one of {MODES}")
+    db = store.get_db()
+    vectors = dense_backend(db, backend) if mode != "lexical" else db
+    if mode == "dense":
+        return _dense(vectors, query, k)
+
+    try:
+        index = lexical.get_index(db)
+    except Exception as exc:
+        print(f"Lexical index unavailable, using dense retrieval: {exc}", flush=True)
+        return _dense(vectors, query, k)
+    if mode == "lexical":
+        return _lexical(index, query, k)
+
+    depth = max(k, HYBRID_CANDIDATES)
+    dense = _dense(vectors, query, depth)
+    return reciprocal_rank_fusion([dense, _lexical(index, query, depth)], k)
+
+
+def _dense(vectors, query: str, k: int) -> list:
+    # Includes embedding the query, which is also timed on its own as embed_query
+    with metrics.stage("dense_search"):
+        return vectors.similarity_search(query, k=k)
+
+
+def _lexical(index, query: str, k: int) -> list:
+    with metrics.stage("lexical_search"):
+        return index.search_documents(query, k)
@@ -1,8 +1,16 @@
 """
 Tool definitions and execution logic for Claude tool use.
+
+get_project_details resolves the project through the in-memory title index
+(app.titles) and only falls back to vector search when no title matches.
+
+prefetch_project_details prepares the results for the projects the retrieved
+chunks fall under, so the chat pipeline can answer a matching tool call
+without another executor round-trip (and without building the title index
+on the critical path after an ingest).
 """
 
-from app.config import CHROMA_PATH
+from app import store, titles
 
 
 TOOLS = [
@@ -33,19 +41,70 @@ TOOLS = [
 ]
 
 
+def _lookup_title(db, project_title: str) -> list[tuple[str, str]] | None:
+    try:
+        match = titles.get_index(db).lookup(project_title)
+    except Exception as exc:
+        print(f"Title index unavailable: {exc}", flush=True)
+        return None
+    if match is None:
+        return None
+    return [(chunk["source"], chunk["text"]) for chunk in match[1]]
+
+
+def _format(found: list[tuple[str, str]]) -> str:
+    return "\n\n---\n\n".join(f"(source: {source})\n{text}" for source, text in found)
+
+
 def _get_project_details(project_title: str) -> str:
-    from langchain_community.vectorstores import Chroma
-    from app.embeddings import OnnxEmbeddings
-    embeddings = OnnxEmbeddings()
-    db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embeddings)
-    docs = db.similarity_search(project_title, k=3)
-    if not docs:
+    db = store.get_db()
+    found = _lookup_title(db, project_title)
+    if found is None:
+        docs = db.similarity_search(project_title, k=3)
+        found = [(doc.metadata.get("source", "unknown"), doc.page_content) for doc in docs]
+    if not found:
         return f"No information found for project: {project_title}"
-    parts = []
+    return _format(found)
+
+
+def mentioned_projects(docs) -> list[str]:
+    """Titles of the projects the docs fall under (their "Project NN:" headings), in rank order."""
+    found = []
     for doc in docs:
-        source = doc.metadata.get("source", "unknown")
-        parts.append(f"(source: {source})\n{doc.page_content}")
-    return "\n\n---\n\n".join(parts)
+        for heading in (doc.metadata.get("sections") or "").split("\n"):
+            parsed = titles.project_aliases(heading)
+            if parsed is not None and parsed[0] not in found:
+                found.append(parsed[0])
+    return found
+
+
+class Prefetch:
+    """get_project_details results computed ahead of the tool call, keyed by project title."""
+
+    def __init__(self, index: titles.TitleIndex, results: dict[str, str]):
+        self.index = index
+        self.results = results
+
+    def get(self, name: str, inputs: dict) -> str | None:
+        """The result execute_tool(name, inputs) would return, if it was prefetched."""
+        if name != "get_project_details" or not isinstance(inputs, dict):
+            return None
+        match = self.index.lookup(str(inputs.get("project_title", "")))
+        return self.results.get(match[0]) if match is not None else None
+
+
+def prefetch_project_details(docs, limit: int) -> Prefetch | None:
+    """Prepare get_project_details for up to limit projects named in docs."""
+    mentioned = mentioned_projects(docs)[:limit]
+    if not mentioned:
+        return None
+    index = titles.get_index(store.get_db())
+    results = {
+        title: _format([(chunk["source"], chunk["text"]) for chunk in index.projects[title]["chunks"]])
+        for title in mentioned
+        if title in index.projects
+    }
+    return Prefetch(index, results) if results else None
 
 
 def execute_tool(name: str, inputs: dict) -> str:
@@ -0,0 +1,100 @@
+"""
+Import-time profile of the API process.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+reports per-module self / cumulative import times (ms), slowest first, plus
+any heavy dependency that got imported on the way. app.main is meant to load
+anthropic, LangChain, Chroma and ONNX Runtime lazily, so a heavy module
+showing up here is a cold-start regression.
+
+    python -m app.startup_profile                  # JSON report
+    python -m app.startup_profile --budget-ms 1500 # also fail over budget
+
+Exits 1 if a heavy module is imported or the total exceeds --budget-ms.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+# Top-level packages that must not load while app.main is imported
+HEAVY_MODULES = (
+    "anthropic",
+    "chromadb",
+    "langchain",
+    "langchain_community",
+    "langchain_core",
+    "numpy",
+    "onnxruntime",
+    "tokenizers",
+)
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str) -> list[dict]:
+    """Parse -X importtime output into [{"module", "self_ms", "cumulative_ms", "depth"}]."""
+    modules = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        modules.append({
+            "module": name,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+            "depth": (len(indent) - 1) // 2,
+        })
+    return modules
+
+
+def profile(target: str = "app.main", top: int = 25) -> dict:
+    """Import target in a fresh interpreter and summarize where the time went."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=_BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {target} failed:\n{proc.stderr[-2000:]}")
+    modules = parse_importtime(proc.stderr)
+    imported = {m["module"].split(".")[0] for m in modules}
+    slowest = sorted(modules, key=lambda m: m["cumulative_ms"], reverse=True)[:top]
+    return {
+        "target": target,
+        "total_ms": round(sum(m["cumulative_ms"] for m in modules if m["depth"] == 0), 1),
+        "modules_imported": len(modules),
+        "heavy_imported": sorted(imported & set(HEAVY_MODULES)),
+        "slowest": [
+            {"module": m["module"], "self_ms": round(m["self_ms"], 1), "cumulative_ms": round(m["cumulative_ms"], 1)}
+            for m in slowest
+        ],
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.startup_profile")
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--top", type=int, default=25, help="slowest modules to list")
+    parser.add_argument("--budget-ms", type=float, default=0, help="fail above this total (0 = no budget)")
+    args = parser.parse_args(argv)
+
+    report = profile(args.target, args.top)
+    print(json.dumps(report, indent=2))
+    if report["heavy_imported"]:
+        print(f"heavy modules imported at startup: {report['heavy_imported']}", file=sys.stderr)
+        return 1
+    if args.budget_ms and report["total_ms"] > args.budget_ms:
+        print(f"import time {report['total_ms']} ms exceeds budget {args.budget_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
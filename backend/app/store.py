@@ -0,0 +1,355 @@
+"""
+Process-wide registry for the embedding model and the Chroma vector store.
+
+One OnnxEmbeddings instance (one ONNX session) and one Chroma handle are
+shared by chat retrieval, tool execution, and the ingest/listing endpoints.
+The registry is warmed by the FastAPI lifespan hook, which also runs a warm-up
+inference so the model is hot before the first chat; if that fails it falls
+back to lazy construction on first use. readiness() reports whether warm-up
+has completed.
+
+Index versions (blue/green): a full ingest builds into a fresh, versioned
+collection and only then calls activate(), which atomically repoints the
+shared handle. Readers therefore always see a complete index. The active
+collection and the version history live in a small pointer file under
+CHROMA_PATH; get_db() re-opens the handle when that file changes, so other
+worker processes and the rollback command are picked up without a restart.
+The newest INDEX_KEEP_VERSIONS versions are kept for rollback() and older
+ones are garbage-collected together with their sidecar files.
+
+generation() is bumped on every swap and every in-place index update, so
+caches derived from the index can detect that they are stale.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from app import metrics
+from app.config import CHROMA_PATH, INDEX_KEEP_VERSIONS, QUERY_BATCH_MAX
+
+# The collection LangChain writes to by default — the index before versioning
+LEGACY_COLLECTION = "langchain"
+_POINTER_NAME = "active_index.json"
+_SIDECAR_DIR = "sidecars"
+
+# RLock: get_db() builds the embeddings while already holding the lock.
+_lock = threading.RLock()
+_embeddings = None
+_db = None
+_db_stamp = None
+_generation = 0
+_readiness = {"ready": False, "error": None}
+
+
+def get_embeddings():
+    """
+    Return the shared embeddings, loading the model on first use. Queries
+    go through an EmbeddingBatcher unless QUERY_BATCH_MAX is 1.
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                from app.batching import EmbeddingBatcher
+                from app.embeddings import OnnxEmbeddings
+                print("Initializing ONNX embeddings...", flush=True)
+                embeddings = OnnxEmbeddings()
+                _embeddings = EmbeddingBatcher(embeddings) if QUERY_BATCH_MAX > 1 else embeddings
+    return _embeddings
+
+
+# ── Version pointer ────────────────────────────────────────────────────────────
+
+def _pointer_path() -> str:
+    return os.path.join(CHROMA_PATH, _POINTER_NAME)
+
+
+def _pointer_stamp():
+    try:
+        st = os.stat(_pointer_path())
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def read_pointer() -> dict:
+    """Return {"active": name, "history": [oldest, ..., newest], "revision": n}."""
+    try:
+        with open(_pointer_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"active": LEGACY_COLLECTION, "history": [LEGACY_COLLECTION], "revision": 0}
+
+
+def _write_pointer(pointer: dict) -> None:
+    global _db_stamp
+    os.makedirs(CHROMA_PATH, exist_ok=True)
+    tmp = _pointer_path() + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(pointer, f)
+    os.replace(tmp, _pointer_path())
+    _db_stamp = _pointer_stamp()
+
+
+def active_collection() -> str:
+    return read_pointer()["active"]
+
+
+def new_collection_name() -> str:
+    return f"portfolio-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def sidecar_dir(collection: str, create: bool = True) -> str:
+    """Directory for files derived from one index version (manifest, lexical index, ...)."""
+    path = os.path.join(CHROMA_PATH, _SIDECAR_DIR, collection)
+    if create:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+# ── Handles ────────────────────────────────────────────────────────────────────
+
+def open_db(embeddings=None, collection: str | None = None):
+    """Open a new Chroma handle on a collection (the active one by default)."""
+    from langchain_community.vectorstores import Chroma
+    return Chroma(
+        collection_name=collection or active_collection(),
+        persist_directory=CHROMA_PATH,
+        embedding_function=embeddings or get_embeddings(),
+    )
+
+
+def get_db():
+    """Return the shared Chroma handle, connecting on first use or after a repoint."""
+    global _db, _db_stamp, _generation
+    db = _db
+    stamp = _pointer_stamp()
+    if db is None or stamp != _db_stamp:
+        with _lock:
+            if _db is None or stamp != _db_stamp:
+                embeddings = get_embeddings()
+                print("Connecting to ChromaDB...", flush=True)
+                repoint = _db is not None
+                _db = open_db(embeddings)
+                _db_stamp = stamp
+                if repoint:
+                    # Another process activated, rolled back or updated the index
+                    _generation += 1
+            db = _db
+    return db
+
+
+def activate(db, collection: str) -> list[str]:
+    """
+    Make a fully built collection the active index and swap the shared handle
+    to it. Returns the names of old versions that were garbage-collected.
+    """
+    global _db, _generation
+    with _lock:
+        pointer = read_pointer()
+        history = [name for name in pointer["history"] if name != collection]
+        # An empty pre-versioning collection is not worth rolling back to
+        stale = [name for name in history if name == LEGACY_COLLECTION and _is_empty(name)]
+        history = [name for name in history if name not in stale]
+        history.append(collection)
+        pointer.update(active=collection, history=history, revision=pointer.get("revision", 0) + 1)
+        _write_pointer(pointer)
+        _db = db
+        _generation += 1
+        for name in stale:
+            drop_collection(name)
+        return _collect_garbage(pointer)
+
+
+def _is_empty(collection: str) -> bool:
+    return open_db(collection=collection)._collection.count() == 0
+
+
+def _collect_garbage(pointer: dict) -> list[str]:
+    keep = pointer["history"][-max(1, INDEX_KEEP_VERSIONS):]
+    removed = [name for name in pointer["history"] if name not in keep]
+    if removed:
+        pointer["history"] = keep
+        _write_pointer(pointer)
+        for name in removed:
+            drop_collection(name)
+    return removed
+
+
+def drop_collection(collection: str) -> None:
+    """Delete a collection and its sidecar files (never the active one)."""
+    if collection == active_collection():
+        raise ValueError(f"Refusing to drop the active index {collection!r}")
+    try:
+        open_db(collection=collection).delete_collection()
+    except Exception as exc:
+        print(f"Could not delete collection {collection}: {exc}", flush=True)
+    shutil.rmtree(os.path.join(CHROMA_PATH, _SIDECAR_DIR, collection), ignore_errors=True)
+
+
+def rollback() -> str:
+    """Re-activate the version before the active one and drop the abandoned one."""
+    global _db, _generation
+    with _lock:
+        pointer = read_pointer()
+        history = pointer["history"]
+        index = history.index(pointer["active"])
+        if index == 0:
+            raise ValueError("No previous index version to roll back to")
+        abandoned, target = history[index], history[index - 1]
+        history.remove(abandoned)
+        pointer.update(active=target, revision=pointer.get("revision", 0) + 1)
+        _write_pointer(pointer)
+        _db = open_db(collection=target)
+        _generation += 1
+        drop_collection(abandoned)
+        print(f"Rolled back index {abandoned} -> {target}", flush=True)
+        return target
+
+
+def versions() -> dict:
+    pointer = read_pointer()
+    return {"active": pointer["active"], "versions": list(pointer["history"])}
+
+
+def mark_changed() -> None:
+    """Record that the active collection was modified in place."""
+    global _generation
+    with _lock:
+        pointer = read_pointer()
+        pointer["revision"] = pointer.get("revision", 0) + 1
+        # Rewriting the pointer lets other worker processes notice the change
+        _write_pointer(pointer)
+        _generation += 1
+
+
+def generation() -> int:
+    return _generation
+
+
+def current_generation() -> int:
+    """generation(), after picking up a repoint made by another process."""
+    if _db is not None and _pointer_stamp() != _db_stamp:
+        get_db()
+    return _generation
+
+
+# Guards _derived_locks; each name then builds under its own lock, so a slow
+# title index build does not hold up the lexical index (or the reverse)
+_derived_lock = threading.Lock()
+_derived_locks: dict[str, threading.Lock] = {}
+# name -> (db handle, generation, value)
+_derived: dict[str, tuple] = {}
+
+
+def derived(name: str, db, load):
+    """
+    Return load(db), computed once per (db handle, generation) and cached
+    under name. Used for the in-memory indexes kept next to a collection.
+    """
+    cached = _derived.get(name)
+    if cached is not None and cached[0] is db and cached[1] == _generation:
+        return cached[2]
+    with _derived_lock:
+        lock = _derived_locks.setdefault(name, threading.Lock())
+    with lock:
+        current = _generation
+        cached = _derived.get(name)
+        if cached is not None and cached[0] is db and cached[1] == current:
+            return cached[2]
+        value = load(db)
+        _derived[name] = (db, current, value)
+        return value
+
+
+def _collect_metrics():
+    embeddings = _embeddings
+    if embeddings is None:
+        return
+    stats = getattr(embeddings, "stats", None)
+    if stats is not None:  # EmbeddingBatcher
+        batches = stats()
+        yield ("rag_embed_batches_total", "counter", "Batched query-embedding inferences.", [({}, batches["batches"])])
+        yield ("rag_embed_batched_queries_total", "counter", "Queries embedded through the batcher.",
+               [({}, batches["queries"])])
+    cache = getattr(embeddings, "cache", None)
+    if cache is not None:
+        cached = cache.stats()
+        yield ("rag_embedding_cache_lookups_total", "counter", "Persistent embedding cache lookups by result.",
+               [({"result": "hit"}, cached["hits"]), ({"result": "miss"}, cached["misses"])])
+        yield ("rag_embedding_cache_entries", "gauge", "Vectors in the persistent embedding cache.",
+               [({}, cached["entries"])])
+
+
+metrics.register_collector("embeddings", _collect_metrics)
+
+
+def initialize() -> None:
+    """Load the embedding model, run a warm-up inference and open the vector store."""
+    start = time.perf_counter()
+    try:
+        embeddings = get_embeddings()
+        warm_up = getattr(embeddings, "warm_up", None)
+        inference_ms = warm_up() if warm_up is not None else None
+        get_db()
+    except Exception as exc:
+        with _lock:
+            _readiness.update(ready=False, error=f"{type(exc).__name__}: {exc}")
+        raise
+    status = {
+        "ready": True,
+        "error": None,
+        "startup_ms": round((time.perf_counter() - start) * 1000, 1),
+        "warmup_inference_ms": round(inference_ms, 1) if inference_ms is not None else None,
+    }
+    with _lock:
+        _readiness.clear()
+        _readiness.update(status)
+    print(f"Model warm: {status}", flush=True)
+
+
+def loaded_embeddings():
+    """The shared embeddings if the model is already loaded, else None; never loads it."""
+    embeddings = _embeddings
+    # Unwrap the EmbeddingBatcher; stub embeddings without a load step count as loaded
+    model = getattr(embeddings, "embeddings", embeddings)
+    if model is None or not getattr(model, "_loaded", True):
+        return None
+    return embeddings
+
+
+def _lazily_loaded() -> bool:
+    return _db is not None and loaded_embeddings() is not None
+
+
+def readiness() -> dict:
+    """
+    {"ready": bool, "error": str | None, ...timings once warm}. A failed
+    warm-up does not stick: once get_embeddings() / get_db() have since
+    loaded the model and opened the store on first use, this reports ready.
+    """
+    with _lock:
+        if not _readiness["ready"] and _lazily_loaded():
+            if _readiness.get("error"):
+                print(f"Recovered from warm-up error: {_readiness['error']}", flush=True)
+            _readiness.update(ready=True, error=None)
+        return dict(_readiness)
+
+
+def reset() -> None:
+    """Drop all shared handles so the next access rebuilds them."""
+    global _embeddings, _db, _db_stamp
+    with _lock:
+        close = getattr(_embeddings, "close", None)
+        if close is not None:  # EmbeddingBatcher worker
+            close()
+        _embeddings = None
+        _db = None
+        _db_stamp = None
+        _derived.clear()
+        _readiness.clear()
+        _readiness.update(ready=False, error=None)
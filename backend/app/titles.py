@@ -0,0 +1,173 @@
+"""
+Project-title index for the get_project_details tool.
+
+Ingest tags every chunk with the Markdown headings it falls under (the
+"sections" metadata, see app.ingest). Headings of the form
+"Project NN: Title (Alias)" become entries here: each normalized title and
+alias maps to the project's chunks in document order, whose text is kept in
+the index so a hit needs no vector search and no database round-trip.
+
+lookup() tries, in order: an exact alias match, a query whose words are
+all contained in one alias (or vice versa), and trigram similarity (Dice
+coefficient over a trigram → alias inverted index) at or above
+TITLE_MATCH_THRESHOLD. A miss returns None and the tool falls back to
+vector search.
+
+The index is saved as JSON in the version's sidecar directory and loaded
+once per store generation, like the lexical index.
+"""
+
+import json
+import os
+import re
+
+from app import store
+from app.config import TITLE_MATCH_THRESHOLD
+from app.response_cache import normalize_query
+
+_FILE_NAME = "titles.json"
+_FORMAT_VERSION = 2
+_PROJECT_HEADING = re.compile(r"^\s*project\b[^:]*:\s*(.+)$", re.IGNORECASE)
+_PARENS = re.compile(r"\(([^)]*)\)")
+# Short query words ("app", "pet") match too many titles on their own
+_MIN_CONTAINED_WORD = 4
+
+
+def project_aliases(heading: str) -> tuple[str, list[str]] | None:
+    """Split a "Project NN: Title (Alias)" heading into (title, normalized aliases)."""
+    match = _PROJECT_HEADING.match(heading)
+    if not match:
+        return None
+    title = match.group(1).strip()
+    variants = [title, _PARENS.sub(" ", title), *_PARENS.findall(title)]
+    aliases = []
+    for variant in variants:
+        alias = normalize_query(variant)
+        if alias and alias not in aliases:
+            aliases.append(alias)
+    return title, aliases
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    def __init__(self, projects: dict[str, dict]):
+        # title -> {"aliases": [...], "chunks": [{"id", "text", "source"}, ...]}
+        self.projects = projects
+        self.aliases: dict[str, str] = {}
+        self._grams: dict[str, set[str]] = {}
+        self._postings: dict[str, set[str]] = {}
+        for title, entry in projects.items():
+            for alias in entry["aliases"]:
+                self.aliases.setdefault(alias, title)
+        for alias in self.aliases:
+            grams = _trigrams(alias)
+            self._grams[alias] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(alias)
+
+    def __len__(self) -> int:
+        return len(self.projects)
+
+    @classmethod
+    def build(cls, ids: list[str], documents: list[str], metadatas: list[dict]) -> "TitleIndex":
+        projects: dict[str, dict] = {}
+        # Collection order is arbitrary; chunks are kept in document order
+        rows = sorted(
+            ((chunk_id, text, meta or {}) for chunk_id, text, meta in zip(ids, documents, metadatas)),
+            key=lambda row: (row[2].get("source", "unknown"), row[2].get("start_index", 0)),
+        )
+        for chunk_id, text, meta in rows:
+            for heading in (meta.get("sections") or "").split("\n"):
+                parsed = project_aliases(heading)
+                if parsed is None:
+                    continue
+                title, aliases = parsed
+                entry = projects.setdefault(title, {"aliases": aliases, "chunks": []})
+                entry["chunks"].append(
+                    {"id": chunk_id, "text": text, "source": meta.get("source", "unknown")}
+                )
+        return cls(projects)
+
+    @classmethod
+    def from_collection(cls, db) -> "TitleIndex":
+        data = db._collection.get(include=["documents", "metadatas"])
+        return cls.build(data["ids"], data["documents"] or [], data["metadatas"] or [])
+
+    def lookup(self, query: str) -> tuple[str, list[dict]] | None:
+        """Return (title, chunks) for the best-matching project, or None."""
+        key = normalize_query(query)
+        if not key:
+            return None
+        alias = key if key in self.aliases else self._contained(key) or self._fuzzy(key)
+        if alias is None:
+            return None
+        title = self.aliases[alias]
+        return title, self.projects[title]["chunks"]
+
+    def _contained(self, key: str) -> str | None:
+        words = set(key.split())
+        if not any(len(w) >= _MIN_CONTAINED_WORD for w in words):
+            return None
+        matches = [
+            alias for alias in self.aliases
+            if words <= set(alias.split()) or set(alias.split()) <= words
+        ]
+        # Ambiguous ("foundation" in two titles) is left to trigram scoring
+        titles = {self.aliases[a] for a in matches}
+        return matches[0] if len(titles) == 1 else None
+
+    def _fuzzy(self, key: str) -> str | None:
+        grams = _trigrams(key)
+        shared: dict[str, int] = {}
+        for gram in grams:
+            for alias in self._postings.get(gram, ()):
+                shared[alias] = shared.get(alias, 0) + 1
+        best, best_score = None, 0.0
+        for alias, count in shared.items():
+            score = 2 * count / (len(grams) + len(self._grams[alias]))
+            if score > best_score:
+                best, best_score = alias, score
+        return best if best_score >= TITLE_MATCH_THRESHOLD else None
+
+    def save(self, directory: str) -> None:
+        path = os.path.join(directory, _FILE_NAME)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": _FORMAT_VERSION, "projects": self.projects}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, directory: str) -> "TitleIndex | None":
+        try:
+            with open(os.path.join(directory, _FILE_NAME), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != _FORMAT_VERSION:
+            return None
+        return cls(data["projects"])
+
+
+def build_for(db, collection: str) -> TitleIndex:
+    """Rebuild the title index of a collection and persist it in its sidecar dir."""
+    index = TitleIndex.from_collection(db)
+    index.save(store.sidecar_dir(collection))
+    return index
+
+
+def _load(db) -> TitleIndex:
+    collection = db._collection.name
+    index = TitleIndex.load(store.sidecar_dir(collection, create=False))
+    if index is None:
+        print(f"Building title index for {collection}...", flush=True)
+        index = build_for(db, collection)
+    return index
+
+
+def get_index(db) -> TitleIndex:
+    """Return the title index for the collection behind db (loaded once per generation)."""
+    return store.derived("title", db, _load)
@@ -0,0 +1,191 @@
+"""
+Exact in-memory vector search, an alternative to querying Chroma.
+
+All chunk embeddings of one index version are held in a single contiguous
+float32 matrix (optionally memory-mapped from the version's sidecar
+directory, VECTOR_MMAP). A query is one matrix-vector product plus
+argpartition, ranked by squared L2 distance — the metric Chroma's
+collections use — so results match an exact Chroma search without the
+SQLite / HNSW / LangChain layers in between.
+
+NumpyVectorStore exposes similarity_search() with the same signature and
+return type as the LangChain Chroma handle, so app.retrieval can use either
+(VECTOR_BACKEND=chroma|numpy).
+
+With VECTOR_QUANTIZATION=int8 or binary, only compact codes (app.quantization)
+and the row norms stay resident. The float32 matrix is memory-mapped, and
+search shortlists k * QUANT_RESCORE_FACTOR candidates from the codes, then
+rescores just those rows at full precision.
+"""
+
+import json
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+
+from app import store
+from app.batching import query_vector
+from app.config import QUANT_RESCORE_FACTOR, VECTOR_MMAP, VECTOR_QUANTIZATION
+from app.quantization import QUANTIZERS
+
+_MATRIX_NAME = "vectors.npy"
+_ROWS_NAME = "vectors.json"
+_FORMAT_VERSION = 1
+
+
+class NumpyVectorStore:
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        documents: list[str],
+        metadatas: list[dict],
+        embeddings=None,
+        quantization: str = "none",
+        rescore_factor: int = QUANT_RESCORE_FACTOR,
+    ):
+        if quantization != "none" and quantization not in QUANTIZERS:
+            raise ValueError(f"Unknown quantization {quantization!r}; expected none, int8 or binary")
+        self.vectors = vectors
+        self.documents = documents
+        self.metadatas = metadatas
+        self.embeddings = embeddings
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        # ||x||² per row; ||q - x||² = ||q||² - 2 q·x + ||x||²
+        self._sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+        self.codes = QUANTIZERS[quantization](vectors, self._sq_norms) if quantization != "none" else None
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.vectors.nbytes)
+
+    def memory_report(self) -> dict:
+        """Bytes that must stay resident for search vs. a float32 matrix in RAM."""
+        float32 = self.nbytes
+        if self.codes is None:
+            resident = 0 if isinstance(self.vectors, np.memmap) else float32
+        else:
+            resident = self.codes.nbytes
+        resident += self._sq_norms.nbytes
+        return {
+            "quantization": self.quantization,
+            "float32_mb": round(float32 / (1024 * 1024), 2),
+            "resident_mb": round(resident / (1024 * 1024), 2),
+            "saved_mb": round((float32 - resident) / (1024 * 1024), 2),
+        }
+
+    @classmethod
+    def from_collection(cls, db, embeddings=None) -> "NumpyVectorStore":
+        data = db._collection.get(include=["embeddings", "documents", "metadatas"])
+        vectors = np.ascontiguousarray(data["embeddings"], dtype=np.float32)
+        if vectors.ndim != 2:
+            vectors = vectors.reshape(0, getattr(embeddings, "dim", 0))
+        metadatas = [m or {} for m in (data["metadatas"] or [])]
+        return cls(vectors, list(data["documents"] or []), metadatas, embeddings)
+
+    def search_by_vector(self, embedding: np.ndarray, k: int) -> list[tuple[int, float]]:
+        """Return up to k (row, squared L2 distance) pairs, nearest first."""
+        n = len(self.documents)
+        if n == 0 or k <= 0:
+            return []
+        q = np.asarray(embedding, dtype=np.float32)
+        k = min(k, n)
+        if self.codes is None:
+            rows = np.arange(n)
+            scores = self._sq_norms - 2.0 * (self.vectors @ q)
+        else:
+            shortlist = min(n, k * self.rescore_factor)
+            approx = self.codes.approx_scores(q)
+            rows = np.arange(n) if shortlist == n else np.argpartition(approx, shortlist - 1)[:shortlist]
+            # Sorted rows turn the rescoring gather into forward reads of the mmap
+            rows.sort()
+            scores = self._sq_norms[rows] - 2.0 * (np.asarray(self.vectors[rows]) @ q)
+        top = np.argpartition(scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(scores[top], kind="stable")]
+        offset = float(q @ q)
+        return [(int(rows[i]), float(scores[i]) + offset) for i in top]
+
+    def _documents(self, hits) -> list[tuple[Document, float]]:
+        return [
+            (Document(page_content=self.documents[i], metadata=self.metadatas[i]), score)
+            for i, score in hits
+        ]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, **kwargs) -> list[Document]:
+        return [doc for doc, _ in self._documents(self.search_by_vector(embedding, k))]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> list[tuple[Document, float]]:
+        return self._documents(self.search_by_vector(query_vector(self.embeddings, query), k))
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def save(self, directory: str) -> None:
+        rows = {
+            "version": _FORMAT_VERSION,
+            "rows": len(self.documents),
+            "documents": self.documents,
+            "metadatas": self.metadatas,
+        }
+        for name, write in (
+            (_ROWS_NAME, lambda f: f.write(json.dumps(rows).encode("utf-8"))),
+            (_MATRIX_NAME, lambda f: np.save(f, self.vectors)),
+        ):
+            path = os.path.join(directory, name)
+            with open(path + ".tmp", "wb") as f:
+                write(f)
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str, embeddings=None, mmap: bool = False, **options) -> "NumpyVectorStore | None":
+        try:
+            with open(os.path.join(directory, _ROWS_NAME), encoding="utf-8") as f:
+                rows = json.load(f)
+            vectors = np.load(os.path.join(directory, _MATRIX_NAME), mmap_mode="r" if mmap else None)
+        except (OSError, ValueError):
+            return None
+        # The two files are replaced one after the other; a mismatch means
+        # we caught a rebuild half-way and the caller should rebuild.
+        if rows.get("version") != _FORMAT_VERSION or vectors.shape[0] != rows["rows"]:
+            return None
+        return cls(vectors, rows["documents"], rows["metadatas"], embeddings, **options)
+
+
+def build_for(db, collection: str) -> NumpyVectorStore:
+    """Copy a collection's embeddings into the matrix files in its sidecar dir."""
+    index = NumpyVectorStore.from_collection(db, store.get_embeddings())
+    index.save(store.sidecar_dir(collection))
+    return index
+
+
+def remove_for(collection: str) -> None:
+    """Delete a collection's matrix files so the next load rebuilds them."""
+    for name in (_ROWS_NAME, _MATRIX_NAME):
+        try:
+            os.remove(os.path.join(store.sidecar_dir(collection, create=False), name))
+        except FileNotFoundError:
+            pass
+
+
+def _load(db) -> NumpyVectorStore:
+    collection = db._collection.name
+    embeddings = store.get_embeddings()
+    # Quantized search only touches candidate rows, so keep float32 on disk
+    mmap = VECTOR_MMAP or VECTOR_QUANTIZATION != "none"
+    options = {"quantization": VECTOR_QUANTIZATION}
+    index = NumpyVectorStore.load(store.sidecar_dir(collection, create=False), embeddings, mmap, **options)
+    if index is None:
+        print(f"Building vector matrix for {collection}...", flush=True)
+        build_for(db, collection)
+        index = NumpyVectorStore.load(store.sidecar_dir(collection), embeddings, mmap, **options)
+    print(f"Vector store {collection}: {index.memory_report()}", flush=True)
+    return index
+
+
+def get_store(db) -> NumpyVectorStore:
+    """Return the NumPy vector store for the collection behind db (loaded once per generation)."""
+    return store.derived("vectors", db, _load)
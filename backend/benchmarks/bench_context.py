@@ -0,0 +1,98 @@
+"""
+Context tokens sent per chat: verbatim chunks vs. app.context assembly.
+
+The portfolio in DATA_PATH is split as ingest does, indexed with BM25 and
+queried with typical visitor questions. For the top k chunks of each query
+it reports estimated context tokens with the old verbatim concatenation and
+with build_context() (merge + dedup + budget), and the assembly time. Dedup
+compares chunk embeddings, so the model is loaded first (--fake-embeddings
+swaps in the hashing embedder). The context is resent on every agentic
+round, so the saving applies per round.
+
+    python -m benchmarks.bench_context --k 6 --budget 1500
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+_QUERIES = [
+    "What projects has Jalin built?",
+    "Tell me about Pawfect Pet Grooming",
+    "What does Jalin charge for a website?",
+    "Which platforms can Jalin build on?",
+    "How does Jalin work with clients?",
+    "What is Jalin's experience?",
+    "Can Jalin build a booking system?",
+    "How do I contact Jalin?",
+    "What skills does Jalin have?",
+    "Does Jalin do Webflow or WordPress sites?",
+]
+
+
+def _verbatim(docs: list) -> str:
+    return "\n\n---\n\n".join(
+        f"[{i}] (source: {d.metadata.get('source', 'unknown')})\n{d.page_content}"
+        for i, d in enumerate(docs, 1)
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--budget", type=int, default=1500)
+    parser.add_argument("--dedup", type=float, default=None, help="default: CONTEXT_DEDUP_SIMILARITY")
+    parser.add_argument("--fake-embeddings", action="store_true", help="hashing embedder instead of MiniLM")
+    args = parser.parse_args(argv)
+
+    if args.fake_embeddings:
+        from benchmarks.bench_retrieval import install_hash_embeddings
+        install_hash_embeddings()
+
+    from app import context, store
+    from app.config import CHUNK_OVERLAP, CHUNK_SIZE, DATA_PATH
+    from app.ingest import _parse_file, _source_files
+    from app.lexical import BM25Index
+
+    chunks = [c for f in _source_files(DATA_PATH) for c in _parse_file(str(f), CHUNK_SIZE, CHUNK_OVERLAP)]
+    index = BM25Index.build([c.page_content for c in chunks], [c.metadata for c in chunks])
+    dedup = context.CONTEXT_DEDUP_SIMILARITY if args.dedup is None else args.dedup
+    embeddings = store.get_embeddings()
+    # Ingest leaves chunk embeddings in the cache; do the same so timings match
+    embeddings.embed_documents([c.page_content for c in chunks])
+
+    rows = []
+    for query in _QUERIES:
+        docs = index.search_documents(query, args.k)
+        t0 = time.perf_counter()
+        passages = context.drop_near_duplicates(context.merge_chunks(docs), dedup)
+        packed = context.pack(passages, args.budget)
+        elapsed = (time.perf_counter() - t0) * 1000
+        assembled = "\n\n---\n\n".join(f"[{i}] (source: {s})\n{t}" for i, (s, t) in enumerate(packed, 1))
+        rows.append({
+            "query": query,
+            "chunks": len(docs),
+            "passages": len(packed),
+            "tokens_verbatim": context.estimate_tokens(_verbatim(docs)),
+            "tokens_assembled": context.estimate_tokens(assembled),
+            "assemble_ms": round(elapsed, 3),
+        })
+
+    before = sum(r["tokens_verbatim"] for r in rows)
+    after = sum(r["tokens_assembled"] for r in rows)
+    print(json.dumps({
+        "chunks_indexed": len(chunks),
+        "k": args.k,
+        "budget": args.budget,
+        "dedup": dedup,
+        "mean_tokens_verbatim": round(before / len(rows), 1),
+        "mean_tokens_assembled": round(after / len(rows), 1),
+        "reduction_pct": round(100 * (before - after) / before, 1),
+        "p50_assemble_ms": round(statistics.median(r["assemble_ms"] for r in rows), 3),
+        "queries": rows,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Throughput and peak-RSS comparison for the OnnxEmbeddings code paths.
+
+Modes:
+  legacy  — whole list through ONNXMiniLM_L6_V2 in one call, per-float boxing
+  list    — OnnxEmbeddings.embed_documents (batched, ndarray.tolist())
+  array   — OnnxEmbeddings.embed_documents_array (batched, float32 ndarray)
+
+Each mode runs in its own subprocess so ru_maxrss is not polluted by the
+previous run. Results are printed as JSON.
+
+    python -m benchmarks.bench_embeddings --texts 2000 --batch-size 32
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+
+_WORDS = (
+    "website booking portfolio react vite fastapi donation nonprofit grooming "
+    "responsive layout animation contact service team chat design client page"
+).split()
+
+
+def _corpus(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(_WORDS, k=rng.randint(40, 80))) for _ in range(n)]
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _run_mode(mode: str, n: int, batch_size: int) -> dict:
+    from app.embeddings import OnnxEmbeddings
+
+    emb = OnnxEmbeddings(batch_size=batch_size)
+    emb.embed_documents_array(["warm-up"])  # load the model outside the timing
+    texts = _corpus(n)
+    rss_before = _max_rss_mb()
+
+    t0 = time.perf_counter()
+    if mode == "legacy":
+        out = [[float(x) for x in v] for v in emb._fn(texts)]
+    elif mode == "list":
+        out = emb.embed_documents(texts)
+    else:
+        out = emb.embed_documents_array(texts)
+    elapsed = time.perf_counter() - t0
+
+    return {
+        "mode": mode,
+        "texts": n,
+        "batch_size": batch_size,
+        "seconds": round(elapsed, 4),
+        "texts_per_sec": round(n / elapsed, 1),
+        "peak_rss_mb": round(_max_rss_mb(), 1),
+        "rss_growth_mb": round(_max_rss_mb() - rss_before, 1),
+        "rows": len(out),
+    }
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--modes", default="legacy,list,array")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(_run_mode(args.child, args.texts, args.batch_size)))
+        return
+
+    results = []
+    for mode in args.modes.split(","):
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_embeddings",
+             "--texts", str(args.texts), "--batch-size", str(args.batch_size),
+             "--child", mode],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
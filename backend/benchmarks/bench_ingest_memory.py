@@ -0,0 +1,83 @@
+"""
+Peak RSS of a full ingest as the corpus grows.
+
+Each corpus size is ingested in a fresh subprocess with its own temporary
+DATA_PATH / CHROMA_PATH, so ru_maxrss reflects that run alone. With the
+streaming pipeline, peak RSS should stay roughly flat across sizes.
+
+    python -m benchmarks.bench_ingest_memory --files 50,200,800 --fake-embeddings
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.bench_retrieval import install_hash_embeddings
+
+_WORDS = (
+    "website booking portfolio react vite fastapi donation nonprofit grooming "
+    "responsive layout animation contact service team chat design client page"
+).split()
+
+
+def _write_corpus(data_dir: str, n_files: int, words_per_file: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+    for i in range(n_files):
+        body = " ".join(rng.choices(_WORDS, k=words_per_file))
+        with open(os.path.join(data_dir, f"doc_{i:05d}.md"), "w", encoding="utf-8") as f:
+            f.write(f"# Document {i}\n\n{body}\n")
+
+
+def _child(fake_embeddings: bool) -> None:
+    if fake_embeddings:
+        install_hash_embeddings()
+
+    from app.ingest import ingest_documents
+
+    result = ingest_documents(full=True)
+    scale = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)
+    result["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale, 1)
+    result.pop("sources", None)
+    print(json.dumps(result))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", default="50,200,800")
+    parser.add_argument("--words-per-file", type=int, default=1500)
+    parser.add_argument("--fake-embeddings", action="store_true")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.fake_embeddings)
+        return
+
+    results = []
+    for n in (int(x) for x in args.files.split(",")):
+        with tempfile.TemporaryDirectory() as tmp:
+            data_dir = os.path.join(tmp, "data")
+            os.makedirs(data_dir)
+            _write_corpus(data_dir, n, args.words_per_file)
+            env = {
+                **os.environ,
+                "DATA_PATH": data_dir,
+                "CHROMA_PATH": os.path.join(tmp, "chroma_db"),
+                "EMBED_CACHE_PATH": "",
+            }
+            cmd = [sys.executable, "-m", "benchmarks.bench_ingest_memory", "--child"]
+            if args.fake_embeddings:
+                cmd.append("--fake-embeddings")
+            proc = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True)
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            results.append({"files": n, **result})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
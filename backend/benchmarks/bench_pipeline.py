@@ -0,0 +1,321 @@
+"""
+End-to-end RAG pipeline benchmark against a local mock Anthropic server.
+
+For each corpus size a synthetic portfolio (bench_retrieval's generator) is
+written to a temporary DATA_PATH and measured in fresh processes:
+
+  ingest     full ingest: seconds, chunks and chunks/sec
+  retrieval  hybrid retrieve() over sample queries: p50 / p99 ms
+  chat       the real API (uvicorn app.main:app) talking to
+             benchmarks.mock_anthropic through ANTHROPIC_BASE_URL, driven
+             by N concurrent SSE clients: time to first token and total
+             p50 / p99 ms, requests/sec and errors per concurrency level
+
+The mock's token rate, first-token delay and tool-use share are flags, so
+runs are repeatable and need no network or API key. The response cache is
+off so every chat runs the full pipeline. Results are printed as one JSON
+document tagged with the git commit; --out saves it and --baseline lists
+metrics that got more than --tolerance worse than a saved run.
+
+    python -m benchmarks.bench_pipeline --sizes 100,1000 --concurrency 1,8,32 --fake-embeddings
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.bench_retrieval import _corpus, _queries, install_hash_embeddings
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50_ms": None, "p99_ms": None}
+    values = sorted(values)
+    return {
+        "p50_ms": round(statistics.median(values), 2),
+        "p99_ms": round(values[int(0.99 * (len(values) - 1))], 2),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(url: str, timeout: float, proc: subprocess.Popen) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url}: process exited with {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"{url} not ready after {timeout:g}s")
+
+
+# ── Child processes ───────────────────────────────────────────────────────────
+
+def _measure_ingest(args) -> None:
+    """Ingest DATA_PATH and time retrieval; prints one JSON line."""
+    if args.fake_embeddings:
+        install_hash_embeddings()
+    from app.ingest import ingest_documents
+    from app.retrieval import retrieve
+
+    t0 = time.perf_counter()
+    result = ingest_documents(full=True)
+    seconds = time.perf_counter() - t0
+    retrieve("warm-up")
+
+    latencies = []
+    for text, _ in _queries(_corpus(args.size), args.retrieval_queries)["topic"]:
+        t0 = time.perf_counter()
+        retrieve(text)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    print(json.dumps({
+        "ingest": {
+            "seconds": round(seconds, 2),
+            "chunks": result.get("chunks", 0),
+            "chunks_per_sec": round(result.get("chunks", 0) / seconds, 1) if seconds else None,
+        },
+        "retrieval": {"queries": len(latencies), **_percentiles(latencies)},
+    }))
+
+
+def _serve(args) -> None:
+    if args.fake_embeddings:
+        install_hash_embeddings()
+    import uvicorn
+
+    uvicorn.run("app.main:app", host="127.0.0.1", port=args.port, log_level="warning")
+
+
+# ── Load generator ────────────────────────────────────────────────────────────
+
+async def _chat(client, url: str, query: str) -> tuple[float | None, float, bool]:
+    start = time.perf_counter()
+    ttft, ok = None, False
+    async with client.stream("POST", url, json={"query": query}) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return None, time.perf_counter() - start, False
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            if line == "data: [DONE]":
+                break
+            if ttft is None:
+                ttft = time.perf_counter() - start
+                ok = not line[len("data: "):].startswith("Error")
+    return ttft, time.perf_counter() - start, ok
+
+
+async def _load(base_url: str, queries: list[str], concurrency: int, total: int) -> dict:
+    import httpx
+
+    ttfts, totals, errors = [], [], 0
+    pending = iter(range(total))
+
+    async def worker(client):
+        nonlocal errors
+        for i in pending:
+            try:
+                ttft, elapsed, ok = await _chat(client, f"{base_url}/api/chat", queries[i % len(queries)])
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if not ok:
+                errors += 1
+                continue
+            ttfts.append(ttft * 1000)
+            totals.append(elapsed * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    ttft = _percentiles(ttfts)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "requests_per_sec": round(len(totals) / wall, 2),
+        "ttft_p50_ms": ttft["p50_ms"],
+        "ttft_p99_ms": ttft["p99_ms"],
+        **_percentiles(totals),
+    }
+
+
+# ── Orchestration ─────────────────────────────────────────────────────────────
+
+def _run_size(size: int, args, mock_url: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "data")
+        os.makedirs(data_dir)
+        corpus = _corpus(size)
+        for i, (name, body) in enumerate(corpus):
+            with open(os.path.join(data_dir, f"p{i:05d}.md"), "w", encoding="utf-8") as f:
+                f.write(f"# {name}\n\n{name}. {body}\n")
+        env = {
+            **os.environ,
+            "DATA_PATH": data_dir,
+            "CHROMA_PATH": os.path.join(tmp, "chroma_db"),
+            "EMBED_CACHE_PATH": "",
+            "RESPONSE_CACHE_SIZE": "0",
+            "ANTHROPIC_BASE_URL": mock_url,
+            "ANTHROPIC_API_KEY": "bench",
+        }
+        fake = ["--fake-embeddings"] if args.fake_embeddings else []
+        cmd = [sys.executable, "-m", "benchmarks.bench_pipeline", "--child", "ingest",
+               "--size", str(size), "--retrieval-queries", str(args.retrieval_queries), *fake]
+        proc = subprocess.run(cmd, env=env, cwd=_BACKEND_DIR, capture_output=True, text=True, check=True)
+        row = {"docs": size, **json.loads(proc.stdout.strip().splitlines()[-1])}
+
+        port = _free_port()
+        log = open(os.path.join(tmp, "server.log"), "w")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_pipeline", "--child", "serve", "--port", str(port), *fake],
+            env=env, cwd=_BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=log,
+        )
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            _wait_for(f"{base_url}/api/ready", args.startup_timeout, server)
+            questions = [f"Tell me about {name}" for name, _ in corpus] or ["What has Jalin built?"]
+            row["chat"] = [
+                asyncio.run(_load(base_url, questions, c, max(args.requests, c)))
+                for c in (int(c) for c in args.concurrency.split(","))
+            ]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+            log.close()
+        return row
+
+
+# (metric path, higher is better) — compared against --baseline
+_COMPARED = [
+    (("ingest", "chunks_per_sec"), True),
+    (("retrieval", "p50_ms"), False),
+    (("retrieval", "p99_ms"), False),
+]
+_COMPARED_CHAT = [("ttft_p50_ms", False), ("p50_ms", False), ("p99_ms", False), ("requests_per_sec", True)]
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[dict]:
+    """Metrics at least `tolerance` (fraction) worse than in baseline."""
+    regressions = []
+
+    def check(name, new, old, higher_is_better):
+        if new is None or not old:
+            return
+        change = (new - old) / old
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append({"metric": name, "baseline": old, "current": new,
+                                "change_pct": round(100 * change, 1)})
+
+    old_rows = {row["docs"]: row for row in baseline.get("results", [])}
+    for row in current["results"]:
+        old = old_rows.get(row["docs"])
+        if old is None:
+            continue
+        for (section, key), higher in _COMPARED:
+            check(f"{row['docs']}.{section}.{key}", row[section][key], old[section][key], higher)
+        old_levels = {level["concurrency"]: level for level in old.get("chat", [])}
+        for level in row.get("chat", []):
+            old_level = old_levels.get(level["concurrency"])
+            if old_level is None:
+                continue
+            for key, higher in _COMPARED_CHAT:
+                check(f"{row['docs']}.chat.c{level['concurrency']}.{key}", level[key], old_level[key], higher)
+    return regressions
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100,1000", help="projects per corpus, comma-separated")
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--requests", type=int, default=64, help="chats per concurrency level")
+    parser.add_argument("--retrieval-queries", type=int, default=200)
+    parser.add_argument("--fake-embeddings", action="store_true", help="hashing embedder instead of MiniLM")
+    parser.add_argument("--ttft-ms", type=float, default=200.0, help="mock LLM delay before the first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--answer-tokens", type=int, default=60)
+    parser.add_argument("--tool-use-rate", type=float, default=0.3)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--out", help="also write the JSON report here")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--child", choices=["ingest", "serve"], help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child == "ingest":
+        _measure_ingest(args)
+        return
+    if args.child == "serve":
+        _serve(args)
+        return
+
+    mock_port = _free_port()
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.mock_anthropic", "--port", str(mock_port),
+         "--ttft-ms", str(args.ttft_ms), "--tokens-per-sec", str(args.tokens_per_sec),
+         "--answer-tokens", str(args.answer_tokens), "--tool-use-rate", str(args.tool_use_rate)],
+        cwd=_BACKEND_DIR,
+    )
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    try:
+        _wait_for(f"{mock_url}/stats", 30, mock)
+        results = [_run_size(int(size), args, mock_url) for size in args.sizes.split(",")]
+    finally:
+        mock.terminate()
+        mock.wait(timeout=30)
+
+    report = {
+        "commit": _commit(),
+        "python": sys.version.split()[0],
+        "config": {
+            "fake_embeddings": args.fake_embeddings,
+            "mock": {"ttft_ms": args.ttft_ms, "tokens_per_sec": args.tokens_per_sec,
+                     "answer_tokens": args.answer_tokens, "tool_use_rate": args.tool_use_rate},
+            "requests_per_level": args.requests,
+        },
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
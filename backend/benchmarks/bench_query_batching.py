@@ -0,0 +1,106 @@
+"""
+Query-embedding throughput with and without cross-request micro-batching.
+
+N client threads each embed queries back to back, either straight through
+OnnxEmbeddings.embed_query (one ONNX run per query) or through an
+EmbeddingBatcher in front of the same model. Reports queries/sec, p50/p95
+latency and the batcher's mean batch size.
+
+--simulate replaces the ONNX session with a stand-in costing a fixed
+per-run overhead plus a per-text cost, for machines without the model
+download. Runs are serialized, as concurrent ONNX runs compete for the same
+cores.
+
+    python -m benchmarks.bench_query_batching --clients 1,8,32 --queries 400
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+
+from benchmarks.bench_embeddings import _corpus
+
+
+def _run(embed, clients: int, texts: list[str]) -> dict:
+    latencies: list[float] = []
+    lock = threading.Lock()
+    it = iter(texts)
+
+    def client():
+        while True:
+            with lock:
+                text = next(it, None)
+            if text is None:
+                return
+            t0 = time.perf_counter()
+            embed(text)
+            elapsed = (time.perf_counter() - t0) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "queries_per_sec": round(len(texts) / wall, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 2),
+    }
+
+
+class _Simulated:
+    """Batch cost = 3 ms session overhead + 0.1 ms per text."""
+
+    def __init__(self):
+        self._session = threading.Lock()
+
+    def embed_documents_array(self, texts):
+        import numpy as np
+        with self._session:
+            time.sleep(0.003 + 0.0001 * len(texts))
+        return np.zeros((len(texts), 384), dtype=np.float32)
+
+    def embed_query(self, text):
+        return self.embed_documents_array([text])[0].tolist()
+
+
+def _onnx():
+    from app.embeddings import OnnxEmbeddings
+    return OnnxEmbeddings(cache_path="")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", default="1,8,32")
+    parser.add_argument("--queries", type=int, default=400)
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--simulate", action="store_true")
+    args = parser.parse_args(argv)
+
+    from app.batching import EmbeddingBatcher
+
+    model = _Simulated() if args.simulate else _onnx()
+    model.embed_query("warm-up")
+    texts = [t[:120] for t in _corpus(args.queries, seed=7)]
+
+    results = []
+    for clients in (int(c) for c in args.clients.split(",")):
+        results.append({"clients": clients, "mode": "direct", **_run(model.embed_query, clients, texts)})
+        batcher = EmbeddingBatcher(model, max_batch=args.max_batch, window_ms=args.window_ms)
+        row = _run(batcher.embed_query, clients, texts)
+        results.append({"clients": clients, "mode": "batched", **row,
+                        "mean_batch_size": batcher.stats()["mean_batch_size"]})
+        batcher.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Recall@k and per-query latency for lexical, dense and hybrid retrieval.
+
+A synthetic portfolio is generated with one file per project: a made-up
+project name followed by a description drawn from a shared vocabulary.
+Two query sets are run against it — exact project names ("name") and bags
+of description words ("topic") — and a query counts as recalled when its
+project's chunk is in the top k. The corpus is ingested in a subprocess
+with its own temporary DATA_PATH / CHROMA_PATH.
+
+    python -m benchmarks.bench_retrieval --projects 500 --queries 200 --k 6
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_WORDS = (
+    "website booking portfolio react vite fastapi donation nonprofit grooming "
+    "responsive layout animation contact service team chat design client page "
+    "gallery checkout calendar dashboard analytics newsletter blog payments"
+).split()
+_SYLLABLES = "ka lo mi ra ven tor zu pel quin dax sol fen bri mor tal".split()
+
+
+def _name(rng: random.Random) -> str:
+    words = ["".join(rng.choices(_SYLLABLES, k=3)).capitalize() for _ in range(2)]
+    return " ".join(words)
+
+
+def _corpus(n: int, seed: int = 0) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    return [(_name(rng), " ".join(rng.choices(_WORDS, k=40))) for _ in range(n)]
+
+
+def _queries(corpus, n: int, seed: int = 1) -> dict[str, list[tuple[str, int]]]:
+    rng = random.Random(seed)
+    picks = [rng.randrange(len(corpus)) for _ in range(n)]
+    return {
+        "name": [(corpus[i][0], i) for i in picks],
+        "topic": [(" ".join(rng.sample(corpus[i][1].split(), 8)), i) for i in picks],
+    }
+
+
+def install_hash_embeddings() -> None:
+    """Swap the ONNX model for a bag-of-words hashing embedder (no download)."""
+    import numpy as np
+    import app.embeddings
+
+    class HashEmbeddings(app.embeddings.OnnxEmbeddings):
+        def __init__(self, *a, **kw):
+            self.batch_size, self.cache, self._loaded = 64, None, True
+
+        def _compute(self, texts):
+            out = np.zeros((len(texts), self.dim), dtype=np.float32)
+            for row, text in enumerate(texts):
+                for word in text.lower().split():
+                    out[row, hash(word) % self.dim] += 1.0
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            return out / np.maximum(norms, 1e-9)
+
+    app.embeddings.OnnxEmbeddings = HashEmbeddings
+
+
+def _child(args) -> None:
+    if args.fake_embeddings:
+        install_hash_embeddings()
+
+    from app.ingest import ingest_documents
+    from app.retrieval import retrieve
+
+    corpus = _corpus(args.projects)
+    ingest_documents(full=True)
+    retrieve("warm-up", k=args.k, mode="hybrid")  # load model and lexical index
+
+    results = []
+    for query_set, queries in _queries(corpus, args.queries).items():
+        for mode in args.modes.split(","):
+            hits, latencies = 0, []
+            for text, target in queries:
+                t0 = time.perf_counter()
+                docs = retrieve(text, k=args.k, mode=mode)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                hits += any(d.metadata.get("source", "").endswith(f"p{target:05d}.md") for d in docs)
+            latencies.sort()
+            results.append({
+                "queries": query_set,
+                "mode": mode,
+                f"recall@{args.k}": round(hits / len(queries), 3),
+                "p50_ms": round(statistics.median(latencies), 3),
+                "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+            })
+    print(json.dumps(results))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--modes", default="lexical,dense,hybrid")
+    parser.add_argument("--fake-embeddings", action="store_true")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir = os.path.join(tmp, "data")
+        os.makedirs(data_dir)
+        for i, (name, body) in enumerate(_corpus(args.projects)):
+            with open(os.path.join(data_dir, f"p{i:05d}.md"), "w", encoding="utf-8") as f:
+                f.write(f"{name}. {body}\n")
+        env = {
+            **os.environ,
+            "DATA_PATH": data_dir,
+            "CHROMA_PATH": os.path.join(tmp, "chroma_db"),
+            "EMBED_CACHE_PATH": "",
+        }
+        cmd = [sys.executable, "-m", "benchmarks.bench_retrieval", "--child", *(argv or sys.argv[1:])]
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True, check=True)
+    print(json.dumps(json.loads(proc.stdout.strip().splitlines()[-1]), indent=2))
+
+
+if __name__ == "__main__":
+    main()
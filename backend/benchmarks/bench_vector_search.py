@@ -0,0 +1,107 @@
+"""
+Query latency of the NumPy exact-search backend against Chroma.
+
+For each corpus size, random unit vectors (MiniLM's 384 dimensions) are
+written to a temporary Chroma collection and to a NumpyVectorStore. Queries
+are noisy copies of stored vectors. Reported per backend: p50/p95 latency
+of a top-k search by vector, and recall@k against the exact top-k (Chroma
+searches an approximate HNSW graph). The NumPy backend is measured both
+in RAM and memory-mapped from disk.
+
+    python -m benchmarks.bench_vector_search --sizes 1000,10000,100000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+_DIM = 384
+_ADD_BATCH = 4096
+
+
+def _latencies(fn, queries) -> tuple[list[float], list]:
+    times, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append(fn(q))
+        times.append((time.perf_counter() - t0) * 1000)
+    return sorted(times), results
+
+
+def _summary(name: str, times: list[float], results: list, exact: list, k: int) -> dict:
+    recall = statistics.mean(len(set(r) & set(e)) / k for r, e in zip(results, exact))
+    return {
+        "backend": name,
+        "p50_ms": round(statistics.median(times), 3),
+        "p95_ms": round(times[int(0.95 * (len(times) - 1))], 3),
+        f"recall@{k}": round(recall, 4),
+    }
+
+
+def _run_size(n: int, n_queries: int, k: int, tmp: str) -> list[dict]:
+    import chromadb
+
+    from app.vector_index import NumpyVectorStore
+
+    rng = np.random.default_rng(n)
+    vectors = rng.standard_normal((n, _DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [str(i) for i in range(n)]
+    docs = [f"chunk {i}" for i in range(n)]
+    picks = rng.integers(0, n, n_queries)
+    queries = vectors[picks] + 0.05 * rng.standard_normal((n_queries, _DIM)).astype(np.float32)
+
+    client = chromadb.PersistentClient(path=os.path.join(tmp, f"chroma_{n}"))
+    collection = client.create_collection(f"bench-{n}")
+    for start in range(0, n, _ADD_BATCH):
+        end = start + _ADD_BATCH
+        collection.add(ids=ids[start:end], embeddings=vectors[start:end], documents=docs[start:end])
+
+    in_memory = NumpyVectorStore(vectors, docs, [{} for _ in docs])
+    sidecar = os.path.join(tmp, f"numpy_{n}")
+    os.makedirs(sidecar)
+    in_memory.save(sidecar)
+    mapped = NumpyVectorStore.load(sidecar, mmap=True)
+
+    def numpy_search(store):
+        return lambda q: [i for i, _ in store.search_by_vector(q, k)]
+
+    def chroma_search(q):
+        res = collection.query(query_embeddings=[q], n_results=k, include=[])
+        return [int(i) for i in res["ids"][0]]
+
+    exact = [numpy_search(in_memory)(q) for q in queries]
+    rows = []
+    for name, fn in (
+        ("chroma", chroma_search),
+        ("numpy", numpy_search(in_memory)),
+        ("numpy-mmap", numpy_search(mapped)),
+    ):
+        fn(queries[0])  # warm caches / lazily loaded index
+        times, results = _latencies(fn, queries)
+        rows.append({"chunks": n, **_summary(name, times, results, exact, k)})
+    rows[-1]["matrix_mb"] = round(in_memory.nbytes / (1024 * 1024), 1)
+    return rows
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=6)
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (int(x) for x in args.sizes.split(",")):
+            results.extend(_run_size(n, args.queries, args.k, tmp))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Local stand-in for the Anthropic Messages API, for offline benchmarks.
+
+Serves POST /v1/messages with the same server-sent event sequence as the real
+streaming API (message_start, content blocks with text / tool_use deltas,
+message_delta with usage, message_stop), so the official SDK and app.rag
+run unmodified against it via ANTHROPIC_BASE_URL. Timing is configurable:
+
+  --ttft-ms          delay before the first content block
+  --tokens-per-sec   rate at which answer "tokens" (words) are streamed
+  --answer-tokens    length of each text answer
+  --tool-use-rate    share of first rounds that call get_project_details
+                     instead of answering (chosen deterministically from
+                     the question, so runs are repeatable)
+
+Input token usage is estimated from the request size (4 chars per token).
+
+    python -m benchmarks.mock_anthropic --port 8765 --tokens-per-sec 200
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import uuid
+from dataclasses import dataclass
+
+_WORDS = (
+    "Jalin builds fast responsive websites with clear booking flows donation "
+    "pages and custom dashboards for small businesses and nonprofits"
+).split()
+
+
+@dataclass
+class MockConfig:
+    ttft_ms: float = 200.0
+    tokens_per_sec: float = 200.0
+    answer_tokens: int = 60
+    tool_use_rate: float = 0.0
+
+
+def _event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def _question(messages: list) -> str:
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            return content
+        for block in content or []:
+            if block.get("type") == "text" and block.get("text", "").startswith("Question:"):
+                return block["text"][len("Question:"):].strip()
+    return ""
+
+
+def _wants_tool(body: dict, rate: float) -> bool:
+    if rate <= 0 or not body.get("tools") or body.get("tool_choice", {}).get("type") == "none":
+        return False
+    # Only the first round calls a tool: later rounds already carry results
+    for message in body.get("messages", []):
+        content = message.get("content")
+        if isinstance(content, list) and any(b.get("type") == "tool_result" for b in content):
+            return False
+    digest = hashlib.sha256(_question(body.get("messages", [])).encode()).digest()
+    return int.from_bytes(digest[:4], "big") / 2**32 < rate
+
+
+async def stream_message(body: dict, config: MockConfig):
+    """Yield the SSE events of one streamed Messages API response."""
+    input_tokens = max(1, len(json.dumps(body)) // 4)
+    yield _event("message_start", {
+        "type": "message_start",
+        "message": {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+            "model": body.get("model", "mock"), "content": [], "stop_reason": None,
+            "stop_sequence": None, "usage": {"input_tokens": input_tokens, "output_tokens": 1},
+        },
+    })
+    await asyncio.sleep(config.ttft_ms / 1000)
+
+    if _wants_tool(body, config.tool_use_rate):
+        title = " ".join(_question(body["messages"]).split()[:3]) or "portfolio"
+        yield _event("content_block_start", {
+            "type": "content_block_start", "index": 0,
+            "content_block": {"type": "tool_use", "id": f"toolu_{uuid.uuid4().hex[:24]}",
+                              "name": "get_project_details", "input": {}},
+        })
+        yield _event("content_block_delta", {
+            "type": "content_block_delta", "index": 0,
+            "delta": {"type": "input_json_delta", "partial_json": json.dumps({"project_title": title})},
+        })
+        yield _event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        stop_reason, output_tokens = "tool_use", 20
+    else:
+        yield _event("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""},
+        })
+        delay = 1 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0
+        for i in range(config.answer_tokens):
+            yield _event("content_block_delta", {
+                "type": "content_block_delta", "index": 0,
+                "delta": {"type": "text_delta", "text": _WORDS[i % len(_WORDS)] + " "},
+            })
+            if delay:
+                await asyncio.sleep(delay)
+        yield _event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        stop_reason, output_tokens = "end_turn", config.answer_tokens
+
+    yield _event("message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+        "usage": {"output_tokens": output_tokens},
+    })
+    yield _event("message_stop", {"type": "message_stop"})
+
+
+def create_app(config: MockConfig):
+    from fastapi import FastAPI, Request
+    from fastapi.responses import JSONResponse, StreamingResponse
+
+    app = FastAPI(title="mock-anthropic")
+    app.state.requests = 0
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        if not body.get("stream"):
+            return JSONResponse({"type": "error", "error": {
+                "type": "invalid_request_error", "message": "mock server only supports stream=true"}},
+                status_code=400)
+        return StreamingResponse(stream_message(body, config), media_type="text/event-stream")
+
+    @app.get("/stats")
+    def stats():
+        return {"requests": app.state.requests}
+
+    return app
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=MockConfig.ttft_ms)
+    parser.add_argument("--tokens-per-sec", type=float, default=MockConfig.tokens_per_sec)
+    parser.add_argument("--answer-tokens", type=int, default=MockConfig.answer_tokens)
+    parser.add_argument("--tool-use-rate", type=float, default=MockConfig.tool_use_rate)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+
+    config = MockConfig(args.ttft_ms, args.tokens_per_sec, args.answer_tokens, args.tool_use_rate)
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
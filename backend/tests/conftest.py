@@ -4,23 +4,43 @@ Shared pytest configuration and fixtures for the backend test suite.
 Sets up:
   - ANTHROPIC_API_KEY env var before any app module is imported
     (app.config reads it at import time via os.environ["ANTHROPIC_API_KEY"])
+  - A throwaway CHROMA_PATH, so nothing is written to the committed chroma_db
   - A session-scoped FastAPI app instance
   - A function-scoped TestClient for endpoint tests
-  - Patch fixtures for the three callables exposed through app.main
+  - Patch fixtures for the three callables the app.main handlers call
+  - An isolated vector store (temp CHROMA_PATH / DATA_PATH, fake embeddings)
+  - A fake AsyncAnthropic message stream (FakeAsyncStream / fake_final)
 """
+import asyncio
+import atexit
+import hashlib
 import os
+import shutil
+import tempfile
+from types import SimpleNamespace
 from unittest.mock import patch
 
+import numpy as np
 import pytest
 from fastapi.testclient import TestClient
+from langchain_core.embeddings import Embeddings
 
 # Must be set before any app module is imported.
 os.environ.setdefault("ANTHROPIC_API_KEY", "test-key-for-unit-tests")
-
-# Patch targets — functions imported into app.main's namespace.
-_PATCH_RETRIEVE = "app.main.retrieve_and_stream"
-_PATCH_INGEST = "app.main.ingest_documents"
-_PATCH_SOURCES = "app.main.list_sources"
+# Keep the persistent embedding cache out of the working tree during tests.
+os.environ.setdefault("EMBED_CACHE_PATH", "")
+# Chat answers are not cached unless a test builds its own ResponseCache.
+os.environ.setdefault("RESPONSE_CACHE_SIZE", "0")
+# Tests that mock get_db still build sidecar indexes (BM25, titles) under
+# CHROMA_PATH; keep those out of the committed backend/chroma_db.
+if "CHROMA_PATH" not in os.environ:
+    os.environ["CHROMA_PATH"] = tempfile.mkdtemp(prefix="rag-test-chroma-")
+    atexit.register(shutil.rmtree, os.environ["CHROMA_PATH"], ignore_errors=True)
+
+# Patch targets — app.main imports these from their modules inside the handlers.
+_PATCH_RETRIEVE = "app.rag.aretrieve_and_stream"
+_PATCH_INGEST = "app.jobs.ingest_documents"
+_PATCH_SOURCES = "app.ingest.list_sources"
 
 
 # ── App / client ───────────────────────────────────────────────────────────────
@@ -42,8 +62,12 @@ def client(fastapi_app):
 
 @pytest.fixture()
 def mock_retrieve():
-    """Patch retrieve_and_stream to yield two text chunks without real I/O."""
-    with patch(_PATCH_RETRIEVE, return_value=iter(["Hello ", "world."])) as mock:
+    """Patch aretrieve_and_stream to yield two text chunks without real I/O."""
+    async def fake_stream(query):
+        for chunk in ["Hello ", "world."]:
+            yield chunk
+
+    with patch(_PATCH_RETRIEVE, side_effect=fake_stream) as mock:
         yield mock
 
 
@@ -65,3 +89,87 @@ def mock_list_sources():
         return_value=["data/doc1.txt", "data/doc2.md"],
     ) as mock:
         yield mock
+
+
+# ── Fakes ─────────────────────────────────────────────────────────────────────
+
+def fake_final(stop_reason="end_turn", content=(), usage=None):
+    """A final Message: stop_reason, content blocks and (optionally) token usage."""
+    return SimpleNamespace(stop_reason=stop_reason, content=list(content), usage=usage)
+
+
+class FakeAsyncStream:
+    """
+    Stand-in for the async context manager returned by
+    AsyncAnthropic().messages.stream(): waits ttft seconds on entry, then
+    yields chunks (delay seconds before each) and returns final.
+    """
+
+    def __init__(self, chunks=(), final=None, delay=0.0, ttft=0.0):
+        self._chunks = list(chunks)
+        self._final = final if final is not None else fake_final()
+        self._delay = delay
+        self._ttft = ttft
+
+    async def __aenter__(self):
+        if self._ttft:
+            await asyncio.sleep(self._ttft)
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for chunk in self._chunks:
+            if self._delay:
+                await asyncio.sleep(self._delay)
+            yield chunk
+
+    async def get_final_message(self):
+        return self._final
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic bag-of-words hashing embedder — no ONNX model download."""
+
+    dim = 64
+
+    def __init__(self):
+        self.calls = 0
+
+    def _vector(self, text: str) -> list[float]:
+        v = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            v[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+        norm = np.linalg.norm(v)
+        return (v / norm if norm else v).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        return self._vector(text)
+
+
+# ── Isolated vector store ─────────────────────────────────────────────────────
+
+@pytest.fixture()
+def isolated_store(tmp_path, monkeypatch):
+    """
+    Point the shared store and ingest at temp directories and replace the
+    ONNX model with FakeEmbeddings. Yields the DATA_PATH directory.
+    """
+    from app import ingest, store
+
+    data_dir = tmp_path / "data"
+    data_dir.mkdir()
+    chroma_dir = str(tmp_path / "chroma_db")
+    monkeypatch.setattr(store, "CHROMA_PATH", chroma_dir)
+    monkeypatch.setattr(ingest, "DATA_PATH", str(data_dir))
+    monkeypatch.setattr("app.embeddings.OnnxEmbeddings", FakeEmbeddings)
+    store.reset()
+    yield data_dir
+    store.reset()
@@ -0,0 +1,221 @@
+"""
+Tests for chat admission control (app.admission).
+
+Covers:
+  - A gate admits up to its limit and hands released slots to waiters in FIFO order
+  - A full queue is refused at once with 429, a long wait with 503, both with Retry-After
+  - A cancelled waiter neither keeps a slot nor blocks the queue
+  - /api/chat maps rejections to HTTP status + Retry-After and frees its slot after
+    streaming, on the event loop even if the body never started
+  - A saturated LLM stage turns into a "busy" chunk instead of an error
+  - Queue depth and wait times are exported on /api/metrics; the JSON stats
+    endpoints need the ingest secret
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import admission, metrics
+from app.admission import Gate, Rejected
+from app.rag import aretrieve_and_stream
+from tests.conftest import FakeAsyncStream
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# ── Gate ──────────────────────────────────────────────────────────────────────
+
+def test_gate_queues_beyond_limit_and_hands_over_in_order():
+    async def scenario():
+        gate = Gate("t", limit=2, queue_size=4, timeout=1)
+        first, second = await gate.acquire(), await gate.acquire()
+        order = []
+
+        async def waiter(name):
+            slot = await gate.acquire()
+            order.append(name)
+            return slot
+
+        tasks = [asyncio.create_task(waiter(n)) for n in ("a", "b")]
+        await asyncio.sleep(0)
+        assert (gate.active, gate.queued) == (2, 2)
+
+        first.release()
+        first.release()  # idempotent
+        second.release()
+        slots = await asyncio.gather(*tasks)
+        assert order == ["a", "b"]
+        assert (gate.active, gate.queued) == (2, 0)
+        for slot in slots:
+            slot.release()
+        assert gate.active == 0
+
+    _run(scenario())
+
+
+def test_full_queue_is_rejected_immediately_with_429():
+    async def scenario():
+        gate = Gate("t", limit=1, queue_size=0, timeout=5)
+        await gate.acquire()
+        with pytest.raises(Rejected) as info:
+            await gate.acquire()
+        return gate, info.value
+
+    gate, exc = _run(scenario())
+
+    assert exc.status_code == 429
+    assert exc.retry_after >= 1
+    assert gate.rejected == {"queue_full": 1, "timeout": 0}
+
+
+def test_wait_timeout_is_rejected_with_503_and_leaves_queue():
+    async def scenario():
+        gate = Gate("t", limit=1, queue_size=4, timeout=0.02)
+        held = await gate.acquire()
+        with pytest.raises(Rejected) as info:
+            await gate.acquire()
+        assert gate.queued == 0
+        held.release()
+        return gate, info.value
+
+    gate, exc = _run(scenario())
+
+    assert exc.status_code == 503
+    assert gate.active == 0
+    assert gate.rejected["timeout"] == 1
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        gate = Gate("t", limit=1, queue_size=4, timeout=1)
+        held = await gate.acquire()
+        task = asyncio.create_task(gate.acquire())
+        await asyncio.sleep(0)
+        task.cancel()
+        await asyncio.sleep(0)
+        held.release()
+        assert gate.active == 0
+        (await gate.acquire()).release()
+        assert gate.active == 0
+
+    _run(scenario())
+
+
+def test_retry_after_grows_with_queue_and_hold_time():
+    gate = Gate("t", limit=2, queue_size=None, timeout=1)
+    gate._mean_hold = 3.0
+    assert gate.retry_after() == 2
+    loop = asyncio.new_event_loop()
+    gate._waiters.extend(loop.create_future() for _ in range(3))
+    assert gate.retry_after() == 6
+    loop.close()
+
+
+# ── /api/chat ─────────────────────────────────────────────────────────────────
+
+def test_chat_returns_429_with_retry_after_when_queue_full(client, mock_retrieve):
+    gate = Gate("chat", limit=1, queue_size=0, timeout=1)
+    gate.active = 1
+    with patch.object(admission, "chat", gate):
+        response = client.post("/api/chat", json={"query": "Hi"})
+
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+    mock_retrieve.assert_not_called()
+
+
+def test_chat_returns_503_when_no_slot_frees_up_in_time(client, mock_retrieve):
+    gate = Gate("chat", limit=1, queue_size=4, timeout=0.02)
+    gate.active = 1
+    with patch.object(admission, "chat", gate):
+        response = client.post("/api/chat", json={"query": "Hi"})
+
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+
+
+def test_chat_slot_released_after_stream(client, mock_retrieve):
+    gate = Gate("chat", limit=1, queue_size=0, timeout=1)
+    with patch.object(admission, "chat", gate):
+        first = client.post("/api/chat", json={"query": "Hi"})
+        second = client.post("/api/chat", json={"query": "Hi again"})
+
+    assert first.status_code == second.status_code == 200
+    assert "data: [DONE]" in second.text
+    assert gate.active == 0 and gate.admitted == 2
+
+
+def test_chat_slot_released_on_event_loop_when_body_never_starts(mock_retrieve):
+    from app.main import chat, ChatRequest
+
+    async def scenario():
+        gate = Gate("chat", limit=1, queue_size=0, timeout=1)
+        with patch.object(admission, "chat", gate):
+            response = await chat(ChatRequest(query="Hi"))
+        assert gate.active == 1
+        loop_thread = threading.get_ident()
+        released_on = []
+        original = gate._release
+        gate._release = lambda held: (released_on.append(threading.get_ident()), original(held))
+        await response.background()  # client gone before the body generator ran
+        return gate, released_on, loop_thread
+
+    gate, released_on, loop_thread = _run(scenario())
+
+    assert gate.active == 0
+    assert released_on == [loop_thread]
+
+
+# ── Stage gates ───────────────────────────────────────────────────────────────
+
+def test_saturated_llm_stage_streams_busy_message(capsys):
+    gate = Gate("llm", limit=1, queue_size=None, timeout=0.02)
+    gate.active = 1
+    db = MagicMock()
+    db.similarity_search.return_value = [
+        SimpleNamespace(page_content="Pawfect Pet Grooming.", metadata={"source": "data/projects.md"})
+    ]
+    client = MagicMock()
+    client.messages.stream.return_value = FakeAsyncStream(["never"])
+
+    async def collect():
+        return [c async for c in aretrieve_and_stream("Who is Jalin?")]
+
+    with patch.object(admission, "llm", gate), \
+            patch("app.rag.store.get_db", return_value=db), \
+            patch("app.rag.llm.get_async_client", return_value=client):
+        chunks = _run(collect())
+
+    assert len(chunks) == 1 and chunks[0].startswith("The assistant is busy")
+    client.messages.stream.assert_not_called()
+    assert '"outcome": "rejected"' in capsys.readouterr().out
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+
+def test_gate_metrics_exported(client, mock_retrieve, monkeypatch):
+    monkeypatch.setattr("app.main._INGEST_SECRET", "s3cret")
+    metrics.reset()
+    client.post("/api/chat", json={"query": "Hi"})
+
+    body = client.get("/api/metrics").text
+
+    assert 'rag_gate_wait_seconds_count{gate="chat"} 1' in body
+    assert 'rag_gate_queue_depth{gate="llm"} 0' in body
+    assert 'rag_gate_rejected_total{gate="chat",reason="queue_full"}' in body
+    admin = client.get("/api/admission", headers={"Authorization": "Bearer s3cret"})
+    assert admin.json()["chat"]["active"] == 0
+
+
+def test_stats_endpoints_require_auth(client, monkeypatch):
+    monkeypatch.setattr("app.main._INGEST_SECRET", "s3cret")
+
+    for path in ("/api/admission", "/api/llm/connections", "/api/llm/usage"):
+        assert client.get(path).status_code == 401
+        assert client.get(path, headers={"Authorization": "Bearer wrong"}).status_code == 401
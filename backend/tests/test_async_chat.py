@@ -0,0 +1,256 @@
+"""
+Tests for the async chat pipeline (aretrieve_and_stream) built on AsyncAnthropic.
+
+Covers:
+  - Direct answer streamed from the async client
+  - Tool round: execute_tool runs off the event loop, result fed back to Claude
+  - Retrieval errors surface as a text chunk instead of raising
+  - Many concurrent streams overlap on a single event loop
+  - SDK response blocks are sent back as plain dicts in the next round
+  - A tool call on a prefetched project is answered without execute_tool
+  - An unfinished prefetch is skipped, never waited for, and never holds
+    a tool-pool thread
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from app.rag import aretrieve_and_stream
+from tests.conftest import FakeAsyncStream, fake_final
+
+
+# ── Helpers ────────────────────────────────────────────────────────────────────
+
+def _doc(content="Sample portfolio content."):
+    doc = MagicMock()
+    doc.page_content = content
+    doc.metadata = {"source": "data/test.txt"}
+    return doc
+
+
+def _tool_block(name, tool_input, block_id):
+    block = MagicMock()
+    block.type = "tool_use"
+    block.name = name
+    block.input = tool_input
+    block.id = block_id
+    return block
+
+
+def _async_client(*streams):
+    client = MagicMock()
+    client.messages.stream.side_effect = list(streams)
+    return client
+
+
+def _collect(query):
+    async def run():
+        return [chunk async for chunk in aretrieve_and_stream(query)]
+    return asyncio.run(run())
+
+
+def _patch_db(docs):
+    db = MagicMock()
+    db.similarity_search.return_value = docs
+    return patch("app.rag.store.get_db", return_value=db)
+
+
+# ── Tests ──────────────────────────────────────────────────────────────────────
+
+def test_direct_answer_streams_from_async_client():
+    client = _async_client(FakeAsyncStream(["Jalin ", "builds sites."], fake_final()))
+    with _patch_db([_doc()]), patch("app.rag.llm.get_async_client", return_value=client):
+        result = _collect("Who is Jalin?")
+
+    assert result == ["Jalin ", "builds sites."]
+    assert client.messages.stream.call_count == 1
+
+
+def test_tool_round_runs_tool_off_the_event_loop():
+    block = _tool_block("get_project_details", {"project_title": "Pawfect"}, "toolu_01")
+    client = _async_client(
+        FakeAsyncStream([], fake_final("tool_use", [block])),
+        FakeAsyncStream(["Booking flow."], fake_final()),
+    )
+    tool_threads = []
+
+    def fake_tool(name, inputs):
+        tool_threads.append(threading.current_thread().name)
+        return "Pawfect: 4-step booking."
+
+    with _patch_db([_doc()]), \
+            patch("app.rag.llm.get_async_client", return_value=client), \
+            patch("app.rag.execute_tool", side_effect=fake_tool):
+        result = _collect("Details on Pawfect?")
+
+    assert result == ["Booking flow."]
+    assert tool_threads and tool_threads[0].startswith("tool")
+    round1 = client.messages.stream.call_args_list[1].kwargs["messages"]
+    assert round1[2]["content"][0]["tool_use_id"] == "toolu_01"
+    assert "4-step booking" in round1[2]["content"][0]["content"]
+
+
+def test_retrieval_error_is_reported_as_text():
+    with patch("app.rag.store.get_db", side_effect=RuntimeError("db locked")):
+        result = _collect("Who is Jalin?")
+
+    assert len(result) == 1
+    assert "db locked" in result[0]
+
+
+def test_concurrent_streams_overlap():
+    n, delay, chunks = 50, 0.02, 5
+
+    def make_client(**_):
+        client = MagicMock()
+        client.messages.stream.side_effect = lambda **kw: FakeAsyncStream(
+            ["x"] * chunks, fake_final(), delay=delay
+        )
+        return client
+
+    async def run_all():
+        async def one(i):
+            return [c async for c in aretrieve_and_stream(f"q{i}")]
+        return await asyncio.gather(*(one(i) for i in range(n)))
+
+    with _patch_db([_doc()]), patch("app.rag.llm.get_async_client", side_effect=make_client):
+        start = time.perf_counter()
+        results = asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+
+    assert all(r == ["x"] * chunks for r in results)
+    # Serial execution would take n * chunks * delay = 5s
+    assert elapsed < n * chunks * delay / 5
+
+
+def test_tool_calls_in_one_round_run_concurrently():
+    blocks = [
+        _tool_block("get_project_details", {"project_title": t}, f"toolu_{i}")
+        for i, t in enumerate(["A", "B", "C"])
+    ]
+    client = _async_client(
+        FakeAsyncStream([], fake_final("tool_use", blocks)),
+        FakeAsyncStream(["ok"], fake_final()),
+    )
+
+    def slow_tool(name, inputs):
+        time.sleep(0.3)
+        return inputs["project_title"]
+
+    with _patch_db([_doc()]), \
+            patch("app.rag.llm.get_async_client", return_value=client), \
+            patch("app.rag.execute_tool", side_effect=slow_tool):
+        start = time.perf_counter()
+        _collect("Compare A, B and C")
+        elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.6
+    results = client.messages.stream.call_args_list[1].kwargs["messages"][2]["content"]
+    assert [r["content"] for r in results] == ["A", "B", "C"]
+
+
+def test_sdk_content_blocks_are_resent_as_dicts():
+    from anthropic.types import ToolUseBlock
+
+    block = ToolUseBlock(id="toolu_02", input={"project_title": "KDF"}, name="get_project_details", type="tool_use")
+    client = _async_client(
+        FakeAsyncStream([], fake_final("tool_use", [block])),
+        FakeAsyncStream(["Custom CMS."], fake_final()),
+    )
+
+    with _patch_db([_doc()]), \
+            patch("app.rag.llm.get_async_client", return_value=client), \
+            patch("app.rag.execute_tool", return_value="KDF: custom CMS."):
+        result = _collect("Details on KDF?")
+
+    assert result == ["Custom CMS."]
+    assistant = client.messages.stream.call_args_list[1].kwargs["messages"][1]
+    assert assistant["content"] == [
+        {"id": "toolu_02", "input": {"project_title": "KDF"}, "name": "get_project_details", "type": "tool_use"}
+    ]
+
+
+def test_tool_call_answered_from_prefetch():
+    from types import SimpleNamespace
+
+    from app.search_tools import Prefetch
+
+    block = _tool_block("get_project_details", {"project_title": "pawfect"}, "toolu_01")
+    client = _async_client(
+        # Round 1 takes long enough for the prefetch to finish
+        FakeAsyncStream([], fake_final("tool_use", [block]), ttft=0.05),
+        FakeAsyncStream(["Booking flow."], fake_final()),
+    )
+    index = SimpleNamespace(lookup=lambda q: ("Pawfect Pet Grooming", []) if "pawfect" in q else None)
+    prefetch = Prefetch(index, {"Pawfect Pet Grooming": "(source: data/projects.md)\nPrefetched."})
+
+    with _patch_db([_doc()]), \
+            patch("app.rag.llm.get_async_client", return_value=client), \
+            patch("app.rag.prefetch_project_details", return_value=prefetch), \
+            patch("app.rag.execute_tool", side_effect=AssertionError("tool ran")):
+        result = _collect("Details on Pawfect?")
+
+    assert result == ["Booking flow."]
+    tool_turn = client.messages.stream.call_args_list[1].kwargs["messages"][2]
+    assert tool_turn["content"][0] == {
+        "type": "tool_result", "tool_use_id": "toolu_01", "content": "(source: data/projects.md)\nPrefetched.",
+    }
+
+
+def test_unfinished_prefetch_is_not_waited_for():
+    block = _tool_block("get_project_details", {"project_title": "Pawfect"}, "toolu_01")
+    client = _async_client(
+        FakeAsyncStream([], fake_final("tool_use", [block])),
+        FakeAsyncStream(["Booking flow."], fake_final()),
+    )
+    release = threading.Event()
+
+    def slow_prefetch(docs, limit):
+        release.wait(5)
+        return None
+
+    with _patch_db([_doc()]), \
+            patch("app.rag.llm.get_async_client", return_value=client), \
+            patch("app.rag.prefetch_project_details", side_effect=slow_prefetch), \
+            patch("app.rag.execute_tool", return_value="Pawfect: 4-step booking.") as tool:
+        start = time.perf_counter()
+        result = _collect("Details on Pawfect?")
+        elapsed = time.perf_counter() - start
+    release.set()
+
+    assert result == ["Booking flow."]
+    tool.assert_called_once()
+    assert elapsed < 1
+
+
+def test_tool_calls_do_not_queue_behind_prefetches():
+    from concurrent.futures import ThreadPoolExecutor
+
+    block = _tool_block("get_project_details", {"project_title": "Pawfect"}, "toolu_01")
+    client = _async_client(
+        FakeAsyncStream([], fake_final("tool_use", [block]), ttft=0.05),
+        FakeAsyncStream(["Booking flow."], fake_final()),
+    )
+    release = threading.Event()
+
+    def stuck_prefetch(docs, limit):
+        release.wait(5)
+        return None
+
+    tool_pool = ThreadPoolExecutor(max_workers=1)
+    with _patch_db([_doc()]), \
+            patch("app.rag._tool_executor", tool_pool), \
+            patch("app.rag.llm.get_async_client", return_value=client), \
+            patch("app.rag.prefetch_project_details", side_effect=stuck_prefetch), \
+            patch("app.rag.execute_tool", return_value="Pawfect: 4-step booking.") as tool:
+        start = time.perf_counter()
+        result = _collect("Details on Pawfect?")
+        elapsed = time.perf_counter() - start
+    release.set()
+    tool_pool.shutdown()
+
+    assert result == ["Booking flow."]
+    tool.assert_called_once()
+    assert elapsed < 1
@@ -0,0 +1,172 @@
+"""
+Tests for cross-request query-embedding micro-batching (app.batching).
+
+Covers:
+  - Concurrent sync callers share one inference and get their own rows
+  - max_batch caps a batch; a lone query is answered after the window
+  - aembed_query batches concurrent coroutines without blocking the loop
+  - An inference error reaches every caller in the batch
+  - A cancelled or timed-out query is skipped and the worker keeps serving
+  - Document embedding bypasses the queue; other attributes pass through
+  - store.get_embeddings() wraps the model unless QUERY_BATCH_MAX is 1
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from app import store
+from app.batching import EmbeddingBatcher, query_vector
+
+
+class _Recording:
+    dim = 4
+
+    def __init__(self, delay=0.02, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.batches = []
+
+    def embed_documents_array(self, texts):
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("onnx failed")
+        return np.array([[len(t), 0, 0, 0] for t in texts], dtype=np.float32)
+
+    def embed_documents(self, texts):
+        return self.embed_documents_array(texts).tolist()
+
+
+def test_concurrent_queries_share_an_inference():
+    inner = _Recording()
+    batcher = EmbeddingBatcher(inner, max_batch=32, window_ms=20)
+    texts = ["x" * n for n in range(1, 17)]
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        vectors = list(pool.map(batcher.embed_query, texts))
+
+    assert [v[0] for v in vectors] == [float(len(t)) for t in texts]
+    assert len(inner.batches) < len(texts) / 2
+    assert batcher.stats()["queries"] == 16
+    batcher.close()
+
+
+def test_max_batch_caps_batch_size():
+    inner = _Recording()
+    batcher = EmbeddingBatcher(inner, max_batch=4, window_ms=20)
+
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        list(pool.map(batcher.embed_query, ["q"] * 12))
+
+    assert max(len(b) for b in inner.batches) <= 4
+    batcher.close()
+
+
+def test_lone_query_waits_at_most_the_window():
+    batcher = EmbeddingBatcher(_Recording(delay=0), max_batch=32, window_ms=5)
+
+    start = time.perf_counter()
+    batcher.embed_query("hello")
+
+    assert time.perf_counter() - start < 0.5
+    batcher.close()
+
+
+def test_async_queries_are_batched():
+    inner = _Recording()
+    batcher = EmbeddingBatcher(inner, max_batch=32, window_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.aembed_query("q" * n) for n in range(1, 9)))
+
+    vectors = asyncio.run(main())
+
+    assert [v[0] for v in vectors] == [float(n) for n in range(1, 9)]
+    assert len(inner.batches) <= 2
+    batcher.close()
+
+
+def test_errors_reach_every_caller():
+    batcher = EmbeddingBatcher(_Recording(fail=True), max_batch=8, window_ms=20)
+    errors = []
+
+    def call():
+        try:
+            batcher.embed_query("q")
+        except RuntimeError as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 4
+    batcher.close()
+
+
+def test_cancelled_query_does_not_stop_the_worker():
+    inner = _Recording(delay=0.05)
+    batcher = EmbeddingBatcher(inner, max_batch=1, window_ms=0)
+    busy = batcher.submit("busy")
+    time.sleep(0.01)  # worker is now inside the first inference
+    cancelled = batcher.submit("cancelled")
+    assert cancelled.cancel()
+
+    assert busy.result(timeout=1)[0] == 4.0
+    assert batcher.embed_query("after")[0] == 5.0
+    assert ["cancelled"] not in inner.batches
+    batcher.close()
+
+
+def test_sync_query_times_out_and_worker_recovers():
+    batcher = EmbeddingBatcher(_Recording(delay=0.2), max_batch=1, window_ms=0, timeout=0.05)
+
+    with pytest.raises(TimeoutError):
+        batcher.embed_query("slow")
+
+    batcher.timeout = 2
+    assert batcher.embed_query("next")[0] == 4.0
+    batcher.close()
+
+
+def test_documents_bypass_queue_and_attributes_pass_through():
+    inner = _Recording(delay=0)
+    batcher = EmbeddingBatcher(inner)
+
+    batcher.embed_documents(["a", "bb"])
+    matrix = batcher.embed_documents_array(["ccc"])
+
+    assert batcher._worker is None
+    assert batcher.dim == 4
+    assert matrix[0][0] == 3.0
+    assert query_vector(batcher, "dddd")[0] == 4.0
+    batcher.close()
+
+
+def test_closed_batcher_rejects_queries():
+    batcher = EmbeddingBatcher(_Recording(delay=0))
+    batcher.embed_query("warm")
+    batcher.close()
+
+    with pytest.raises(RuntimeError):
+        batcher.embed_query("late")
+
+
+# ── Shared store wiring ───────────────────────────────────────────────────────
+
+def test_store_wraps_embeddings_in_batcher(isolated_store):
+    embeddings = store.get_embeddings()
+    assert isinstance(embeddings, EmbeddingBatcher)
+    assert len(embeddings.embed_query("pawfect grooming")) == embeddings.dim
+
+
+def test_batching_can_be_disabled(isolated_store, monkeypatch):
+    monkeypatch.setattr(store, "QUERY_BATCH_MAX", 1)
+    assert not isinstance(store.get_embeddings(), EmbeddingBatcher)
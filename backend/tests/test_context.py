@@ -0,0 +1,166 @@
+"""
+Tests for chat context assembly (app.context).
+
+Covers:
+  - Overlapping / touching chunks of one source merge via start_index
+  - Chunks without start_index merge on their shared boundary text
+  - Different sources or PDF pages never merge
+  - Near-duplicate passages (by chunk embeddings) are dropped, distinct ones
+    kept in rank order; dedup is skipped until the model is loaded
+  - The token budget cuts at a line break and always keeps the top passage
+  - Ingest records start_index on every chunk, and an incremental re-ingest
+    refreshes it on chunks whose text did not change
+"""
+
+import os
+
+from langchain_core.documents import Document
+
+from app import context, store
+from app.context import build_context, drop_near_duplicates, merge_chunks, pack
+from app.ingest import _split, ingest_documents
+
+_TEXT = (
+    "Jalin builds responsive websites for small businesses.\n"
+    "Pawfect Pet Grooming got an online booking flow with reminders.\n"
+    "Kingdom Development Foundation runs on a custom CMS with donations.\n"
+)
+
+
+def _doc(text, source="data/projects.md", **metadata):
+    return Document(page_content=text, metadata={"source": source, **metadata})
+
+
+# ── Merging ───────────────────────────────────────────────────────────────────
+
+def test_overlapping_chunks_merge_by_start_index():
+    first, second = _TEXT[:80], _TEXT[60:]
+    docs = [_doc(second, start_index=60), _doc(first, start_index=0)]
+
+    passages = merge_chunks(docs)
+
+    assert len(passages) == 1
+    assert passages[0].text == _TEXT
+
+
+def test_touching_chunks_merge_across_dropped_whitespace():
+    docs = [_doc("First paragraph.", start_index=0), _doc("Second paragraph.", start_index=17)]
+
+    (passage,) = merge_chunks(docs)
+
+    assert passage.text == "First paragraph.\nSecond paragraph."
+
+
+def test_chunks_without_offsets_merge_on_shared_text():
+    docs = [_doc(_TEXT[:120]), _doc(_TEXT[90:])]
+
+    (passage,) = merge_chunks(docs)
+
+    assert passage.text == _TEXT
+
+
+def test_bridging_chunk_joins_two_passages():
+    docs = [
+        _doc(_TEXT[:60], start_index=0),
+        _doc(_TEXT[120:], start_index=120),
+        _doc(_TEXT[50:130], start_index=50),
+    ]
+
+    assert [p.text for p in merge_chunks(docs)] == [_TEXT]
+
+
+def test_other_sources_and_pages_stay_separate():
+    docs = [
+        _doc(_TEXT[:80], start_index=0),
+        _doc(_TEXT[60:], source="data/faq.md", start_index=60),
+        _doc(_TEXT[:80], source="cv.pdf", page=0, start_index=0),
+        _doc(_TEXT[60:], source="cv.pdf", page=1, start_index=60),
+    ]
+
+    assert len(merge_chunks(docs)) == 4
+
+
+# ── Deduplication ─────────────────────────────────────────────────────────────
+
+def test_near_duplicates_dropped_in_rank_order(isolated_store):
+    store.get_embeddings()
+    docs = [
+        _doc("Pawfect Pet Grooming online booking and reminders for busy groomers", source="a.md"),
+        _doc("Contact Jalin by email for a quote.", source="b.md"),
+        _doc("Pawfect Pet Grooming online booking and reminders for busy groomers too", source="c.md"),
+    ]
+
+    kept = drop_near_duplicates(merge_chunks(docs), threshold=0.9)
+
+    assert [p.source for p in kept] == ["a.md", "b.md"]
+    assert len(drop_near_duplicates(merge_chunks(docs), threshold=0)) == 3
+
+
+def test_dedup_embeds_each_merged_chunk_and_waits_for_the_model():
+    docs = [_doc(_TEXT[:80], start_index=0), _doc(_TEXT[60:], start_index=60), _doc("Skills: React.", source="s.md")]
+    seen = []
+
+    def embed(texts):
+        seen.append(list(texts))
+        return [[1.0, 0.0]] * len(texts)
+
+    assert [p.source for p in drop_near_duplicates(merge_chunks(docs), 0.9, embed)] == ["data/projects.md"]
+    assert seen == [[_TEXT[:80], _TEXT[60:], "Skills: React."]]
+    # No shared model loaded yet: nothing is dropped and nothing is loaded
+    assert store.loaded_embeddings() is None
+    assert len(drop_near_duplicates(merge_chunks(docs), 0.9)) == 2
+
+
+# ── Token budget ──────────────────────────────────────────────────────────────
+
+def test_budget_cuts_last_passage_at_a_break():
+    docs = [_doc("a" * 200, source="a.md"), _doc(_TEXT * 3, source="b.md")]
+
+    packed = pack(merge_chunks(docs), budget=50 + 45)
+
+    assert [s for s, _ in packed] == ["a.md", "b.md"]
+    assert packed[1][1].endswith("booking flow with reminders.")
+    assert sum(context.estimate_tokens(t) for _, t in packed) <= 95
+
+
+def test_budget_always_keeps_top_passage():
+    packed = pack(merge_chunks([_doc(_TEXT * 10)]), budget=30)
+
+    assert len(packed) == 1
+    assert 0 < context.estimate_tokens(packed[0][1]) <= 30
+
+
+def test_build_context_numbers_passages():
+    docs = [_doc(_TEXT[:80], start_index=0), _doc("Skills: React.", source="s.md"), _doc(_TEXT[60:], start_index=60)]
+
+    text = build_context(docs)
+
+    assert text == f"[1] (source: data/projects.md)\n{_TEXT}\n\n---\n\n[2] (source: s.md)\nSkills: React."
+
+
+def test_ingest_records_start_index():
+    full = _TEXT * 20
+    chunks = _split([_doc(full)], chunk_size=120, chunk_overlap=30)
+
+    assert all(full[c.metadata["start_index"]:].startswith(c.page_content) for c in chunks)
+    assert len(merge_chunks(chunks)) == 1
+
+
+def test_incremental_ingest_refreshes_start_index(isolated_store):
+    paragraphs = [f"Paragraph {i}. " + " ".join(f"detail{i}x{j}" for j in range(30)) for i in range(7)]
+    path = isolated_store / "about.md"
+    path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+    ingest_documents()
+
+    edited = "New intro line.\n\n" + "\n\n".join(paragraphs)
+    path.write_text(edited, encoding="utf-8")
+    st = path.stat()
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+    result = ingest_documents()
+
+    assert result["chunks_refreshed"] > 0
+    data = store.get_db().get()
+    assert all(edited[m["start_index"]:].startswith(t) for t, m in zip(data["documents"], data["metadatas"]))
+    docs = [Document(page_content=t, metadata=m) for t, m in zip(data["documents"], data["metadatas"])]
+    text = build_context(docs)
+    assert all(text.count(f"Paragraph {i}.") == 1 for i in range(7))
@@ -0,0 +1,185 @@
+"""
+Tests for the batched, NumPy-native embedding path in app.embeddings.
+
+The ONNX model is replaced by a stub that records the batches it receives,
+so no model download is needed.
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.embeddings import OnnxEmbeddings
+
+
+class _StubOnnx:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return [np.full(OnnxEmbeddings.dim, len(t), dtype=np.float32) for t in texts]
+
+
+@pytest.fixture()
+def stub_onnx():
+    stub = _StubOnnx()
+    with patch("chromadb.utils.embedding_functions.ONNXMiniLM_L6_V2", return_value=stub):
+        yield stub
+
+
+def test_array_path_batches_and_returns_float32(stub_onnx):
+    emb = OnnxEmbeddings(batch_size=4)
+    texts = ["a" * i for i in range(1, 11)]
+
+    out = emb.embed_documents_array(texts)
+
+    assert out.dtype == np.float32
+    assert out.shape == (10, OnnxEmbeddings.dim)
+    assert [len(b) for b in stub_onnx.batches] == [4, 4, 2]
+    assert out[6, 0] == 7.0
+
+
+def test_list_paths_match_array_path(stub_onnx):
+    emb = OnnxEmbeddings(batch_size=3)
+    texts = ["one", "three", "seventeen"]
+
+    docs = emb.embed_documents(texts)
+
+    assert docs == emb.embed_documents_array(texts).tolist()
+    assert isinstance(docs[0][0], float)
+    assert emb.embed_query("three") == docs[1]
+
+
+def test_empty_input(stub_onnx):
+    emb = OnnxEmbeddings()
+    assert emb.embed_documents_array([]).shape == (0, OnnxEmbeddings.dim)
+    assert emb.embed_documents([]) == []
+    assert stub_onnx.batches == []
+
+
+# ── Persistent embedding cache ────────────────────────────────────────────────
+
+def test_cache_serves_repeats_without_model_calls(stub_onnx, tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    emb = OnnxEmbeddings(batch_size=8, cache_path=path)
+
+    first = emb.embed_documents_array(["alpha", "beta"])
+    second = emb.embed_documents_array(["beta", "gamma", "alpha"])
+
+    assert stub_onnx.batches == [["alpha", "beta"], ["gamma"]]
+    np.testing.assert_array_equal(second[0], first[1])
+    np.testing.assert_array_equal(second[2], first[0])
+    assert emb.cache.stats()["hits"] == 2
+    assert emb.cache.stats()["misses"] == 3
+
+
+def test_cache_persists_across_instances(stub_onnx, tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    OnnxEmbeddings(cache_path=path).embed_query("contact Jalin")
+    stub_onnx.batches.clear()
+
+    vector = OnnxEmbeddings(cache_path=path).embed_query("contact Jalin")
+
+    assert stub_onnx.batches == []
+    assert vector[0] == float(len("contact Jalin"))
+
+
+def test_cache_evicts_least_recently_used(stub_onnx, tmp_path):
+    from app.embedding_cache import EmbeddingCache
+
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite3"), "m", 2, max_entries=2)
+    vec = np.zeros((1, 2), dtype=np.float32)
+    cache.put_many(["a"], vec)
+    cache.put_many(["b"], vec)
+    cache.get_many(["a"])  # "b" is now least recently used
+    cache.put_many(["c"], vec)
+
+    assert set(cache.get_many(["a", "b", "c"])) == {0, 2}
+    assert cache.stats()["entries"] == 2
+
+
+def test_cache_hits_do_not_write_until_next_put(tmp_path):
+    from app.embedding_cache import EmbeddingCache
+
+    path = str(tmp_path / "c.sqlite3")
+    cache = EmbeddingCache(path, "m", 2)
+    cache.put_many(["a"], np.zeros((1, 2), dtype=np.float32))
+    changes = cache._conn.total_changes
+
+    assert 0 in cache.get_many(["a"])
+    assert cache._conn.total_changes == changes
+    assert cache._conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    cache.close()
+    reopened = EmbeddingCache(path, "m", 2)
+    assert reopened._clock == 2  # the hit's bump was written on close
+
+
+def test_cache_key_includes_model_id(tmp_path):
+    from app.embedding_cache import EmbeddingCache
+
+    path = str(tmp_path / "c.sqlite3")
+    EmbeddingCache(path, "model-a", 2).put_many(["x"], np.ones((1, 2), dtype=np.float32))
+
+    assert EmbeddingCache(path, "model-b", 2).get_many(["x"]) == {}
+
+
+# ── ONNX session tuning and warm-up ───────────────────────────────────────────
+
+def test_session_options_follow_config():
+    import onnxruntime as ort
+    from app.embeddings import session_options
+
+    so = session_options(ort, intra_op_threads=2, inter_op_threads=1, optimization="basic")
+
+    assert so.intra_op_num_threads == 2
+    assert so.inter_op_num_threads == 1
+    assert so.graph_optimization_level == ort.GraphOptimizationLevel.ORT_ENABLE_BASIC
+    assert so.execution_mode == ort.ExecutionMode.ORT_SEQUENTIAL
+    with pytest.raises(ValueError):
+        session_options(ort, optimization="max")
+
+
+def test_warm_up_opens_tuned_session_once():
+    class _FakeOrt:
+        def __init__(self):
+            import onnxruntime
+            self.SessionOptions = onnxruntime.SessionOptions
+            self.GraphOptimizationLevel = onnxruntime.GraphOptimizationLevel
+            self.ExecutionMode = onnxruntime.ExecutionMode
+            self.sessions = []
+
+        def get_available_providers(self):
+            return ["CoreMLExecutionProvider", "CPUExecutionProvider"]
+
+        def InferenceSession(self, path, providers, sess_options):
+            self.sessions.append((path, providers, sess_options))
+            return "session"
+
+    class _Downloadable(_StubOnnx):
+        DOWNLOAD_PATH = "/models"
+        EXTRACTED_FOLDER_NAME = "onnx"
+
+        def __init__(self):
+            super().__init__()
+            self.ort = _FakeOrt()
+            self.downloads = 0
+
+        def _download_model_if_not_exists(self):
+            self.downloads += 1
+
+    fn = _Downloadable()
+    with patch("chromadb.utils.embedding_functions.ONNXMiniLM_L6_V2", return_value=fn):
+        emb = OnnxEmbeddings(cache_path="")
+        elapsed = emb.warm_up()
+        emb.embed_query("hello")
+
+    assert elapsed >= 0
+    assert fn.downloads == 1
+    assert fn.model == "session"
+    (path, providers, options), = fn.ort.sessions
+    assert path.endswith("model.onnx")
+    assert providers == ["CPUExecutionProvider"]
+    assert fn.batches == [["warm-up"], ["hello"]]
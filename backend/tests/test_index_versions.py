@@ -0,0 +1,149 @@
+"""
+Tests for blue/green index versions (app.store activate / rollback / GC).
+
+Covers:
+  - Readers keep seeing the old index while a full rebuild is in progress
+  - A failed rebuild drops its half-built collection and leaves the active one
+  - Only INDEX_KEEP_VERSIONS versions (and their sidecars) are kept
+  - rollback() re-activates the previous version; incremental ingest follows it
+  - A pointer change made by another process is picked up by get_db()
+  - GET /api/index, POST /api/index/rollback and the index_admin CLI
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app import store
+from app.ingest import ingest_documents
+
+_AUTH = {"Authorization": "Bearer s3cret"}
+
+
+def _texts():
+    return sorted(store.get_db().get()["documents"])
+
+
+def _collections():
+    return {c.name for c in store.get_db()._client.list_collections()}
+
+
+def test_chat_sees_old_index_during_full_rebuild(isolated_store):
+    (isolated_store / "about.md").write_text("Old biography.")
+    ingest_documents()
+    (isolated_store / "about.md").write_text("New biography.")
+
+    seen = []
+
+    def progress(**fields):
+        if "chunks_embedded" in fields:
+            seen.append(_texts())
+
+    result = ingest_documents(full=True, progress=progress)
+
+    assert seen and all(texts == ["Old biography."] for texts in seen)
+    assert _texts() == ["New biography."]
+    assert store.active_collection() == result["collection"]
+
+
+def test_failed_rebuild_keeps_active_index(isolated_store):
+    (isolated_store / "about.md").write_text("Stable biography.")
+    ingest_documents()
+    active = store.active_collection()
+
+    with patch("app.ingest._Indexer.flush", side_effect=RuntimeError("embed failed")):
+        with pytest.raises(RuntimeError):
+            ingest_documents(full=True)
+
+    assert store.active_collection() == active
+    assert _collections() == {active}
+    assert _texts() == ["Stable biography."]
+
+
+def test_old_versions_are_garbage_collected(isolated_store, monkeypatch):
+    monkeypatch.setattr(store, "INDEX_KEEP_VERSIONS", 2)
+    (isolated_store / "about.md").write_text("Biography.")
+    names = [ingest_documents(full=True)["collection"] for _ in range(3)]
+
+    assert store.versions() == {"active": names[2], "versions": names[1:]}
+    assert _collections() == set(names[1:])
+    sidecars = os.listdir(os.path.join(store.CHROMA_PATH, store._SIDECAR_DIR))
+    assert sorted(sidecars) == sorted(names[1:])
+
+
+def test_rollback_restores_previous_version(isolated_store):
+    (isolated_store / "about.md").write_text("First biography.")
+    first = ingest_documents()["collection"]
+    (isolated_store / "about.md").write_text("Second biography.")
+    second = ingest_documents(full=True)["collection"]
+    generation = store.generation()
+
+    assert store.rollback() == first
+
+    assert _texts() == ["First biography."]
+    assert store.versions() == {"active": first, "versions": [first]}
+    assert second not in _collections()
+    assert store.generation() > generation
+    # The restored version's manifest drives the next incremental ingest
+    result = ingest_documents()
+    assert result["mode"] == "incremental"
+    assert result["updated"] == 1
+    assert _texts() == ["Second biography."]
+
+
+def test_rollback_without_history_raises(isolated_store):
+    (isolated_store / "about.md").write_text("Biography.")
+    ingest_documents()
+
+    with pytest.raises(ValueError):
+        store.rollback()
+
+
+def test_pointer_change_from_other_process_reopens_handle(isolated_store):
+    (isolated_store / "about.md").write_text("First biography.")
+    first = ingest_documents()["collection"]
+    (isolated_store / "about.md").write_text("Second biography.")
+    ingest_documents(full=True)
+    before, generation = store.get_db(), store.generation()
+
+    # What another worker's rollback looks like from here: only the file changes
+    pointer = store.read_pointer()
+    pointer.update(active=first, revision=pointer["revision"] + 1)
+    with open(store._pointer_path(), "w", encoding="utf-8") as f:
+        json.dump(pointer, f)
+
+    assert store.get_db() is not before
+    assert store.generation() == generation + 1
+    assert _texts() == ["First biography."]
+
+
+# ── Endpoints and CLI ─────────────────────────────────────────────────────────
+
+def test_index_endpoints(client, isolated_store, monkeypatch):
+    monkeypatch.setattr("app.main._INGEST_SECRET", "s3cret")
+    (isolated_store / "about.md").write_text("Biography.")
+    first = ingest_documents()["collection"]
+    second = ingest_documents(full=True)["collection"]
+
+    assert client.get("/api/index").status_code == 401
+    assert client.get("/api/index", headers=_AUTH).json() == {
+        "active": second, "versions": [first, second],
+    }
+
+    resp = client.post("/api/index/rollback", headers=_AUTH)
+    assert resp.json()["active"] == first
+    assert client.post("/api/index/rollback", headers=_AUTH).status_code == 409
+
+
+def test_index_admin_cli(isolated_store, capsys):
+    from app.index_admin import main
+
+    (isolated_store / "about.md").write_text("Biography.")
+    first = ingest_documents()["collection"]
+    ingest_documents(full=True)
+
+    assert main(["rollback"]) == 0
+    assert f'"active": "{first}"' in capsys.readouterr().out
+    assert main(["rollback"]) == 1
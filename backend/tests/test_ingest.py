@@ -0,0 +1,226 @@
+"""
+Tests for incremental, content-hashed ingestion in app.ingest.
+
+Covers:
+  - First run (no manifest) performs a full rebuild and writes the manifest
+  - Re-ingest with no changes embeds nothing
+  - Editing one file embeds only its new chunks and deletes stale ones
+  - Added / removed files are reported and reflected in the store
+  - full=True forces a rebuild
+"""
+
+import os
+
+from app import store
+from app.ingest import ingest_documents, list_sources
+
+
+def _write(data_dir, name, text):
+    path = data_dir / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def _bump_mtime(path):
+    st = path.stat()
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+
+
+def test_first_run_is_full_rebuild(isolated_store):
+    _write(isolated_store, "about.md", "Jalin builds websites.")
+    _write(isolated_store, "faq.md", "Contact Jalin by email.")
+
+    result = ingest_documents()
+
+    assert result["mode"] == "full"
+    assert result["added"] == 2
+    assert result["chunks"] == result["chunks_embedded"] == 2
+    assert len(store.get_db().get()["ids"]) == 2
+
+
+def test_reingest_without_changes_embeds_nothing(isolated_store):
+    _write(isolated_store, "about.md", "Jalin builds websites.")
+    ingest_documents()
+
+    result = ingest_documents()
+
+    assert result["mode"] == "incremental"
+    assert result["unchanged"] == 1
+    assert result["chunks_embedded"] == 0
+    assert result["chunks_deleted"] == 0
+
+
+def test_touched_but_identical_file_is_unchanged(isolated_store):
+    path = _write(isolated_store, "about.md", "Jalin builds websites.")
+    ingest_documents()
+    _bump_mtime(path)
+
+    result = ingest_documents()
+
+    assert result["unchanged"] == 1
+    assert result["chunks_embedded"] == 0
+
+
+def test_only_changed_chunks_are_embedded(isolated_store):
+    para = "word " * 70
+    path = _write(isolated_store, "projects.md", f"{para}alpha\n\n{para}beta")
+    _write(isolated_store, "about.md", "Jalin builds websites.")
+    first = ingest_documents()
+    assert first["chunks"] == 3
+
+    path.write_text(f"{para}alpha\n\n{para}gamma", encoding="utf-8")
+    _bump_mtime(path)
+    result = ingest_documents()
+
+    assert result["updated"] == 1
+    assert result["unchanged"] == 1
+    assert result["chunks_embedded"] == 1
+    assert result["chunks_deleted"] == 1
+    contents = store.get_db().get()["documents"]
+    assert any(c.endswith("gamma") for c in contents)
+    assert not any(c.endswith("beta") for c in contents)
+    assert len(contents) == 3
+
+
+def test_added_and_removed_files(isolated_store):
+    old = _write(isolated_store, "old.md", "Retired project.")
+    ingest_documents()
+    old.unlink()
+    new = _write(isolated_store, "new.md", "Brand new project.")
+
+    result = ingest_documents()
+
+    assert result["added"] == 1
+    assert result["removed"] == 1
+    assert list_sources() == [str(new)]
+
+
+def test_full_flag_forces_rebuild(isolated_store):
+    _write(isolated_store, "about.md", "Jalin builds websites.")
+    ingest_documents()
+
+    result = ingest_documents(full=True)
+
+    assert result["mode"] == "full"
+    assert result["chunks_embedded"] == 1
+    assert len(store.get_db().get()["ids"]) == 1
+
+
+# ── Parallel parsing and batched indexing ─────────────────────────────────────
+
+def test_process_pool_parsing_matches_serial(isolated_store, monkeypatch):
+    for i in range(4):
+        _write(isolated_store, f"p{i}.md", f"Project {i} " + "detail " * 120)
+    serial = ingest_documents(full=True)
+
+    monkeypatch.setattr("app.ingest.INGEST_WORKERS", 2)
+    parallel = ingest_documents(full=True)
+
+    assert parallel["workers"] == 2
+    assert parallel["chunks"] == serial["chunks"]
+    assert sorted(store.get_db().get()["ids"]) == sorted(
+        i for entry in _manifest_chunks().values() for i in entry
+    )
+
+
+def _record_batches(monkeypatch):
+    from app.ingest import _Indexer
+
+    batch_sizes = []
+    original = _Indexer._write
+
+    def recording_write(self, n):
+        batch_sizes.append(n)
+        return original(self, n)
+
+    monkeypatch.setattr(_Indexer, "_write", recording_write)
+    return batch_sizes
+
+
+def test_chunks_are_written_in_batches(isolated_store, monkeypatch):
+    for i in range(3):
+        _write(isolated_store, f"p{i}.md", "word " * 200)
+    monkeypatch.setattr("app.ingest.INGEST_BATCH_SIZE", 2)
+    batch_sizes = _record_batches(monkeypatch)
+
+    result = ingest_documents()
+
+    assert max(batch_sizes) <= 2
+    assert sum(batch_sizes) == result["chunks_embedded"] == result["chunks"]
+    assert len(store.get_db().get()["ids"]) == result["chunks"]
+
+
+def test_result_reports_stage_timings(isolated_store):
+    _write(isolated_store, "about.md", "Jalin builds websites.")
+
+    result = ingest_documents()
+
+    assert {"scan", "parse", "embed", "upsert", "total"} <= set(result["timings"])
+    assert all(t >= 0 for t in result["timings"].values())
+
+
+# ── Bounded memory ─────────────────────────────────────────────────────────────
+
+def test_memory_ceiling_shrinks_batches(isolated_store, monkeypatch):
+    for i in range(3):
+        _write(isolated_store, f"p{i}.md", "word " * 300)
+    monkeypatch.setattr("app.ingest.INGEST_BATCH_SIZE", 8)
+    monkeypatch.setattr("app.ingest.INGEST_MEMORY_LIMIT_MB", 100)
+    monkeypatch.setattr("app.ingest._rss_mb", lambda: 150.0)
+    batch_sizes = _record_batches(monkeypatch)
+
+    result = ingest_documents()
+
+    # Over the ceiling every batch is written as soon as it arrives, and the
+    # batch size keeps halving down to one chunk.
+    assert result["final_batch_size"] == 1
+    assert result["peak_rss_mb"] == 150.0
+    assert sum(batch_sizes) == result["chunks"]
+
+
+def test_parse_pool_keeps_bounded_work_in_flight(tmp_path, monkeypatch):
+    from concurrent.futures import Future
+
+    from app import ingest
+
+    outstanding = []
+    peak = [0]
+
+    class _InlinePool:
+        def __init__(self, max_workers, mp_context):
+            self.max_workers = max_workers
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_result(fn(*args))
+            outstanding.append(future)
+            peak[0] = max(peak[0], len(outstanding))
+            original = future.result
+
+            def result(timeout=None):
+                outstanding.remove(future)
+                return original(timeout)
+
+            future.result = result
+            return future
+
+    files = [_write(tmp_path, f"f{i}.md", f"file {i}") for i in range(20)]
+    monkeypatch.setattr(ingest, "INGEST_WORKERS", 3)
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", _InlinePool)
+
+    parsed = list(ingest._parse_files(files))
+
+    assert [f for f, _ in parsed] == files
+    assert peak[0] <= 2 * 3
+
+
+def _manifest_chunks():
+    from app.ingest import _read_manifest
+    manifest = _read_manifest(store.active_collection())
+    return {k: v["chunks"] for k, v in manifest["files"].items()}
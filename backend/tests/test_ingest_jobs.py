@@ -0,0 +1,99 @@
+"""
+Tests for background ingest jobs (app.jobs) and the /api/ingest endpoints.
+
+Covers:
+  - POST /api/ingest returns 202 with a job id; GET reports progress to completion
+  - Progress fields (stage, files, chunks, throughput) are updated by ingest
+  - Only one ingest runs at a time (409 while busy)
+  - ?wait=true returns the ingest summary inline
+  - Auth is required on both endpoints
+"""
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app import jobs
+
+_AUTH = {"Authorization": "Bearer s3cret"}
+
+
+@pytest.fixture(autouse=True)
+def ingest_secret(monkeypatch):
+    monkeypatch.setattr("app.main._INGEST_SECRET", "s3cret")
+    monkeypatch.setattr(jobs, "_current", None)
+
+
+def _wait_done(client, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        body = client.get(f"/api/ingest/{job_id}", headers=_AUTH).json()
+        if body["status"] in ("done", "failed"):
+            return body
+        time.sleep(0.02)
+    raise AssertionError("ingest job did not finish")
+
+
+def test_ingest_runs_in_background_and_reports_progress(client, isolated_store):
+    for i in range(3):
+        (isolated_store / f"p{i}.md").write_text(f"Project {i} " + "detail " * 100)
+
+    resp = client.post("/api/ingest", headers=_AUTH)
+
+    assert resp.status_code == 202
+    job_id = resp.json()["job_id"]
+    body = _wait_done(client, job_id)
+    assert body["status"] == "done"
+    assert body["stage"] == "done"
+    assert body["files_total"] == body["files_processed"] == 3
+    assert body["chunks_embedded"] == body["result"]["chunks"] > 0
+    assert body["chunks_per_second"] > 0
+
+
+def test_only_one_ingest_at_a_time(client):
+    release = threading.Event()
+
+    def slow_ingest(full=False, progress=None):
+        progress(stage="indexing")
+        release.wait(5)
+        return {"status": "ok", "chunks": 0}
+
+    with patch("app.jobs.ingest_documents", side_effect=slow_ingest):
+        first = client.post("/api/ingest", headers=_AUTH).json()
+        second = client.post("/api/ingest", headers=_AUTH)
+        release.set()
+        _wait_done(client, first["job_id"])
+        third = client.post("/api/ingest", headers=_AUTH)
+
+    assert second.status_code == 409
+    assert second.json()["detail"]["job_id"] == first["job_id"]
+    assert third.status_code == 202
+
+
+def test_wait_returns_summary_inline(client):
+    with patch("app.jobs.ingest_documents", return_value={"status": "ok", "chunks": 5}) as mock:
+        resp = client.post("/api/ingest?wait=true&full=true", headers=_AUTH)
+
+    assert resp.status_code == 200
+    assert resp.json() == {"status": "ok", "chunks": 5}
+    assert mock.call_args.kwargs["full"] is True
+
+
+def test_failed_job_reports_error(client):
+    with patch("app.jobs.ingest_documents", side_effect=RuntimeError("disk full")):
+        job_id = client.post("/api/ingest", headers=_AUTH).json()["job_id"]
+        body = _wait_done(client, job_id)
+
+    assert body["status"] == "failed"
+    assert body["error"] == "disk full"
+
+
+def test_endpoints_require_auth(client):
+    assert client.post("/api/ingest").status_code == 401
+    assert client.get("/api/ingest/abc").status_code == 401
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/api/ingest/nope", headers=_AUTH).status_code == 404
@@ -0,0 +1,104 @@
+"""
+Tests for the shared, pooled Anthropic clients in app.llm.
+
+A local HTTP server stands in for the Messages API (via ANTHROPIC_BASE_URL),
+so connection reuse is measured on real keep-alive sockets.
+"""
+
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import llm
+
+_MESSAGE = {
+    "id": "msg_01",
+    "type": "message",
+    "role": "assistant",
+    "model": "claude-sonnet-4-6",
+    "content": [{"type": "text", "text": "Hi."}],
+    "stop_reason": "end_turn",
+    "stop_sequence": None,
+    "usage": {"input_tokens": 3, "output_tokens": 2},
+}
+
+
+class _MessagesHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(_MESSAGE).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def fake_api(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _MessagesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(llm, "_client", None)
+    monkeypatch.setattr(llm, "_async_client", None)
+    monkeypatch.setattr(llm, "_stats", llm._ConnectionStats())
+    yield
+    asyncio.run(llm.aclose())
+    server.shutdown()
+
+
+def _create(client):
+    return client.messages.create(
+        model="claude-sonnet-4-6",
+        max_tokens=16,
+        messages=[{"role": "user", "content": "hi"}],
+    )
+
+
+def test_clients_are_singletons(fake_api):
+    assert llm.get_client() is llm.get_client()
+    assert llm.get_async_client() is llm.get_async_client()
+    assert llm.get_client().max_retries == llm.ANTHROPIC_MAX_RETRIES
+
+
+def test_sync_client_reuses_connection(fake_api):
+    for _ in range(3):
+        assert _create(llm.get_client()).content[0].text == "Hi."
+
+    assert llm.connection_stats() == {
+        "requests": 3,
+        "new_connections": 1,
+        "reused_connections": 2,
+    }
+
+
+def test_async_client_reuses_connection(fake_api):
+    async def run():
+        client = llm.get_async_client()
+        for _ in range(3):
+            await client.messages.create(
+                model="claude-sonnet-4-6",
+                max_tokens=16,
+                messages=[{"role": "user", "content": "hi"}],
+            )
+        await llm.aclose()
+
+    asyncio.run(run())
+
+    stats = llm.connection_stats()
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 2
+
+
+def test_aclose_drops_clients(fake_api):
+    first = llm.get_client()
+    asyncio.run(llm.aclose())
+    assert llm.get_client() is not first
@@ -0,0 +1,121 @@
+"""
+Tests for request-level latency metrics (app.metrics) and /api/metrics.
+
+Covers:
+  - Histogram buckets are cumulative and rendered in Prometheus text format
+  - Stages timed in another thread under Trace.run() land in that trace
+  - A chat with a tool round records every pipeline stage and its tokens
+  - /api/metrics folds in Anthropic usage and response cache counters
+"""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import metrics
+from app.rag import aretrieve_and_stream
+from tests.conftest import FakeAsyncStream, fake_final
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+# ── Histogram / Trace ─────────────────────────────────────────────────────────
+
+def test_histogram_renders_cumulative_buckets():
+    hist = metrics.Histogram("demo_seconds", "Demo.", "stage", buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.7, 3.0):
+        hist.observe("embed", seconds)
+
+    lines = hist.render()
+
+    assert '# TYPE demo_seconds histogram' in lines
+    assert 'demo_seconds_bucket{stage="embed",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{stage="embed",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{stage="embed",le="+Inf"} 4' in lines
+    assert 'demo_seconds_count{stage="embed"} 4' in lines
+
+
+def test_trace_collects_stages_from_worker_threads(capsys):
+    trace = metrics.Trace()
+
+    def work():
+        with metrics.stage("dense_search"):
+            pass
+
+    worker = threading.Thread(target=trace.run, args=(work,))
+    worker.start()
+    worker.join()
+    with metrics.stage("outside_any_trace"):
+        pass
+    summary = trace.finish("ok")
+
+    assert set(summary["stages_ms"]) == {"dense_search"}
+    assert '"outcome": "ok"' in capsys.readouterr().out
+    snapshot = metrics.stage_seconds.snapshot()
+    assert snapshot["outside_any_trace"]["count"] == 1
+    assert snapshot["total"]["count"] == 1
+
+
+# ── Chat pipeline ─────────────────────────────────────────────────────────────
+
+def _final(stop_reason="end_turn", content=()):
+    usage = SimpleNamespace(input_tokens=900, output_tokens=40,
+                            cache_creation_input_tokens=0, cache_read_input_tokens=800)
+    return fake_final(stop_reason, content, usage)
+
+
+def _chat_with_tool_round():
+    block = SimpleNamespace(type="tool_use", name="get_project_details",
+                            input={"project_title": "Pawfect"}, id="toolu_01")
+    client = MagicMock()
+    client.messages.stream.side_effect = [
+        FakeAsyncStream([], _final("tool_use", [block])),
+        FakeAsyncStream(["Booking ", "flow."], _final()),
+    ]
+    db = MagicMock()
+    db.similarity_search.return_value = [
+        SimpleNamespace(page_content="Pawfect Pet Grooming.", metadata={"source": "data/projects.md"})
+    ]
+
+    async def run():
+        return [c async for c in aretrieve_and_stream("Details on Pawfect?")]
+
+    with patch("app.rag.store.get_db", return_value=db), \
+            patch("app.rag.llm.get_async_client", return_value=client), \
+            patch("app.rag.execute_tool", return_value="Pawfect: 4-step booking."):
+        return asyncio.run(run())
+
+
+def test_chat_records_every_stage(capsys):
+    assert _chat_with_tool_round() == ["Booking ", "flow."]
+
+    snapshot = metrics.stage_seconds.snapshot()
+    for stage in ("cache_lookup", "retrieve", "dense_search", "context_build", "ttft",
+                  "tool_round", "execute_tool", "total"):
+        assert snapshot[stage]["count"] == 1, stage
+    assert snapshot["llm_round"]["count"] == 2
+    log = capsys.readouterr().out
+    assert '"outcome": "ok"' in log
+    assert '"input_tokens": 1800' in log
+
+
+def test_metrics_endpoint_exposes_histograms_and_counters(client):
+    _chat_with_tool_round()
+
+    response = client.get("/api/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'rag_stage_seconds_count{stage="ttft"} 1' in body
+    assert 'rag_requests_total{outcome="ok"} 1' in body
+    assert 'anthropic_tokens_total{type="cache_read_input_tokens"}' in body
+    assert "rag_response_cache_entries" in body
@@ -0,0 +1,182 @@
+"""
+Tests for the chat answer cache (app.response_cache) and its use in app.rag.
+
+Covers:
+  - Query normalization and exact-key hits
+  - TTL expiry and LRU eviction at max_size
+  - Near-duplicate matching through the similarity threshold
+  - Invalidation when the vector store generation changes, including a
+    pointer rewrite by another process seen before any retrieval
+  - retrieve_and_stream / POST /api/chat replaying cached answers
+"""
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app import store
+from app.response_cache import ResponseCache, normalize_query
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query():
+    assert normalize_query("  What projects has she BUILT?? ") == "what projects has she built"
+
+
+def test_hit_on_normalized_query():
+    cache = ResponseCache(max_size=4, ttl=60)
+    cache.put("How do I contact her?", ["Email ", "Jalin."])
+
+    assert cache.get("how do i contact her") == ["Email ", "Jalin."]
+    assert cache.get("Who is Jalin?") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_ttl_expiry():
+    clock = _Clock()
+    cache = ResponseCache(max_size=4, ttl=10, clock=clock)
+    cache.put("q", ["a"])
+
+    clock.now = 9.9
+    assert cache.get("q") == ["a"]
+    clock.now = 10.0
+    assert cache.get("q") is None
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_size=2, ttl=60)
+    cache.put("one", ["1"])
+    cache.put("two", ["2"])
+    cache.get("one")
+    cache.put("three", ["3"])
+
+    assert cache.get("two") is None
+    assert cache.get("one") == ["1"]
+    assert cache.get("three") == ["3"]
+
+
+def test_similarity_threshold_matches_near_duplicates():
+    vectors = {
+        "what projects has she built": np.array([1.0, 0.0]),
+        "which projects has she built": np.array([0.99, 0.141]),
+        "how do i contact her": np.array([0.0, 1.0]),
+    }
+    cache = ResponseCache(max_size=4, ttl=60, similarity=0.95, embed=vectors.__getitem__)
+    cache.put("What projects has she built?", ["Projects."])
+
+    assert cache.get("Which projects has she built?") == ["Projects."]
+    assert cache.get("How do I contact her?") is None
+
+
+def test_version_change_invalidates():
+    version = [0]
+    cache = ResponseCache(max_size=4, ttl=60, version=lambda: version[0])
+    cache.put("q", ["a"])
+
+    version[0] += 1
+
+    assert cache.get("q") is None
+    assert len(cache) == 0
+
+
+def test_disabled_when_size_zero():
+    cache = ResponseCache(max_size=0, ttl=60)
+    cache.put("q", ["a"])
+    assert cache.get("q") is None
+
+
+# ── Integration with retrieve_and_stream ──────────────────────────────────────
+
+@pytest.fixture()
+def live_cache():
+    from app.rag import response_cache
+
+    # Same version source as the live cache in app.rag
+    cache = ResponseCache(max_size=8, ttl=60, version=response_cache._version_fn)
+    with patch("app.rag.response_cache", cache):
+        yield cache
+
+
+def _fake_answer(chunks, ok=True, calls=None):
+    def answer(query, trace):
+        if calls is not None:
+            calls.append(query)
+        yield from chunks
+        return ok
+    return answer
+
+
+def test_retrieve_and_stream_replays_cached_answer(live_cache):
+    from app.rag import retrieve_and_stream
+
+    calls = []
+    with patch("app.rag._answer", _fake_answer(["Hello ", "world."], calls=calls)):
+        first = list(retrieve_and_stream("Who is Jalin?"))
+        second = list(retrieve_and_stream("who is jalin"))
+
+    assert first == second == ["Hello ", "world."]
+    assert calls == ["Who is Jalin?"]
+
+
+def test_failed_answers_are_not_cached(live_cache):
+    from app.rag import retrieve_and_stream
+
+    calls = []
+    with patch("app.rag._answer", _fake_answer(["Error generating response"], ok=False, calls=calls)):
+        list(retrieve_and_stream("q"))
+        list(retrieve_and_stream("q"))
+
+    assert len(calls) == 2
+
+
+def test_index_change_invalidates_cached_answers(live_cache, isolated_store):
+    from app.rag import retrieve_and_stream
+
+    calls = []
+    with patch("app.rag._answer", _fake_answer(["a"], calls=calls)):
+        list(retrieve_and_stream("q"))
+        store.mark_changed()
+        list(retrieve_and_stream("q"))
+
+    assert len(calls) == 2
+
+
+def test_pointer_rewritten_by_another_process_invalidates_cached_answers(live_cache, isolated_store):
+    import json
+    import os
+
+    from app.rag import retrieve_and_stream
+
+    store.get_db()
+    store.mark_changed()
+    calls = []
+    with patch("app.rag._answer", _fake_answer(["a"], calls=calls)):
+        list(retrieve_and_stream("q"))
+        # Another worker's activate/mark_changed: only the pointer file changes here
+        pointer = store.read_pointer()
+        pointer["revision"] += 1
+        tmp = store._pointer_path() + ".other"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(pointer, f)
+        os.replace(tmp, store._pointer_path())
+        list(retrieve_and_stream("q"))
+
+    assert len(calls) == 2
+
+
+def test_chat_endpoint_replays_cache_as_sse(client, live_cache):
+    live_cache.put("Who is Jalin?", ["Jalin ", "builds sites."])
+
+    with patch("app.rag._aanswer", side_effect=AssertionError("cache miss")):
+        resp = client.post("/api/chat", json={"query": "who is jalin"})
+
+    assert "data: Jalin \n\n" in resp.text
+    assert resp.text.strip().endswith("data: [DONE]")
@@ -0,0 +1,158 @@
+"""
+Tests for BM25 (app.lexical) and hybrid retrieval (app.retrieval).
+
+Covers:
+  - BM25 ranking, idf weighting and unknown terms
+  - CSR postings round-trip through save / load
+  - Ingest builds and persists the lexical index; incremental ingest refreshes it
+  - Reciprocal-rank fusion ordering and de-duplication
+  - retrieve() modes, fallback to dense search, and lazy build for old versions
+"""
+
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from langchain_core.documents import Document
+
+from app import lexical, store
+from app.ingest import ingest_documents
+from app.lexical import BM25Index
+from app.retrieval import reciprocal_rank_fusion, retrieve
+
+_DOCS = [
+    "Pawfect Pet Grooming booking site for a dog grooming salon.",
+    "Kurt Douglas Foundation donation website for a nonprofit.",
+    "Team App website built with Webflow for a sports team.",
+    "Portfolio website built with React and Vite.",
+]
+
+
+def _index():
+    return BM25Index.build(_DOCS, [{"source": f"doc{i}.md"} for i in range(len(_DOCS))])
+
+
+def test_bm25_ranks_exact_terms_first():
+    hits = _index().search("pawfect grooming", k=3)
+    assert hits[0][0] == 0
+    assert len(hits) == 1
+
+
+def test_bm25_rare_terms_outweigh_common_ones():
+    # "website" appears in three chunks, "nonprofit" in one
+    hits = _index().search("website nonprofit", k=4)
+    assert hits[0][0] == 1
+    assert {i for i, _ in hits} == {1, 2, 3}
+
+
+def test_bm25_unknown_terms_return_nothing():
+    assert _index().search("kubernetes", k=3) == []
+
+
+def test_bm25_save_load_round_trip(tmp_path):
+    index = _index()
+    index.save(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path))
+
+    assert loaded.terms == index.terms
+    assert (loaded.postings == index.postings).all()
+    assert loaded.search("webflow team", 2) == index.search("webflow team", 2)
+    assert loaded.search_documents("vite", 1)[0].metadata == {"source": "doc3.md"}
+
+
+def test_bm25_load_missing_returns_none(tmp_path):
+    assert BM25Index.load(str(tmp_path)) is None
+
+
+# ── Fusion ─────────────────────────────────────────────────────────────────────
+
+def _doc(text):
+    return Document(page_content=text, metadata={"source": "a.md"})
+
+
+def test_rrf_prefers_documents_ranked_by_both():
+    a, b, c = _doc("a"), _doc("b"), _doc("c")
+
+    fused = reciprocal_rank_fusion([[a, b, c], [b, c]], k=3)
+
+    assert [d.page_content for d in fused] == ["b", "c", "a"]
+
+
+def test_rrf_deduplicates_and_truncates():
+    fused = reciprocal_rank_fusion([[_doc("a"), _doc("b")], [_doc("a")]], k=1)
+    assert [d.page_content for d in fused] == ["a"]
+
+
+# ── Ingest and retrieve() ─────────────────────────────────────────────────────
+
+def _ingest(data_dir):
+    for i, text in enumerate(_DOCS):
+        (data_dir / f"doc{i}.md").write_text(text)
+    return ingest_documents()
+
+
+def test_ingest_persists_lexical_index(isolated_store):
+    result = _ingest(isolated_store)
+
+    assert "lexical" in result["timings"]
+    index = BM25Index.load(store.sidecar_dir(result["collection"]))
+    assert len(index) == len(_DOCS)
+
+
+def test_incremental_ingest_refreshes_lexical_index(isolated_store):
+    _ingest(isolated_store)
+    (isolated_store / "doc4.md").write_text("Chat App website with realtime messaging.")
+
+    ingest_documents()
+
+    docs = retrieve("realtime messaging", k=1, mode="lexical")
+    assert docs[0].page_content.startswith("Chat App")
+
+
+@pytest.mark.parametrize("mode", ["dense", "lexical", "hybrid"])
+def test_retrieve_modes_find_exact_project(isolated_store, mode):
+    _ingest(isolated_store)
+
+    docs = retrieve("Pawfect Pet Grooming", k=2, mode=mode)
+
+    assert docs[0].page_content.startswith("Pawfect")
+
+
+def test_hybrid_surfaces_lexical_match_missed_by_dense(isolated_store):
+    _ingest(isolated_store)
+    dense = [Document(page_content=t, metadata={"source": "x"}) for t in _DOCS[1:]]
+
+    with patch.object(store.get_db(), "similarity_search", return_value=dense):
+        docs = retrieve("Pawfect", k=2, mode="hybrid")
+
+    assert any(d.page_content.startswith("Pawfect") for d in docs)
+
+
+def test_unknown_mode_raises(isolated_store):
+    with pytest.raises(ValueError):
+        retrieve("q", mode="sparse")
+
+
+def test_falls_back_to_dense_when_lexical_fails():
+    db = MagicMock()
+    db.similarity_search.return_value = [_doc("dense")]
+
+    with patch("app.retrieval.store.get_db", return_value=db), \
+            patch("app.retrieval.lexical.get_index", side_effect=OSError("disk")):
+        docs = retrieve("q", k=3, mode="hybrid")
+
+    assert [d.page_content for d in docs] == ["dense"]
+    db.similarity_search.assert_called_once_with("q", k=3)
+
+
+def test_missing_lexical_index_is_built_lazily(isolated_store):
+    result = _ingest(isolated_store)
+    path = os.path.join(store.sidecar_dir(result["collection"]), "bm25.npz")
+    os.remove(path)
+    store.mark_changed()
+
+    index = lexical.get_index(store.get_db())
+
+    assert len(index) == len(_DOCS)
+    assert os.path.exists(path)
@@ -0,0 +1,66 @@
+"""
+Tests for cold start: deferred heavy imports and the startup profile.
+
+Covers:
+  - Importing app.main pulls in none of the heavy dependencies
+  - -X importtime output is parsed into per-module timings
+  - /api/health answers while the RAG stack is still loading
+  - Handlers resolve the RAG / ingest functions at call time
+"""
+
+import threading
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.startup_profile import main, parse_importtime
+
+
+# ── Startup profile ───────────────────────────────────────────────────────────
+
+def test_app_main_imports_no_heavy_modules(capsys):
+    assert main(["--top", "5"]) == 0
+    assert '"heavy_imported": []' in capsys.readouterr().out
+
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       120 |        120 |   app.config\n"
+        "import time:       300 |        420 | app.store\n"
+        "unrelated line\n"
+    )
+
+    modules = parse_importtime(stderr)
+
+    assert [m["module"] for m in modules] == ["app.config", "app.store"]
+    assert modules[1]["cumulative_ms"] == 0.42
+    assert [m["depth"] for m in modules] == [1, 0]
+
+
+# ── Serving before the RAG stack is loaded ────────────────────────────────────
+
+def test_health_answers_while_rag_warms_up(fastapi_app):
+    from app import store
+
+    started, release = threading.Event(), threading.Event()
+
+    def slow_init():
+        started.set()
+        release.wait(5)
+
+    store.reset()
+    with patch("app.rag.initialize_rag", side_effect=slow_init):
+        with TestClient(fastapi_app) as client:
+            assert started.wait(5)
+            assert client.get("/api/health").status_code == 200
+            assert client.get("/api/ready").status_code == 503
+            release.set()
+
+
+def test_handlers_resolve_functions_lazily(client, mock_retrieve, mock_list_sources):
+    chat = client.post("/api/chat", json={"query": "What has Jalin built?"})
+
+    assert "data: Hello " in chat.text
+    mock_retrieve.assert_called_once_with("What has Jalin built?")
+    assert client.get("/api/documents").json() == {"sources": ["data/doc1.txt", "data/doc2.md"]}
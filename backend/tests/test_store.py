@@ -0,0 +1,131 @@
+"""
+Tests for the process-wide embeddings / Chroma registry in app.store.
+
+Covers:
+  - One embeddings instance and one Chroma handle shared across callers
+  - Thread-safe lazy construction under concurrent first access
+  - A slow derived index build does not block builds under other names
+  - ingest, list_sources and the project-details tool reuse the shared handle
+  - A full re-ingest repoints readers to the new index version
+  - initialize() warms the model and /api/ready reflects it (or the error)
+  - A later lazy load clears a failed warm-up from /api/ready
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import threading
+import time
+
+import app.embeddings as embeddings_module
+from app import store
+from app.ingest import ingest_documents, list_sources
+from app.search_tools import execute_tool
+
+
+def test_shared_instances_are_reused(isolated_store):
+    assert store.get_embeddings() is store.get_embeddings()
+    assert store.get_db() is store.get_db()
+
+
+def test_concurrent_first_access_builds_once(isolated_store):
+    constructed = []
+    fake_cls = embeddings_module.OnnxEmbeddings
+
+    class Counting(fake_cls):
+        def __init__(self):
+            constructed.append(1)
+            super().__init__()
+
+    with patch.object(embeddings_module, "OnnxEmbeddings", Counting):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            dbs = list(pool.map(lambda _: store.get_db(), range(16)))
+
+    assert len(constructed) == 1
+    assert all(db is dbs[0] for db in dbs)
+
+
+def test_derived_builds_lock_per_name(isolated_store):
+    db = object()
+    started, release = threading.Event(), threading.Event()
+
+    def slow(_):
+        started.set()
+        release.wait(5)
+        return "title"
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        pending = pool.submit(store.derived, "slow", db, slow)
+        started.wait(5)
+        start = time.perf_counter()
+        assert store.derived("fast", db, lambda _: "lexical") == "lexical"
+        elapsed = time.perf_counter() - start
+        release.set()
+        assert pending.result() == "title"
+
+    assert elapsed < 1
+
+
+def test_ingest_swaps_handle_and_readers_see_new_data(isolated_store):
+    (isolated_store / "projects.md").write_text("Pawfect Pet Grooming booking flow.")
+    before = store.get_db()
+
+    result = ingest_documents()
+
+    assert result["status"] == "ok"
+    after = store.get_db()
+    assert after is not before
+    assert list_sources() == [str(isolated_store / "projects.md")]
+    assert "Pawfect" in execute_tool("get_project_details", {"project_title": "Pawfect"})
+
+
+def test_tool_does_not_rebuild_embeddings(isolated_store):
+    (isolated_store / "projects.md").write_text("Team App Website built with Webflow.")
+    ingest_documents()
+    embeddings = store.get_embeddings()
+
+    with patch("app.embeddings.OnnxEmbeddings", side_effect=AssertionError("rebuilt")):
+        execute_tool("get_project_details", {"project_title": "Team App"})
+        list_sources()
+
+    assert store.get_embeddings() is embeddings
+
+
+# ── Warm-up and readiness ─────────────────────────────────────────────────────
+
+def test_initialize_warms_model_and_reports_ready(isolated_store, client):
+    assert client.get("/api/ready").status_code == 503
+
+    store.initialize()
+
+    response = client.get("/api/ready")
+    assert response.status_code == 200
+    assert response.json()["ready"] is True
+    assert response.json()["startup_ms"] >= 0
+
+
+def test_failed_initialize_reports_error(isolated_store, client):
+    with patch("app.embeddings.OnnxEmbeddings", side_effect=OSError("download blocked")):
+        try:
+            store.initialize()
+        except OSError:
+            pass
+
+    response = client.get("/api/ready")
+    assert response.status_code == 503
+    assert "download blocked" in response.json()["error"]
+
+
+def test_lazy_load_after_failed_warm_up_reports_ready(isolated_store, client):
+    with patch("app.embeddings.OnnxEmbeddings", side_effect=OSError("download blocked")):
+        try:
+            store.initialize()
+        except OSError:
+            pass
+    assert client.get("/api/ready").status_code == 503
+
+    store.get_db()  # first chat loads lazily once the download works again
+
+    response = client.get("/api/ready")
+    assert response.status_code == 200
+    assert response.json()["error"] is None
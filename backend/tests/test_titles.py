@@ -0,0 +1,189 @@
+"""
+Tests for the project-title index (app.titles) and get_project_details.
+
+Covers:
+  - Ingest tags chunks with the Markdown sections they fall under
+  - "Project NN: Title (Alias)" headings become titles and aliases
+  - A project's chunks are in document order whatever the collection order
+  - Exact, word-contained and trigram (typo) matches; unrelated titles miss
+  - The tool answers from the index without a vector search, and falls
+    back to similarity_search on a miss
+  - The index is persisted next to the collection and refreshed by ingest
+  - Renaming a heading moves every chunk below it to the new title
+  - The prefetch for projects named in retrieved chunks matches the tool output
+"""
+
+import random
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app import store, titles
+from app.ingest import _parse_file, _tag_sections, ingest_documents
+from app.search_tools import execute_tool, mentioned_projects, prefetch_project_details
+from app.titles import TitleIndex, project_aliases
+
+_PROJECTS = """\
+# Projects
+
+## Project 01: jalinbright.com (Personal Portfolio)
+- Built with React + Vite and a FastAPI backend.
+
+## Project 02: Bright Futures Foundation
+- A website for a children's nonprofit organization.
+
+## Project 03: Pawfect Pet Grooming
+- A 4-step booking flow: service, pet details, date and time, confirm.
+"""
+
+
+def _index(tmp_path):
+    path = tmp_path / "projects.md"
+    path.write_text(_PROJECTS)
+    chunks = _parse_file(str(path), 400, 50)
+    return TitleIndex.build(
+        [str(i) for i in range(len(chunks))],
+        [c.page_content for c in chunks],
+        [c.metadata for c in chunks],
+    )
+
+
+def test_sections_follow_headings_across_chunks():
+    from langchain_core.documents import Document
+
+    chunks = [
+        Document(page_content="## Project 03: Pawfect\n- booking", metadata={}),
+        Document(page_content="- more booking details", metadata={}),
+        Document(page_content="## Contact\nemail me", metadata={}),
+    ]
+    _tag_sections(chunks)
+
+    assert [c.metadata["sections"] for c in chunks] == [
+        "Project 03: Pawfect", "Project 03: Pawfect", "Contact",
+    ]
+
+
+def test_project_aliases():
+    assert project_aliases("Project 01: jalinbright.com (Personal Portfolio)") == (
+        "jalinbright.com (Personal Portfolio)",
+        ["jalinbright com personal portfolio", "jalinbright com", "personal portfolio"],
+    )
+    assert project_aliases("About Jalin") is None
+
+
+def test_chunks_keep_document_order_when_collection_is_shuffled(tmp_path):
+    path = tmp_path / "projects.md"
+    path.write_text(_PROJECTS.replace("- A 4-step", "- Step details.\n" * 40 + "- A 4-step"))
+    chunks = _parse_file(str(path), 120, 0)
+    rows = [(str(i), c.page_content, c.metadata) for i, c in enumerate(chunks)]
+    random.Random(7).shuffle(rows)
+
+    index = TitleIndex.build(*map(list, zip(*rows)))
+
+    found = index.lookup("Pawfect Pet Grooming")[1]
+    assert len(found) > 2
+    assert [int(c["id"]) for c in found] == sorted(int(c["id"]) for c in found)
+
+
+def test_lookup_exact_alias_and_contained_words(tmp_path):
+    index = _index(tmp_path)
+
+    assert index.lookup("Pawfect Pet Grooming")[0] == "Pawfect Pet Grooming"
+    assert index.lookup("pawfect")[0] == "Pawfect Pet Grooming"
+    assert index.lookup("Personal Portfolio")[0] == "jalinbright.com (Personal Portfolio)"
+    chunks = index.lookup("Bright Futures")[1]
+    assert all("nonprofit" in c["text"] for c in chunks)
+
+
+def test_lookup_tolerates_typos(tmp_path):
+    assert _index(tmp_path).lookup("Pawfect Pet Groming")[0] == "Pawfect Pet Grooming"
+
+
+def test_lookup_misses_unrelated_titles(tmp_path):
+    index = _index(tmp_path)
+
+    assert index.lookup("Kurt Douglas Foundation") is None
+    assert index.lookup("Team App Website") is None
+    assert index.lookup("") is None
+
+
+# ── get_project_details ───────────────────────────────────────────────────────
+
+def test_tool_resolves_title_without_vector_search(isolated_store):
+    (isolated_store / "projects.md").write_text(_PROJECTS)
+    ingest_documents()
+    db = store.get_db()
+
+    with patch.object(db, "similarity_search", side_effect=AssertionError("vector search")):
+        result = execute_tool("get_project_details", {"project_title": "pawfect grooming"})
+
+    assert "4-step booking flow" in result
+
+
+def test_tool_falls_back_to_vector_search_on_miss(isolated_store):
+    (isolated_store / "projects.md").write_text(_PROJECTS)
+    ingest_documents()
+    db = store.get_db()
+
+    with patch.object(db, "similarity_search", wraps=db.similarity_search) as search:
+        result = execute_tool("get_project_details", {"project_title": "Team App Website"})
+
+    search.assert_called_once_with("Team App Website", k=3)
+    assert "(source:" in result
+
+
+def test_ingest_persists_and_refreshes_title_index(isolated_store):
+    path = isolated_store / "projects.md"
+    path.write_text(_PROJECTS)
+    result = ingest_documents()
+    assert len(TitleIndex.load(store.sidecar_dir(result["collection"]))) == 3
+
+    path.write_text(_PROJECTS + "\n## Project 04: Chat App Website\n- Realtime chat.\n")
+    ingest_documents()
+
+    result = execute_tool("get_project_details", {"project_title": "Chat App"})
+    assert "Realtime chat" in result
+
+
+def test_heading_rename_retags_unchanged_chunks(isolated_store):
+    details = "\n".join(f"- Booking step {i}: pick a groomer, a slot and a reminder time." for i in range(20))
+    path = isolated_store / "projects.md"
+    path.write_text(_PROJECTS + details + "\n")
+    ingest_documents()
+    old = len(titles.get_index(store.get_db()).projects["Pawfect Pet Grooming"]["chunks"])
+    assert old > 1
+
+    path.write_text(_PROJECTS.replace("Pawfect Pet Grooming", "Pawfect Grooming Studio") + details + "\n")
+    result = ingest_documents()
+
+    assert result["chunks_refreshed"] > 0
+    projects = titles.get_index(store.get_db()).projects
+    assert "Pawfect Pet Grooming" not in projects
+    assert len(projects["Pawfect Grooming Studio"]["chunks"]) == old
+    data = store.get_db().get()
+    docs = [SimpleNamespace(metadata=m) for m in data["metadatas"]]
+    assert "Pawfect Pet Grooming" not in mentioned_projects(docs)
+
+
+# ── Prefetch ──────────────────────────────────────────────────────────────────
+
+def test_prefetch_answers_like_the_tool_for_mentioned_projects(isolated_store):
+    from langchain_core.documents import Document
+
+    (isolated_store / "projects.md").write_text(_PROJECTS)
+    ingest_documents()
+    docs = [
+        Document(page_content="- A 4-step booking flow", metadata={"sections": "Projects\nProject 03: Pawfect Pet Grooming"}),
+        Document(page_content="- React + Vite", metadata={"sections": "Project 01: jalinbright.com (Personal Portfolio)"}),
+        Document(page_content="- Nonprofit", metadata={"sections": "Project 02: Bright Futures Foundation"}),
+    ]
+    assert mentioned_projects(docs)[0] == "Pawfect Pet Grooming"
+
+    prefetch = prefetch_project_details(docs, limit=2)
+
+    inputs = {"project_title": "pawfect grooming"}
+    assert prefetch.get("get_project_details", inputs) == execute_tool("get_project_details", inputs)
+    assert prefetch.get("get_project_details", {"project_title": "Personal Portfolio"}) is not None
+    # Beyond the limit, or another tool: left to execute_tool
+    assert prefetch.get("get_project_details", {"project_title": "Bright Futures"}) is None
+    assert prefetch.get("other_tool", inputs) is None
+    assert prefetch_project_details([Document(page_content="Contact", metadata={})], limit=2) is None
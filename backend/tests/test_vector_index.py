@@ -0,0 +1,180 @@
+"""
+Tests for the exact NumPy vector backend (app.vector_index).
+
+Covers:
+  - Top-k by squared L2 distance matches a brute-force ranking
+  - k larger than the corpus, and an empty store
+  - Save / load round-trip, memory-mapped loading, and torn-write detection
+  - retrieve(backend="numpy") agrees with Chroma on an ingested corpus
+  - Ingest writes the matrix when VECTOR_BACKEND=numpy; otherwise it is
+    built lazily and a stale copy is dropped by the next ingest
+  - int8 / binary codes: recall after rescoring, code sizes, memory report
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from app import store, vector_index
+from app.ingest import ingest_documents
+from app.retrieval import retrieve
+from app.vector_index import NumpyVectorStore
+
+
+def _random_store(n=50, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    docs = [f"chunk {i}" for i in range(n)]
+    return NumpyVectorStore(vectors, docs, [{"source": f"{i}.md"} for i in range(n)])
+
+
+def test_search_matches_brute_force():
+    vs = _random_store()
+    q = np.random.default_rng(1).standard_normal(16).astype(np.float32)
+
+    hits = vs.search_by_vector(q, 5)
+
+    expected = np.argsort(((vs.vectors - q) ** 2).sum(axis=1))[:5]
+    assert [i for i, _ in hits] == list(expected)
+    assert np.isclose(hits[0][1], ((vs.vectors[expected[0]] - q) ** 2).sum(), rtol=1e-4)
+
+
+def test_k_larger_than_corpus_and_empty_store():
+    vs = _random_store(n=3)
+    assert len(vs.search_by_vector(np.zeros(16, dtype=np.float32), 10)) == 3
+
+    empty = NumpyVectorStore(np.zeros((0, 16), dtype=np.float32), [], [])
+    assert empty.search_by_vector(np.zeros(16, dtype=np.float32), 3) == []
+
+
+def test_save_load_round_trip_with_mmap(tmp_path):
+    vs = _random_store()
+    vs.save(str(tmp_path))
+
+    loaded = NumpyVectorStore.load(str(tmp_path), mmap=True)
+
+    assert isinstance(loaded.vectors, np.memmap)
+    q = vs.vectors[7]
+    assert loaded.similarity_search_by_vector(q, 1)[0].page_content == "chunk 7"
+
+
+def test_load_rejects_mismatched_files(tmp_path):
+    _random_store(n=10).save(str(tmp_path))
+    np.save(str(tmp_path / "vectors.npy"), np.zeros((4, 16), dtype=np.float32))
+
+    assert NumpyVectorStore.load(str(tmp_path)) is None
+
+
+# ── Against Chroma ────────────────────────────────────────────────────────────
+
+_TEXTS = [
+    "Pawfect Pet Grooming booking site.",
+    "Bright Futures Foundation nonprofit website.",
+    "Portfolio built with React and Vite.",
+    "Facebook and Google ad campaigns.",
+    "AI chat assistant for websites.",
+]
+
+
+def _ingest(data_dir):
+    for i, text in enumerate(_TEXTS):
+        (data_dir / f"doc{i}.md").write_text(text)
+    return ingest_documents()
+
+
+def test_numpy_backend_agrees_with_chroma(isolated_store):
+    _ingest(isolated_store)
+
+    db = store.get_db()
+    vs = vector_index.get_store(db)
+    for query in ("pet grooming booking", "nonprofit website", "ad campaigns"):
+        chroma = db.similarity_search_with_score(query, k=3)
+        numpy_ = vs.similarity_search_with_score(query, k=3)
+        assert numpy_[0][0].page_content == chroma[0][0].page_content
+        assert np.allclose([s for _, s in numpy_], [s for _, s in chroma], atol=1e-4)
+        assert retrieve(query, k=1, mode="dense", backend="numpy")[0] == numpy_[0][0]
+
+
+def test_ingest_writes_matrix_for_numpy_backend(isolated_store, monkeypatch):
+    monkeypatch.setattr("app.ingest.VECTOR_BACKEND", "numpy")
+
+    result = _ingest(isolated_store)
+
+    assert "vectors" in result["timings"]
+    loaded = NumpyVectorStore.load(store.sidecar_dir(result["collection"]))
+    assert len(loaded) == len(_TEXTS)
+
+
+def test_lazy_build_and_refresh_after_incremental_ingest(isolated_store):
+    result = _ingest(isolated_store)
+    matrix = os.path.join(store.sidecar_dir(result["collection"]), "vectors.npy")
+    assert not os.path.exists(matrix)
+
+    assert len(vector_index.get_store(store.get_db())) == len(_TEXTS)
+    assert os.path.exists(matrix)
+
+    (isolated_store / "doc5.md").write_text("Shopify online store.")
+    ingest_documents()
+
+    assert len(vector_index.get_store(store.get_db())) == len(_TEXTS) + 1
+
+
+# ── Quantized codes with rescoring ────────────────────────────────────────────
+
+def _clustered(n=2000, dim=384, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((20, dim))
+    vectors = centers[rng.integers(0, 20, n)] + 0.5 * rng.standard_normal((n, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+@pytest.mark.parametrize("quantization,min_recall", [("int8", 0.95), ("binary", 0.8)])
+def test_quantized_search_with_rescoring_keeps_recall(quantization, min_recall):
+    vectors = _clustered()
+    docs = [str(i) for i in range(len(vectors))]
+    exact = NumpyVectorStore(vectors, docs, [{}] * len(docs))
+    quantized = NumpyVectorStore(vectors, docs, [{}] * len(docs), quantization=quantization, rescore_factor=10)
+    noise = np.random.default_rng(1).standard_normal((50, vectors.shape[1])).astype(np.float32)
+    queries = vectors[:50] + 0.05 * noise
+
+    recall = np.mean([
+        len({i for i, _ in quantized.search_by_vector(q, 5)} & {i for i, _ in exact.search_by_vector(q, 5)}) / 5
+        for q in queries
+    ])
+
+    assert recall >= min_recall
+    # Rescored distances are exact, not approximations
+    hit, dist = quantized.search_by_vector(queries[0], 1)[0]
+    assert np.isclose(dist, ((vectors[hit] - queries[0]) ** 2).sum(), rtol=1e-4)
+
+
+def test_quantized_codes_shrink_resident_memory():
+    vectors = _clustered(n=1000)
+    docs = [""] * len(vectors)
+
+    int8 = NumpyVectorStore(vectors, docs, [{}] * len(docs), quantization="int8").codes
+    binary = NumpyVectorStore(vectors, docs, [{}] * len(docs), quantization="binary").codes
+
+    assert int8.codes.dtype == np.int8 and int8.codes.shape == (1000, 384)
+    assert binary.codes.shape == (1000, 48)
+    assert binary.nbytes * 32 == vectors.nbytes
+
+
+def test_memory_report(tmp_path):
+    vectors = _clustered(n=1000)
+    vs = NumpyVectorStore(vectors, [""] * 1000, [{}] * 1000)
+    vs.save(str(tmp_path))
+
+    in_ram = vs.memory_report()
+    int8 = NumpyVectorStore.load(str(tmp_path), mmap=True, quantization="int8").memory_report()
+
+    assert in_ram["resident_mb"] >= in_ram["float32_mb"]
+    assert int8["saved_mb"] > 0
+    assert int8["resident_mb"] < in_ram["float32_mb"] / 3
+
+
+def test_unknown_quantization_raises():
+    with pytest.raises(ValueError):
+        NumpyVectorStore(np.zeros((1, 4), dtype=np.float32), [""], [{}], quantization="fp8")